@@ -1,11 +1,20 @@
 import streamlit as st
-import sqlite3
+
+from soma_dashboard import profiler
+
+# Tempo de carga deste run; no primeiro run do processo inclui os imports abaixo
+run = profiler.start('business_logs_dashboard')
+
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime, timedelta
-import time
-import os
+from datetime import datetime
+
+from soma_dashboard import charts
+from soma_dashboard.app import (config, config_status, get_backend, get_chart_renderer, get_instrumentation,
+                                instrumentation_panel, profiler_panel, replicas_status)
+from soma_dashboard.autorefresh import auto_refresh_watcher
+from soma_dashboard.details import build_log_labels
+
+run.mark('imports')
 
 # Configuração da página
 st.set_page_config(
@@ -14,76 +23,78 @@ st.set_page_config(
     layout="wide"
 )
 
-# Caminho do banco de dados
-DB_PATH = '/workspaces/opentelemetryexample/soma-api/target/soma_logs.db'
+# Banco, intervalo de atualização e limites vêm de soma_dashboard.app.DashboardConfig (env/arquivo)
+instrumentation = get_instrumentation('soma-business-logs-dashboard')
 
-# Função para carregar logs de negócio
-@st.cache_data(ttl=5)
-def load_business_logs():
+# Função para carregar os logs de negócio mais recentes (filtros aplicados no backend)
+@instrumentation.traced('load_business_logs')
+def load_business_logs(limit, users, periods):
     try:
-        if not os.path.exists(DB_PATH):
-            return pd.DataFrame(), f"Banco não encontrado: {DB_PATH}"
-            
-        conn = sqlite3.connect(DB_PATH)
-        
-        query = """
-        SELECT 
-            id,
-            operation_id,
-            user_id,
-            timestamp,
-            hour_of_day,
-            day_period,
-            operation_type,
-            input_values,
-            result_value,
-            execution_time_ms,
-            trace_id,
-            ip_address,
-            status,
-            message
-        FROM business_logs 
-        ORDER BY timestamp DESC
-        """
-        
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        if not df.empty:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            return df, "OK"
-        else:
+        backend = get_backend()
+        if backend.row_count('business_logs') == 0:
             return pd.DataFrame(), "Tabela business_logs vazia"
         
+        return backend.recent('business_logs', limit, users=users, periods=periods), "OK"
+        
+    except FileNotFoundError as e:
+        return pd.DataFrame(), str(e)
     except Exception as e:
         return pd.DataFrame(), f"Erro: {str(e)}"
 
-# Função para carregar estatísticas por usuário
-@st.cache_data(ttl=5)
-def load_user_stats():
+# Função para carregar as agregações (cards, top usuários e estatísticas)
+@instrumentation.traced('load_summary', cached=True)
+@st.cache_data(ttl=config.refresh_interval)
+@instrumentation.computes
+def load_summary():
     try:
-        conn = sqlite3.connect(DB_PATH)
-        
-        query = """
-        SELECT 
-            user_id,
-            COUNT(*) as total_operations,
-            AVG(execution_time_ms) as avg_execution_time,
-            SUM(result_value) as total_sum_results,
-            MIN(timestamp) as first_operation,
-            MAX(timestamp) as last_operation
-        FROM business_logs 
-        GROUP BY user_id
-        ORDER BY total_operations DESC
-        """
-        
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        return df
-        
+        return get_backend().summary(), "OK"
     except Exception as e:
-        return pd.DataFrame()
+        return None, f"Erro: {str(e)}"
+
+# Função para carregar o histórico a partir dos rollups (avança o watermark antes)
+@instrumentation.traced('load_history', cached=True)
+@st.cache_data(ttl=config.refresh_interval)
+@instrumentation.computes
+def load_history(source, granularity):
+    try:
+        return get_backend().history(source, granularity), "OK"
+    except Exception as e:
+        return pd.DataFrame(), f"Erro: {str(e)}"
+
+# Função para carregar uma página dos logs detalhados (consulta indexada)
+@instrumentation.traced('load_logs_page', cached=True)
+@st.cache_data(ttl=config.refresh_interval)
+@instrumentation.computes
+def load_logs_page(users, periods, since, until, cursor, page_size):
+    try:
+        page = get_backend().logs_page(users=list(users), periods=list(periods),
+                                       since=since, until=until, cursor=cursor, page_size=page_size)
+        return page, "OK"
+    except Exception as e:
+        return None, f"Erro: {str(e)}"
+
+# Função para carregar o detalhe de um log pela chave primária (linhas não mudam)
+@instrumentation.traced('load_log_detail', cached=True)
+@st.cache_data(max_entries=256)
+@instrumentation.computes
+def load_log_detail(log_id):
+    try:
+        return get_backend().log_detail(log_id), "OK"
+    except Exception as e:
+        return None, f"Erro: {str(e)}"
+
+# Função para buscar um trace no índice em memória (O(1), sem SQL)
+@instrumentation.traced('find_trace')
+def find_trace(key):
+    try:
+        return get_backend().trace(key), "OK"
+    except Exception as e:
+        return None, f"Erro: {str(e)}"
+
+# Memória ocupada pelos dados carregados (para dimensionar o host do Streamlit)
+@st.cache_data(ttl=60)
+def load_memory_usage():
+    return get_backend().memory('business_logs')
 
 # Título principal
 st.title("📈 Painel de Logs de Negócio - Soma API")
@@ -92,23 +103,37 @@ st.markdown("---")
 
 # Sidebar para controles
 st.sidebar.header("⚙️ Controles")
-auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (5s)", value=False)
-limit_records = st.sidebar.slider("📊 Registros", 10, 100, 30)
+auto_refresh = st.sidebar.checkbox(f"🔄 Auto-refresh ({config.refresh_interval:g}s)", value=False)
+max_records = config.records_limit(100)
+limit_records = st.sidebar.slider("📊 Registros", min(10, max_records), max_records, min(30, max_records))
+# Distintos via HyperLogLog (memória fixa por bucket); exato = COUNT(DISTINCT) no banco
+exact_distinct = st.sidebar.checkbox("🎯 Contagem exata de distintos", value=False,
+                                     help="Desligado: estimativa HyperLogLog (erro típico ~1,6%)")
 
 # Filtros
 st.sidebar.subheader("🔍 Filtros")
-selected_users = st.sidebar.multiselect("Usuários:", options=[], default=[])
+# Usuários vêm das agregações (GROUP BY no banco), mais ativos primeiro
+summary, summary_status = load_summary()
+all_users = summary.user_stats['user_id'].tolist() if summary is not None else []
+all_periods = ["MORNING", "AFTERNOON", "EVENING", "NIGHT"]
+selected_users = st.sidebar.multiselect("Usuários:", options=all_users, default=all_users)
 selected_periods = st.sidebar.multiselect("Períodos do dia:", 
-                                         options=["MORNING", "AFTERNOON", "EVENING", "NIGHT"],
-                                         default=["MORNING", "AFTERNOON", "EVENING", "NIGHT"])
+                                         options=all_periods,
+                                         default=all_periods)
 
+# Auto-refresh: reexecuta a página só quando chegam linhas novas
 if auto_refresh:
-    time.sleep(5)
-    st.rerun()
+    with st.sidebar:
+        auto_refresh_watcher(get_backend(), interval=config.refresh_interval)
 
-# Carregar dados
-df_logs, status = load_business_logs()
-df_user_stats = load_user_stats()
+# Carregar dados (tudo selecionado = sem filtro: consulta e cache menores)
+df_filtered, status = load_business_logs(
+    limit_records,
+    None if set(selected_users) == set(all_users) else selected_users,
+    None if set(selected_periods) == set(all_periods) else selected_periods,
+)
+backend = get_backend()
+renderer = get_chart_renderer()
 
 # Status do banco
 if status != "OK":
@@ -117,83 +142,79 @@ if status != "OK":
     st.code('curl "http://localhost:8080/soma/10/5?user_id=user123"')
     st.stop()
 
-if df_logs.empty:
-    st.warning("⚠️ Nenhum log de negócio encontrado!")
+if summary_status != "OK":
+    st.error(f"❌ {summary_status}")
     st.stop()
 
-# Atualizar opções de filtro na sidebar
-if not df_logs.empty:
-    all_users = df_logs['user_id'].unique().tolist()
-    selected_users = st.sidebar.multiselect("Usuários:", options=all_users, default=all_users)
+if summary.empty:
+    st.warning("⚠️ Nenhum log de negócio encontrado!")
+    st.stop()
 
-# Aplicar filtros
-df_filtered = df_logs[
-    (df_logs['user_id'].isin(selected_users)) &
-    (df_logs['day_period'].isin(selected_periods))
-].head(limit_records)
+df_user_stats = summary.user_stats
+unique_users = summary.unique_users if exact_distinct else backend.distinct_count('business_logs', 'user_id')
+run.mark('dados')
 
 # Métricas principais
 st.subheader("📊 Métricas de Negócio")
 col1, col2, col3, col4, col5 = st.columns(5)
 
+# Anomalias na última hora dos dados (delta vermelho quando houver)
+anomalies = backend.anomalies()
+recent_anomalies = anomalies['recent']
+anomaly_delta_color = "inverse" if len(recent_anomalies) else "off"
+
 with col1:
-    total_operations = len(df_logs)
-    st.metric("Total de Operações", total_operations)
+    st.metric("Total de Operações", summary.total_operations,
+              f"{len(recent_anomalies)} anomalias na última hora", delta_color=anomaly_delta_color)
 
 with col2:
-    unique_users = df_logs['user_id'].nunique()
-    st.metric("Usuários Únicos", unique_users)
+    st.metric("Usuários Únicos", unique_users,
+              f"{recent_anomalies['user_id'].nunique() if len(recent_anomalies) else 0} com anomalias",
+              delta_color=anomaly_delta_color)
 
 with col3:
-    avg_result = df_logs['result_value'].mean()
-    st.metric("Resultado Médio", f"{avg_result:.1f}")
+    st.metric("Resultado Médio", f"{summary.avg_result:.1f}")
 
 with col4:
-    most_active_user = df_logs['user_id'].value_counts().index[0]
-    user_operations = df_logs['user_id'].value_counts().iloc[0]
+    most_active_user, user_operations = summary.most_active_user
     st.metric("Usuário Mais Ativo", most_active_user, f"{user_operations} ops")
 
 with col5:
-    peak_period = df_logs['day_period'].value_counts().index[0]
-    period_count = df_logs['day_period'].value_counts().iloc[0]
+    peak_period, period_count = summary.peak_period
     st.metric("Período de Pico", peak_period, f"{period_count} ops")
 
 st.markdown("---")
 
 # Tabs principais
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Análise por Usuário", "⏰ Análise Temporal", "📋 Logs Detalhados", "📈 Estatísticas"])
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📊 Análise por Usuário", "⏰ Análise Temporal", "📋 Logs Detalhados",
+                                              "📈 Estatísticas", "🔗 Traces", "🚨 Anomalias"])
 
-with tab1:
+with tab1, instrumentation.span('tab.usuarios'):
+    # Gráficos da aba renderizados em paralelo (ou servidos do cache)
+    user_counts = df_filtered['user_id'].value_counts()
+    user_counts = user_counts[user_counts > 0]  # categóricas também listam usuários fora do filtro
+    users_chart = renderer.submit(charts.operations_by_user, user_counts)
+    if not df_user_stats.empty:
+        avg_time_chart = renderer.submit(
+            charts.avg_time_by_user,
+            df_user_stats['user_id'].values,
+            df_user_stats['avg_execution_time'].values,
+        )
+    
     col_left, col_right = st.columns(2)
     
     with col_left:
         st.subheader("👥 Operações por Usuário")
         
         # Gráfico de barras - operações por usuário
-        user_counts = df_filtered['user_id'].value_counts()
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-        bars = ax.bar(range(len(user_counts)), user_counts.values, color='lightblue', alpha=0.8)
-        ax.set_xlabel('Usuários')
-        ax.set_ylabel('Número de Operações')
-        ax.set_title('Operações por Usuário')
-        ax.set_xticks(range(len(user_counts)))
-        ax.set_xticklabels(user_counts.index, rotation=45)
-        
-        # Adicionar valores nas barras
-        for bar, count in zip(bars, user_counts.values):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{count}', ha='center', va='bottom')
-        
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
+        with instrumentation.span('chart.operations_by_user') as span:
+            span.record_chart(users_chart)
+            st.image(users_chart.result(), use_container_width=True)
         
         # Top usuários
         st.subheader("🏆 Top Usuários")
         for i, (user, count) in enumerate(user_counts.head(5).items(), 1):
-            avg_time = df_logs[df_logs['user_id'] == user]['execution_time_ms'].mean()
+            avg_time = summary.avg_execution_time_for(user)
             st.write(f"{i}. **{user}**: {count} operações (⏱️ {avg_time:.1f}ms médio)")
     
     with col_right:
@@ -201,81 +222,43 @@ with tab1:
         
         # Gráfico de tempo médio por usuário
         if not df_user_stats.empty:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            users = df_user_stats['user_id'].values
-            avg_times = df_user_stats['avg_execution_time'].values
-            
-            bars = ax.bar(range(len(users)), avg_times, color='lightcoral', alpha=0.8)
-            ax.set_xlabel('Usuários')
-            ax.set_ylabel('Tempo Médio (ms)')
-            ax.set_title('Tempo Médio de Execução por Usuário')
-            ax.set_xticks(range(len(users)))
-            ax.set_xticklabels(users, rotation=45)
-            
-            # Adicionar valores nas barras
-            for bar, time_val in zip(bars, avg_times):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                        f'{time_val:.1f}ms', ha='center', va='bottom')
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-            plt.close()
+            with instrumentation.span('chart.avg_time_by_user') as span:
+                span.record_chart(avg_time_chart)
+                st.image(avg_time_chart.result(), use_container_width=True)
         
         # Estatísticas de usuários
         st.subheader("📊 Resumo por Usuário")
         if not df_user_stats.empty:
             display_stats = df_user_stats[['user_id', 'total_operations', 'avg_execution_time', 'total_sum_results']].copy()
             display_stats['avg_execution_time'] = display_stats['avg_execution_time'].round(2)
-            display_stats.columns = ['Usuário', 'Operações', 'Tempo Médio (ms)', 'Soma Total']
+            display_stats['p95'] = display_stats['user_id'].map(backend.user_percentiles()['p95']).round(1)
+            display_stats.columns = ['Usuário', 'Operações', 'Tempo Médio (ms)', 'Soma Total', 'p95 (ms)']
             st.dataframe(display_stats, use_container_width=True)
 
-with tab2:
+with tab2, instrumentation.span('tab.temporal'):
+    hour_counts = df_filtered['hour_of_day'].value_counts().sort_index()
+    period_counts = df_filtered['day_period'].value_counts()
+    period_counts = period_counts[period_counts > 0]
+    hour_chart = renderer.submit(charts.operations_by_hour, hour_counts)
+    period_chart = renderer.submit(charts.operations_by_period, period_counts)
+    
     col_time1, col_time2 = st.columns(2)
     
     with col_time1:
         st.subheader("🕐 Distribuição por Hora do Dia")
         
         # Gráfico de distribuição por hora
-        hour_counts = df_filtered['hour_of_day'].value_counts().sort_index()
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
-        ax.plot(hour_counts.index, hour_counts.values, marker='o', linewidth=2, markersize=6)
-        ax.set_xlabel('Hora do Dia')
-        ax.set_ylabel('Número de Operações')
-        ax.set_title('Distribuição de Operações por Hora')
-        ax.set_xticks(range(0, 24, 2))
-        ax.grid(True, alpha=0.3)
-        
-        # Destacar picos
-        max_hour = hour_counts.idxmax()
-        max_count = hour_counts.max()
-        ax.annotate(f'Pico: {max_count} ops\nàs {max_hour}h', 
-                   xy=(max_hour, max_count), 
-                   xytext=(max_hour+2, max_count+1),
-                   arrowprops=dict(arrowstyle='->', color='red'))
-        
-        st.pyplot(fig)
-        plt.close()
+        with instrumentation.span('chart.operations_by_hour') as span:
+            span.record_chart(hour_chart)
+            st.image(hour_chart.result(), use_container_width=True)
     
     with col_time2:
         st.subheader("🌅 Distribuição por Período do Dia")
         
         # Gráfico de pizza - períodos do dia
-        period_counts = df_filtered['day_period'].value_counts()
-        
-        fig, ax = plt.subplots(figsize=(8, 8))
-        colors = ['#FFD700', '#FF6347', '#4169E1', '#2F4F4F']  # Cores para manhã, tarde, noite, madrugada
-        wedges, texts, autotexts = ax.pie(period_counts.values, 
-                                         labels=period_counts.index, 
-                                         autopct='%1.1f%%',
-                                         colors=colors,
-                                         startangle=90)
-        ax.set_title('Distribuição por Período do Dia')
-        
-        st.pyplot(fig)
-        plt.close()
+        with instrumentation.span('chart.operations_by_period') as span:
+            span.record_chart(period_chart)
+            st.image(period_chart.result(), use_container_width=True)
         
         # Estatísticas temporais
         st.subheader("📅 Estatísticas Temporais")
@@ -283,13 +266,58 @@ with tab2:
         for period, count in period_counts.items():
             percentage = (count / len(df_filtered)) * 100
             st.write(f"• {period}: {count} operações ({percentage:.1f}%)")
+    
+    # Histórico longo lido dos rollups (poucas linhas mesmo com semanas de dados)
+    st.subheader("📆 Histórico de Operações")
+    granularity_label = st.radio("Agrupar por:", ["Hora", "Minuto"], horizontal=True)
+    granularity = 'hour' if granularity_label == "Hora" else 'minute'
+    df_history, history_status = load_history('business_logs', granularity)
+    
+    if history_status != "OK":
+        st.error(f"❌ {history_status}")
+    elif df_history.empty:
+        st.info("Histórico ainda não disponível")
+    else:
+        with instrumentation.span('chart.history') as span:
+            history_chart = renderer.submit(charts.history, df_history, granularity_label)
+            span.record_chart(history_chart)
+            st.image(history_chart.result(), use_container_width=True)
 
-with tab3:
+with tab3, instrumentation.span('tab.logs_detalhados'):
     st.subheader("📋 Logs de Negócio Detalhados")
     
+    # Navegação pelo histórico: filtros aplicados no SQL, uma página por consulta
+    nav_col1, nav_col2, nav_col3 = st.columns(3)
+    with nav_col1:
+        since_date = st.date_input("Desde:", value=None)
+    with nav_col2:
+        until_date = st.date_input("Até:", value=None)
+    with nav_col3:
+        page_size_options = sorted({25, 50, 100, 200, config.page_size})
+        page_size = st.selectbox("Logs por página:", page_size_options,
+                                 index=page_size_options.index(config.page_size))
+    
+    since = pd.Timestamp(since_date) if since_date else None
+    until = pd.Timestamp(until_date) + pd.Timedelta(days=1) if until_date else None
+    
+    # Filtros mudaram: volta para a primeira página
+    page_filters = (tuple(selected_users), tuple(selected_periods), since, until, page_size)
+    if st.session_state.get('logs_page_filters') != page_filters:
+        st.session_state['logs_page_filters'] = page_filters
+        st.session_state['logs_cursors'] = [None]
+    cursors = st.session_state['logs_cursors']
+    
+    page, page_status = load_logs_page(tuple(selected_users), tuple(selected_periods),
+                                       since, until, cursors[-1], page_size)
+    if page_status != "OK":
+        st.error(f"❌ {page_status}")
+    df_page = page.rows if page is not None else pd.DataFrame()
+    
     # Preparar dados para exibição
-    if not df_filtered.empty:
-        display_df = df_filtered.copy()
+    if df_page.empty:
+        st.info("Nenhum log encontrado para os filtros selecionados")
+    else:
+        display_df = df_page.copy()
         display_df['Horário'] = display_df['timestamp'].dt.strftime('%H:%M:%S')
         display_df['Usuário'] = display_df['user_id']
         display_df['Operação'] = display_df['input_values']
@@ -303,25 +331,36 @@ with tab3:
         columns_to_show = ['Horário', 'Usuário', 'Operação', 'Resultado', 'Tempo (ms)', 'Período', 'IP', 'Status']
         st.dataframe(display_df[columns_to_show], use_container_width=True, height=400)
         
+        # Controles de página
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("⬅️ Anterior", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with page_col:
+            st.write(f"Página {len(cursors)} ({len(df_page)} logs)")
+        with next_col:
+            if st.button("Próxima ➡️", disabled=not page.has_next):
+                cursors.append(page.next_cursor)
+                st.rerun()
+        
         # Detalhes de log específico
         st.subheader("🔍 Detalhes do Log")
         
-        if len(df_filtered) > 0:
-            # Seletor de log
-            log_options = []
-            for _, row in df_filtered.iterrows():
-                label = f"{row['user_id']} - {row['input_values']} = {row['result_value']} ({row['timestamp'].strftime('%H:%M:%S')})"
-                log_options.append((row['id'], label))
+        if len(df_page) > 0:
+            # Seletor de log (rótulos id -> texto montados numa única passada)
+            log_labels = build_log_labels(df_page)
             
             selected_log_id = st.selectbox(
                 "Selecione um log:",
-                options=[log[0] for log in log_options],
-                format_func=lambda x: next(log[1] for log in log_options if log[0] == x)
+                options=list(log_labels),
+                format_func=log_labels.__getitem__
             )
             
-            if selected_log_id:
-                selected_log = df_filtered[df_filtered['id'] == selected_log_id].iloc[0]
-                
+            selected_log, detail_status = load_log_detail(selected_log_id) if selected_log_id else (None, "OK")
+            if detail_status != "OK":
+                st.error(f"❌ {detail_status}")
+            elif selected_log:
                 detail_col1, detail_col2 = st.columns(2)
                 
                 with detail_col1:
@@ -331,6 +370,8 @@ with tab3:
                     st.write(f"**🕐 Hora:** {selected_log['hour_of_day']}h")
                     st.write(f"**🌅 Período:** {selected_log['day_period']}")
                     st.write(f"**🔗 Operation ID:** {selected_log['operation_id']}")
+                    if 'replica' in selected_log:
+                        st.write(f"**🖥️ Réplica:** {selected_log['replica']}")
                 
                 with detail_col2:
                     st.write(f"**⚙️ Operação:** {selected_log['input_values']}")
@@ -341,26 +382,37 @@ with tab3:
                     st.write(f"**🔍 Trace ID:** `{selected_log['trace_id'][:16]}...`")
                 
                 st.write(f"**💬 Mensagem:** {selected_log['message']}")
+                
+                # Operação correspondente na tabela operations
+                if selected_log['span_id'] is not None:
+                    st.write(f"**🧮 Operação registrada:** {selected_log['input_a']} + {selected_log['input_b']} = "
+                             f"{selected_log['operation_result']} em {selected_log['operation_execution_time_ms']} ms "
+                             f"(span `{selected_log['span_id']}`, {selected_log['operation_timestamp']})")
+                else:
+                    st.write("**🧮 Operação registrada:** não encontrada na tabela operations")
 
-with tab4:
+with tab4, instrumentation.span('tab.estatisticas'):
     st.subheader("📈 Estatísticas Avançadas")
     
     col_stat1, col_stat2 = st.columns(2)
     
     with col_stat1:
         st.write("**📊 Resumo Geral:**")
-        st.write(f"• Total de logs: {len(df_logs)}")
-        st.write(f"• Usuários únicos: {df_logs['user_id'].nunique()}")
-        st.write(f"• Período mais ativo: {df_logs['day_period'].value_counts().index[0]}")
-        st.write(f"• Resultado médio: {df_logs['result_value'].mean():.2f}")
-        st.write(f"• Tempo médio: {df_logs['execution_time_ms'].mean():.2f} ms")
+        st.write(f"• Total de logs: {summary.total_operations}")
+        st.write(f"• Usuários únicos: {unique_users}")
+        st.write(f"• Período mais ativo: {summary.peak_period[0]}")
+        st.write(f"• Resultado médio: {summary.avg_result:.2f}")
+        st.write(f"• Tempo médio: {summary.avg_execution_time:.2f} ms")
+        
+        st.write("**⏱️ Latência:**")
+        for name, value in backend.latency('business_logs')['percentiles'].items():
+            st.write(f"• {name}: {value:.1f} ms")
         
         st.write("**⏰ Por Hora:**")
-        busiest_hour = df_logs['hour_of_day'].value_counts().index[0]
-        busiest_count = df_logs['hour_of_day'].value_counts().iloc[0]
+        busiest_hour, busiest_count = summary.busiest_hour
         st.write(f"• Hora mais movimentada: {busiest_hour}h ({busiest_count} operações)")
         
-        quietest_hours = df_logs['hour_of_day'].value_counts().tail(3)
+        quietest_hours = summary.quietest_hours(3)
         st.write("• Horas mais calmas:")
         for hour, count in quietest_hours.items():
             st.write(f"  - {hour}h: {count} operações")
@@ -369,22 +421,117 @@ with tab4:
         st.write("**🎯 Análise de Comportamento:**")
         
         # Usuário mais produtivo
-        most_productive = df_logs.groupby('user_id')['result_value'].sum().sort_values(ascending=False)
-        st.write(f"• Usuário com maior soma total: **{most_productive.index[0]}** ({most_productive.iloc[0]})")
+        top_sum_user, top_sum = summary.top_sum_user
+        st.write(f"• Usuário com maior soma total: **{top_sum_user}** ({top_sum})")
         
         # Usuário mais rápido
-        fastest_user = df_logs.groupby('user_id')['execution_time_ms'].mean().sort_values()
-        st.write(f"• Usuário mais rápido: **{fastest_user.index[0]}** ({fastest_user.iloc[0]:.1f}ms médio)")
+        fastest_user, fastest_time = summary.fastest_user
+        st.write(f"• Usuário mais rápido: **{fastest_user}** ({fastest_time:.1f}ms médio)")
         
         # Análise temporal por usuário
         st.write("**📅 Padrões de Uso:**")
-        user_periods = df_logs.groupby(['user_id', 'day_period']).size().unstack(fill_value=0)
-        
-        for user in user_periods.index[:3]:  # Top 3 usuários
-            preferred_period = user_periods.loc[user].idxmax()
-            period_count = user_periods.loc[user].max()
+        for user, preferred_period, period_count in summary.preferred_periods(3):  # Top 3 usuários
             st.write(f"• **{user}**: prefere {preferred_period} ({period_count} ops)")
 
+with tab5, instrumentation.span('tab.traces'):
+    st.subheader("🔗 Explorador de Traces")
+    
+    # Índice trace_id -> linhas mantido a cada delta: a busca não junta as tabelas
+    trace_counts = backend.trace_counts()
+    st.caption(f"{trace_counts['operations']} traces em operations, "
+               f"{trace_counts['business_logs']} em business_logs")
+    
+    search_col, recent_col = st.columns(2)
+    with search_col:
+        trace_query = st.text_input("Trace ID ou Operation ID:")
+    with recent_col:
+        recent_trace = st.selectbox("Ou um trace recente:", options=backend.recent_traces(), index=None,
+                                    format_func=lambda trace_id: f"{trace_id[:16]}...")
+    
+    trace_key = trace_query.strip() or recent_trace
+    if trace_key:
+        trace, trace_status = find_trace(trace_key)
+        if trace_status != "OK":
+            st.error(f"❌ {trace_status}")
+        elif trace is None:
+            st.warning(f"⚠️ Nenhum trace ou operação com id `{trace_key}`")
+        else:
+            st.write(f"**🔍 Trace ID:** `{trace.trace_id}`")
+            trace_ops, trace_logs = trace.operations, trace.business_logs
+            
+            ops_col, logs_col = st.columns(2)
+            with ops_col:
+                st.write(f"**🧮 Operações ({len(trace_ops)})**")
+                if trace_ops.empty:
+                    st.info("Nenhuma linha em operations para este trace")
+                else:
+                    ops_display = pd.DataFrame({
+                        'Horário': trace_ops['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+                        'Operação': (trace_ops['input_a'].astype(str) + ' + ' + trace_ops['input_b'].astype(str)
+                                     + ' = ' + trace_ops['result'].astype(str)),
+                        'Tempo (ms)': trace_ops['execution_time_ms'],
+                        'Span': trace_ops['span_id'],
+                        'Operation ID': trace_ops['id'],
+                    })
+                    st.dataframe(ops_display, hide_index=True, use_container_width=True)
+            
+            with logs_col:
+                st.write(f"**📋 Logs de negócio ({len(trace_logs)})**")
+                if trace_logs.empty:
+                    st.info("Nenhuma linha em business_logs para este trace")
+                else:
+                    logs_display = pd.DataFrame({
+                        'Horário': trace_logs['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+                        'Usuário': trace_logs['user_id'],
+                        'Operação': trace_logs['input_a'].astype(str) + ' + ' + trace_logs['input_b'].astype(str),
+                        'Resultado': trace_logs['result_value'],
+                        'Tempo (ms)': trace_logs['execution_time_ms'],
+                        'Status': trace_logs['status'],
+                        'IP': trace_logs['ip_address'],
+                    })
+                    st.dataframe(logs_display, hide_index=True, use_container_width=True)
+
+with tab6, instrumentation.span('tab.anomalias'):
+    st.subheader("🚨 Tempos de Execução Anômalos")
+    st.caption("Operações acima de 3,5 desvios da média móvel (EWMA) do usuário ou da hora do dia, "
+               "calculadas a cada lote de logs novos")
+    
+    anomaly_col1, anomaly_col2, anomaly_col3 = st.columns(3)
+    with anomaly_col1:
+        st.metric("Anomalias (total)", anomalies['total_flagged'])
+    with anomaly_col2:
+        st.metric("Última hora", len(recent_anomalies))
+    with anomaly_col3:
+        flagged_rate = anomalies['total_flagged'] / anomalies['rows_seen'] if anomalies['rows_seen'] else 0
+        st.metric("Taxa", f"{flagged_rate:.2%}")
+    
+    flagged_logs = anomalies['flagged']
+    if flagged_logs.empty:
+        st.info("Nenhuma operação anômala detectada")
+    else:
+        anomalies_display = pd.DataFrame({
+            'Horário': flagged_logs['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'Usuário': flagged_logs['user_id'],
+            'Hora': flagged_logs['hour_of_day'],
+            'Tempo (ms)': flagged_logs['execution_time_ms'],
+            'Média Usuário (ms)': flagged_logs['mean_user_id'].round(1),
+            'z Usuário': flagged_logs['z_user_id'].round(1),
+            'Média Hora (ms)': flagged_logs['mean_hour_of_day'].round(1),
+            'z Hora': flagged_logs['z_hour_of_day'].round(1),
+            'Trace ID': flagged_logs['trace_id'],
+        })
+        st.dataframe(anomalies_display, hide_index=True, use_container_width=True, height=400)
+    
+    # Linha de base atual de cada usuário (o que o detector considera normal)
+    st.subheader("📏 Linha de Base por Usuário")
+    user_baselines = anomalies['baselines'].copy()
+    if not user_baselines.empty:
+        user_baselines = user_baselines.sort_values('mean', ascending=False)
+        user_baselines.columns = ['Usuário', 'Média EWMA (ms)', 'Desvio (ms)', 'Operações']
+        st.dataframe(user_baselines.round(2), hide_index=True, use_container_width=True)
+
+run.mark('abas')
+
 # Rodapé
 st.markdown("---")
 footer_col1, footer_col2, footer_col3 = st.columns(3)
@@ -395,20 +542,29 @@ with footer_col1:
 with footer_col2:
     if st.button("🔄 Atualizar Dados"):
         st.cache_data.clear()
+        get_backend().refresh()
         st.rerun()
 
 with footer_col3:
-    if not df_logs.empty:
-        st.success(f"✅ {len(df_logs)} logs de negócio carregados")
+    st.success(f"✅ {summary.total_operations} logs de negócio carregados")
 
 # Informações na sidebar
 st.sidebar.markdown("---")
 st.sidebar.subheader("ℹ️ Informações")
 st.sidebar.write(f"**Banco:** business_logs")
-st.sidebar.write(f"**Registros:** {len(df_logs) if not df_logs.empty else 0}")
+replicas_status(backend)
+config_status()
+st.sidebar.write(f"**Registros:** {summary.total_operations}")
+memory_total, memory_per_row = load_memory_usage()
+st.sidebar.write(f"**Memória:** {memory_total / 1024**2:.1f} MB ({memory_per_row:.0f} bytes/log)")
 
-if not df_logs.empty:
-    first_log = df_logs['timestamp'].min()
-    last_log = df_logs['timestamp'].max()
+if not summary.empty:
+    first_log = summary.first_operation
+    last_log = summary.last_operation
     st.sidebar.write(f"**Primeiro log:** {first_log.strftime('%H:%M:%S')}")
-    st.sidebar.write(f"**Último log:** {last_log.strftime('%H:%M:%S')}")
\ No newline at end of file
+    st.sidebar.write(f"**Último log:** {last_log.strftime('%H:%M:%S')}")
+
+instrumentation_panel(instrumentation)
+
+# Cold start e reruns deste painel contra o orçamento da configuração
+profiler_panel('business_logs_dashboard', run)
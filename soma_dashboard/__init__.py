@@ -0,0 +1 @@
+"""Camada de dados compartilhada pelos painéis Streamlit da Soma API."""
@@ -0,0 +1,193 @@
+"""Agregações do painel de negócio calculadas direto no SQLite.
+
+Os cards de métricas, o "Top Usuários", a aba de estatísticas e os padrões
+de uso por período só precisam de contagens e médias; ``GROUP BY`` no banco
+devolve algumas dezenas de linhas em vez de materializar a tabela inteira.
+"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from soma_dashboard.pool import read_connection
+
+TOTALS_QUERY = """
+SELECT
+    COUNT(*) as total_operations,
+    COUNT(DISTINCT user_id) as unique_users,
+    AVG(result_value) as avg_result,
+    AVG(execution_time_ms) as avg_execution_time,
+    MIN(timestamp) as first_operation,
+    MAX(timestamp) as last_operation
+FROM business_logs
+"""
+
+USER_STATS_QUERY = """
+SELECT
+    user_id,
+    COUNT(*) as total_operations,
+    AVG(execution_time_ms) as avg_execution_time,
+    SUM(result_value) as total_sum_results,
+    MIN(timestamp) as first_operation,
+    MAX(timestamp) as last_operation
+FROM business_logs
+GROUP BY user_id
+ORDER BY total_operations DESC, user_id
+"""
+
+HOUR_COUNTS_QUERY = """
+SELECT hour_of_day, COUNT(*) as operations
+FROM business_logs
+GROUP BY hour_of_day
+ORDER BY operations DESC, hour_of_day
+"""
+
+PERIOD_COUNTS_QUERY = """
+SELECT day_period, COUNT(*) as operations
+FROM business_logs
+GROUP BY day_period
+ORDER BY operations DESC, day_period
+"""
+
+USER_PERIOD_QUERY = """
+SELECT user_id, day_period, COUNT(*) as operations
+FROM business_logs
+GROUP BY user_id, day_period
+"""
+
+
+@dataclass(frozen=True)
+class BusinessSummary:
+    """Resultado único das agregações, lido pelos cards e abas do painel."""
+
+    total_operations: int
+    unique_users: int
+    avg_result: float
+    avg_execution_time: float
+    first_operation: pd.Timestamp
+    last_operation: pd.Timestamp
+    user_stats: pd.DataFrame      # uma linha por usuário, mais ativos primeiro
+    hour_counts: pd.Series        # operações por hora, mais movimentadas primeiro
+    period_counts: pd.Series      # operações por período, pico primeiro
+    user_periods: pd.DataFrame    # usuário x período
+
+    @property
+    def empty(self):
+        return self.total_operations == 0
+
+    @property
+    def most_active_user(self):
+        row = self.user_stats.iloc[0]
+        return row['user_id'], int(row['total_operations'])
+
+    @property
+    def peak_period(self):
+        return self.period_counts.index[0], int(self.period_counts.iloc[0])
+
+    @property
+    def busiest_hour(self):
+        return int(self.hour_counts.index[0]), int(self.hour_counts.iloc[0])
+
+    def quietest_hours(self, n=3):
+        return self.hour_counts.tail(n)
+
+    @property
+    def top_sum_user(self):
+        row = self.user_stats.loc[self.user_stats['total_sum_results'].idxmax()]
+        return row['user_id'], row['total_sum_results']
+
+    @property
+    def fastest_user(self):
+        row = self.user_stats.loc[self.user_stats['avg_execution_time'].idxmin()]
+        return row['user_id'], row['avg_execution_time']
+
+    def avg_execution_time_for(self, user_id):
+        return self.user_stats.set_index('user_id')['avg_execution_time'].get(user_id)
+
+    def preferred_periods(self, n=3):
+        # Período preferido dos n usuários mais ativos
+        users = [u for u in self.user_stats['user_id'].head(n) if u in self.user_periods.index]
+        periods = self.user_periods.loc[users]
+        return [(user, periods.loc[user].idxmax(), int(periods.loc[user].max())) for user in users]
+
+
+def load_business_summary(db_path):
+    with read_connection(db_path) as conn:
+        # Uma única transação de leitura: todas as agregações veem o mesmo snapshot
+        conn.execute("BEGIN")
+
+        totals = conn.execute(TOTALS_QUERY).fetchone()
+        user_stats = pd.read_sql_query(USER_STATS_QUERY, conn)
+        hour_counts = pd.read_sql_query(HOUR_COUNTS_QUERY, conn)
+        period_counts = pd.read_sql_query(PERIOD_COUNTS_QUERY, conn)
+        user_periods = pd.read_sql_query(USER_PERIOD_QUERY, conn)
+
+        conn.rollback()
+
+    total_operations, unique_users, avg_result, avg_execution_time, first_op, last_op = totals
+
+    return BusinessSummary(
+        total_operations=total_operations,
+        unique_users=unique_users,
+        avg_result=avg_result or 0.0,
+        avg_execution_time=avg_execution_time or 0.0,
+        first_operation=pd.to_datetime(first_op),
+        last_operation=pd.to_datetime(last_op),
+        user_stats=user_stats,
+        hour_counts=hour_counts.set_index('hour_of_day')['operations'],
+        period_counts=period_counts.set_index('day_period')['operations'],
+        user_periods=user_periods.pivot_table(
+            index='user_id', columns='day_period', values='operations', fill_value=0
+        ),
+    )
+
+
+def _weighted_mean(values, weights):
+    total = weights.sum()
+    return float((values.fillna(0) * weights).sum() / total) if total else 0.0
+
+
+def _sorted_counts(counts):
+    # Mesma ordem das consultas: mais operações primeiro, empate pela chave
+    return counts.sort_index().sort_values(ascending=False, kind='stable')
+
+
+def merge_summaries(summaries):
+    """Junta os resumos de vários bancos (réplicas) como se fossem um só.
+
+    Contagens e somas somam, médias são ponderadas pelas operações de cada
+    banco e ``unique_users`` sai da união de ``user_stats`` — exato, sem
+    contar duas vezes o usuário que passou por mais de uma réplica.
+    """
+    summaries = list(summaries)
+    if len(summaries) == 1:
+        return summaries[0]
+
+    totals = pd.Series([s.total_operations for s in summaries], dtype=float)
+    stats = pd.concat([s.user_stats for s in summaries], ignore_index=True)
+    stats['execution_time_total'] = stats['avg_execution_time'] * stats['total_operations']
+    user_stats = stats.groupby('user_id', as_index=False).agg(
+        total_operations=('total_operations', 'sum'),
+        execution_time_total=('execution_time_total', 'sum'),
+        total_sum_results=('total_sum_results', 'sum'),
+        first_operation=('first_operation', 'min'),
+        last_operation=('last_operation', 'max'),
+    )
+    user_stats.insert(2, 'avg_execution_time',
+                      user_stats.pop('execution_time_total') / user_stats['total_operations'])
+    user_stats = user_stats.sort_values(['total_operations', 'user_id'], ascending=[False, True],
+                                        ignore_index=True)
+
+    firsts = [s.first_operation for s in summaries if not pd.isna(s.first_operation)]
+    lasts = [s.last_operation for s in summaries if not pd.isna(s.last_operation)]
+    return BusinessSummary(
+        total_operations=int(totals.sum()),
+        unique_users=len(user_stats),
+        avg_result=_weighted_mean(pd.Series([s.avg_result for s in summaries]), totals),
+        avg_execution_time=_weighted_mean(pd.Series([s.avg_execution_time for s in summaries]), totals),
+        first_operation=min(firsts) if firsts else pd.NaT,
+        last_operation=max(lasts) if lasts else pd.NaT,
+        user_stats=user_stats,
+        hour_counts=_sorted_counts(pd.concat([s.hour_counts for s in summaries]).groupby(level=0).sum()),
+        period_counts=_sorted_counts(pd.concat([s.period_counts for s in summaries]).groupby(level=0).sum()),
+        user_periods=pd.concat([s.user_periods for s in summaries]).fillna(0).groupby(level=0).sum(),
+    )
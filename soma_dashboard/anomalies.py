@@ -0,0 +1,209 @@
+"""Detecção contínua de tempos de execução anômalos.
+
+Cada ``EwmaDetector`` mantém, por chave (``user_id`` ou ``hour_of_day``),
+uma média exponencial (EWMA) de ``execution_time_ms`` e do seu quadrado —
+de onde sai o desvio padrão — e o número de linhas vistas: três números
+por chave, não importa quantas operações cheguem. Uma operação é anômala
+quando fica ``threshold`` desvios acima da média que a chave tinha *antes*
+dela (z-score), depois de ``warmup`` operações da chave.
+
+O ``AnomalyMonitor`` é listener do ``LogStore`` de ``business_logs``: cada
+delta é pontuado de uma vez com ``groupby().ewm()`` do pandas, com o
+estado anterior de cada chave entrando como a primeira linha do grupo —
+o resultado é o mesmo da recorrência linha a linha, sem laço em Python.
+As últimas ``max_flagged`` operações sinalizadas ficam guardadas para a
+aba de anomalias e para os deltas dos cards.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_THRESHOLD = 3.5
+DEFAULT_WARMUP = 30
+DEFAULT_MIN_STD_MS = 1.0
+DEFAULT_MAX_FLAGGED = 500
+
+# Colunas guardadas de cada operação sinalizada
+FLAGGED_COLUMNS = ['id', 'timestamp', 'user_id', 'hour_of_day', 'execution_time_ms', 'trace_id']
+
+
+class EwmaDetector:
+    """EWMA/z-score de ``value_column`` por ``key_column``, atualizado por lotes."""
+
+    def __init__(self, key_column, value_column='execution_time_ms', alpha=DEFAULT_ALPHA,
+                 threshold=DEFAULT_THRESHOLD, warmup=DEFAULT_WARMUP, min_std=DEFAULT_MIN_STD_MS):
+        self.key_column = key_column
+        self.value_column = value_column
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        # Tempos quase constantes dão desvio ~0: o piso evita sinalizar 1 ms de diferença
+        self.min_std = min_std
+        self.reset()
+
+    def reset(self):
+        self._state = {}     # chave -> (média, média dos quadrados, linhas vistas)
+
+    def score(self, delta):
+        """Pontua as linhas do delta (em ordem) e atualiza o estado.
+
+        Retorna um DataFrame alinhado ao delta com a média e o desvio da
+        chave antes de cada linha, o z-score e ``flagged``. Linhas sem
+        chave (ex.: ``user_id`` NULL) não têm linha de base: ficam com
+        NaN e nunca são sinalizadas.
+        """
+        valid = delta[self.key_column].notna().to_numpy()
+        if not valid.all():
+            scores = pd.DataFrame({'mean': np.nan, 'std': np.nan, 'z': np.nan, 'flagged': False},
+                                  index=delta.index)
+            if valid.any():
+                scored = self.score(delta[valid])
+                for column in scores.columns:
+                    scores.loc[valid, column] = scored[column].to_numpy()
+            return scores
+
+        values = delta[self.value_column].to_numpy(dtype=float)
+        keys = pd.Series(delta[self.key_column].to_numpy(dtype=object))
+        frame = pd.DataFrame({'key': keys, 'x': values, 'x2': values ** 2, 'order': np.arange(len(delta))})
+
+        # Estado anterior de cada chave como a primeira linha do seu grupo
+        seeds = [(key, *self._state[key][:2]) for key in keys.unique() if key in self._state]
+        seed_frame = pd.DataFrame(seeds, columns=['key', 'x', 'x2'])
+        seed_frame['order'] = -1
+        combined = pd.concat([seed_frame, frame], ignore_index=True)
+        combined = combined.sort_values(['key', 'order'], kind='stable')
+
+        grouped = combined.groupby('key', sort=False)
+        smoothed = grouped[['x', 'x2']].ewm(alpha=self.alpha, adjust=False).mean().droplevel(0)
+        smoothed = smoothed.loc[combined.index]
+        previous = smoothed.groupby(combined['key'], sort=False).shift(1)
+
+        # De volta à ordem do delta, sem as linhas de estado
+        rows = combined['order'].to_numpy() >= 0
+        order = combined['order'].to_numpy()[rows]
+        prev_mean = np.empty(len(delta))
+        prev_mean_sq = np.empty(len(delta))
+        prev_mean[order] = previous['x'].to_numpy()[rows]
+        prev_mean_sq[order] = previous['x2'].to_numpy()[rows]
+
+        seen_before = keys.map({key: state[2] for key, state in self._state.items()}).fillna(0).to_numpy()
+        seen_before = seen_before + frame.groupby('key', sort=False).cumcount().to_numpy()
+
+        std = np.sqrt(np.clip(prev_mean_sq - prev_mean ** 2, 0, None))
+        z = (values - prev_mean) / np.maximum(std, self.min_std)
+        flagged = (seen_before >= self.warmup) & (z > self.threshold)
+
+        # Novo estado: último valor suavizado de cada grupo e linhas acumuladas
+        last = smoothed.groupby(combined['key'], sort=False).last()
+        counts = keys.value_counts()
+        for key, row in last.iterrows():
+            seen = self._state.get(key, (0, 0, 0))[2] + int(counts.get(key, 0))
+            self._state[key] = (row['x'], row['x2'], seen)
+
+        return pd.DataFrame({
+            'mean': prev_mean,
+            'std': std,
+            'z': z,
+            'flagged': flagged,
+        }, index=delta.index)
+
+    def baselines(self):
+        """Média, desvio e linhas vistas de cada chave."""
+        if not self._state:
+            return pd.DataFrame(columns=['key', 'mean', 'std', 'count'])
+        keys = list(self._state)
+        mean, mean_sq, count = (np.array(column) for column in zip(*self._state.values()))
+        return pd.DataFrame({
+            'key': keys,
+            'mean': mean,
+            'std': np.sqrt(np.clip(mean_sq - mean ** 2, 0, None)),
+            'count': count.astype(int),
+        })
+
+
+class AnomalyMonitor:
+    """Aplica os detectores a cada delta e guarda as últimas operações sinalizadas."""
+
+    def __init__(self, detectors, max_flagged=DEFAULT_MAX_FLAGGED):
+        self.detectors = list(detectors)
+        self.max_flagged = max_flagged
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        for detector in self.detectors:
+            detector.reset()
+        self._flagged = pd.DataFrame()
+        self.total_flagged = 0
+        self.rows_seen = 0
+        self.latest_timestamp = None
+
+    def update(self, delta):
+        if delta.empty:
+            return
+        with self._lock:
+            if delta.index[0] == 0:
+                # Store recomeçou (banco recriado) ou reenvia tudo depois de uma falha deste listener
+                self.reset()
+
+            scores = {detector.key_column: detector.score(delta) for detector in self.detectors}
+            flagged = np.logical_or.reduce([score['flagged'].to_numpy() for score in scores.values()])
+            self.rows_seen += len(delta)
+            self.latest_timestamp = delta['timestamp'].max()
+            if not flagged.any():
+                return
+
+            rows = delta.loc[flagged, [column for column in FLAGGED_COLUMNS if column in delta]].copy()
+            for key_column, score in scores.items():
+                rows[f'mean_{key_column}'] = score['mean'].to_numpy()[flagged]
+                rows[f'z_{key_column}'] = score['z'].to_numpy()[flagged]
+            self.total_flagged += len(rows)
+            self._flagged = pd.concat([self._flagged, rows]).tail(self.max_flagged)
+
+    def flagged(self):
+        """Operações sinalizadas guardadas, mais recentes primeiro."""
+        with self._lock:
+            return self._flagged.iloc[::-1].copy()
+
+    def recent(self, window=pd.Timedelta(hours=1)):
+        """Sinalizadas na última ``window`` dos dados (relativa à linha mais nova)."""
+        with self._lock:
+            if self._flagged.empty or self.latest_timestamp is None:
+                return self._flagged.iloc[0:0].copy()
+            return self._flagged[self._flagged['timestamp'] > self.latest_timestamp - window].copy()
+
+    def baselines(self, key_column):
+        with self._lock:
+            for detector in self.detectors:
+                if detector.key_column == key_column:
+                    return detector.baselines()
+        raise KeyError(key_column)
+
+
+def merge_baselines(frames):
+    """Junta as linhas de base de vários monitores (ex.: um por réplica).
+
+    Cada réplica tem a sua EWMA por chave; a linha de base combinada pondera
+    média e segundo momento pelas linhas vistas em cada uma.
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if len(frames) <= 1:
+        return frames[0] if frames else pd.DataFrame(columns=['key', 'mean', 'std', 'count'])
+
+    df = pd.concat(frames, ignore_index=True)
+    weights = df['count'].astype(float)
+    df = df.assign(
+        weighted_mean=df['mean'] * weights,
+        weighted_mean_sq=(df['std'] ** 2 + df['mean'] ** 2) * weights,
+    )
+    merged = df.groupby('key', as_index=False, sort=False)[['weighted_mean', 'weighted_mean_sq', 'count']].sum()
+    count = merged['count'].astype(float).where(merged['count'] > 0)
+    mean = merged['weighted_mean'] / count
+    return pd.DataFrame({
+        'key': merged['key'],
+        'mean': mean,
+        'std': np.sqrt(np.clip(merged['weighted_mean_sq'] / count - mean ** 2, 0, None)),
+        'count': merged['count'].astype(int),
+    })
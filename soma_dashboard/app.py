@@ -0,0 +1,192 @@
+"""Configuração e recursos compartilhados pelos dois painéis Streamlit.
+
+Os scripts repetiam o caminho do banco, o backend, o renderizador de
+gráficos, a instrumentação e os blocos da sidebar; agora importam tudo
+daqui. ``st.cache_resource`` guarda um objeto por processo do Streamlit, e
+os dois painéis abertos no mesmo servidor usam o mesmo backend.
+
+A configuração vem de um arquivo TOML opcional (``SOMA_DASHBOARD_CONFIG``,
+seção ``[dashboard]``) e de variáveis de ambiente, que têm precedência::
+
+    [dashboard]
+    db_path = "/dados/replica-*/soma_logs.db"
+    refresh_interval = 10
+    max_records = 50
+
+    SOMA_DASHBOARD_DB=/dados/soma_logs.db SOMA_DASHBOARD_REFRESH_INTERVAL=10 streamlit run ...
+
+Cada campo de ``DashboardConfig`` lê ``SOMA_DASHBOARD_<CAMPO>`` (o caminho
+do banco continua em ``SOMA_DASHBOARD_DB``). Um valor inválido não impede
+o painel de subir: o campo fica com o padrão e o problema aparece na
+sidebar (``config.errors``).
+"""
+import os
+from dataclasses import dataclass, field, fields
+
+import streamlit as st
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover - Python < 3.11
+    tomllib = None
+
+from soma_dashboard import profiler
+from soma_dashboard.backend import open_backend
+from soma_dashboard.charts import ChartRenderer
+from soma_dashboard.instrumentation import Instrumentation
+
+ENV_PREFIX = 'SOMA_DASHBOARD_'
+CONFIG_ENV = 'SOMA_DASHBOARD_CONFIG'
+DEFAULT_DB_PATH = '/workspaces/opentelemetryexample/soma-api/target/soma_logs.db'
+
+
+@dataclass(frozen=True)
+class DashboardConfig:
+    # Um banco, um glob ou uma lista separada por os.pathsep (um banco por réplica)
+    db_path: str = field(default=DEFAULT_DB_PATH, metadata={'env': 'SOMA_DASHBOARD_DB'})
+    # Segundos: leitura dos deltas, auto-refresh e TTL das cargas em cache
+    refresh_interval: float = 5.0
+    # Teto do slider "Registros" (cada painel tem o seu máximo, até este valor)
+    max_records: int = 100
+    # Logs por página pré-selecionados nos "Logs Detalhados"
+    page_size: int = 50
+    chart_cache_entries: int = 64
+    chart_workers: int = 4
+    # Orçamentos do soma_dashboard.profiler
+    cold_start_budget_ms: float = 5000.0
+    rerun_budget_ms: float = 1000.0
+    # Problemas encontrados na leitura (os campos afetados ficam com o padrão)
+    errors: tuple = field(default=(), compare=False, metadata={'option': False})
+
+    @classmethod
+    def options(cls):
+        return [config_field for config_field in fields(cls) if config_field.metadata.get('option', True)]
+
+    @classmethod
+    def load(cls, environ=None, strict=False):
+        """Arquivo de ``SOMA_DASHBOARD_CONFIG`` (se houver) + variáveis de ambiente.
+
+        Opções desconhecidas, valores de tipo errado e um arquivo ilegível
+        vão para ``errors``; com ``strict`` levantam ``ValueError``.
+        """
+        environ = os.environ if environ is None else environ
+        errors = []
+        values = {}
+        path = environ.get(CONFIG_ENV)
+        if path:
+            try:
+                values.update(_read_config_file(path))
+            except (OSError, RuntimeError, ValueError) as e:
+                errors.append(f"{CONFIG_ENV}={path}: {e}")
+
+        options = cls.options()
+        for config_field in options:
+            env = config_field.metadata.get('env', f"{ENV_PREFIX}{config_field.name.upper()}")
+            if environ.get(env):
+                values[config_field.name] = environ[env]
+
+        unknown = set(values) - {config_field.name for config_field in options}
+        if unknown:
+            errors.append(f"Opção(ões) desconhecida(s) na configuração: {', '.join(sorted(unknown))}")
+        typed = {}
+        for config_field in options:
+            if config_field.name in values:
+                value = values[config_field.name]
+                try:
+                    typed[config_field.name] = _convert(value, type(config_field.default))
+                except (TypeError, ValueError):
+                    errors.append(f"Valor inválido para {config_field.name}: {value!r} "
+                                  f"(esperado {type(config_field.default).__name__}; usando {config_field.default!r})")
+
+        if errors and strict:
+            raise ValueError('; '.join(errors))
+        return cls(**typed, errors=tuple(errors))
+
+    def records_limit(self, maximum):
+        """Máximo do slider "Registros" de um painel, respeitando ``max_records``."""
+        return max(1, min(maximum, self.max_records))
+
+
+def _convert(value, kind):
+    # true/false no TOML viraria 1/0 em int(); texto vem das variáveis de ambiente
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise TypeError(type(value).__name__)
+    return kind(value)
+
+
+def _read_config_file(path):
+    if tomllib is None:
+        raise RuntimeError("Arquivo de configuração TOML exige Python 3.11+")
+    with open(path, 'rb') as f:
+        return tomllib.load(f).get('dashboard', {})
+
+
+# Lida uma vez por processo: mudar a configuração pede reiniciar o Streamlit
+config = DashboardConfig.load()
+
+
+# Stores, sketches, rollups e consultas num só objeto compartilhado entre sessões (e painéis);
+# com SOMA_DASHBOARD_SERVICE definida, o mesmo acesso vai para o soma_dashboard.service
+@st.cache_resource
+def get_backend():
+    # Snapshots colunares ao lado de cada banco: cold start lê o arquivo e só o delta do SQLite
+    return open_backend(config.db_path, refresh_interval=config.refresh_interval)
+
+
+# Renderizador de gráficos com cache de PNG compartilhado entre sessões; o matplotlib
+# só é importado (nas threads do renderizador) quando o primeiro gráfico é pedido
+@st.cache_resource
+def get_chart_renderer():
+    return ChartRenderer(max_entries=config.chart_cache_entries, max_workers=config.chart_workers)
+
+
+# Spans/métricas do próprio painel (desligado sem SOMA_DASHBOARD_OTEL)
+@st.cache_resource
+def get_instrumentation(service_name):
+    return Instrumentation.from_env(service_name)
+
+
+# Blocos da sidebar comuns aos dois painéis
+
+def config_status():
+    for error in config.errors:
+        st.sidebar.warning(f"⚙️ {error}")
+
+
+def replicas_status(backend, show_single=False):
+    replicas = backend.replicas()
+    if len(replicas) == 1:
+        if show_single:
+            st.sidebar.write(f"**Banco existe:** {next(iter(replicas.values()))}")
+    else:
+        st.sidebar.write(f"**Réplicas:** {sum(replicas.values())}/{len(replicas)} bancos encontrados")
+
+
+def instrumentation_panel(instrumentation):
+    # Custo do próprio painel (só com SOMA_DASHBOARD_OTEL definida)
+    if not instrumentation.enabled:
+        return
+    with st.sidebar.expander("📡 Instrumentação"):
+        st.dataframe(instrumentation.summary(), hide_index=True, use_container_width=True)
+        if instrumentation.exporting:
+            st.caption(f"Exportando spans e métricas para: {instrumentation.exporter}")
+        else:
+            st.caption("opentelemetry-sdk não instalado: só o resumo local")
+
+
+def profiler_panel(name, run):
+    """Fecha o run e mostra cold start e reruns contra o orçamento."""
+    dashboard_profiler = profiler.get(name)
+    dashboard_profiler.finish(run)
+    summary = dashboard_profiler.summary(config.cold_start_budget_ms, config.rerun_budget_ms)
+
+    with st.sidebar.expander("⏱️ Tempo de carga"):
+        if summary['cold_ms'] is not None:
+            icon = "✅" if summary['cold_ok'] else "⚠️"
+            st.write(f"{icon} **Cold start:** {summary['cold_ms']:.0f} ms "
+                     f"(orçamento {config.cold_start_budget_ms:.0f} ms)")
+        if summary['reruns']:
+            icon = "✅" if summary['rerun_ok'] else "⚠️"
+            st.write(f"{icon} **Reruns:** p50 {summary['rerun_p50_ms']:.0f} ms, "
+                     f"p95 {summary['rerun_p95_ms']:.0f} ms (orçamento {config.rerun_budget_ms:.0f} ms)")
+        st.dataframe(dashboard_profiler.stages(), hide_index=True, use_container_width=True)
@@ -0,0 +1,236 @@
+"""Partições arquivadas de ``operations`` e ``business_logs``.
+
+O ``soma_dashboard.retention`` tira do soma_logs.db as linhas mais antigas
+que a janela de retenção e as grava aqui, um diretório por tabela e por
+dia (UTC, como o ``CURRENT_TIMESTAMP``)::
+
+    archive/business_logs/date=2026-09-01/part-000000001234-000000006233.parquet
+
+Cada arquivo tem as linhas cruas de um lote (todas as colunas, valores
+como estavam no SQLite), e o nome traz o intervalo da chave (``id`` ou
+``rowid``) — o detalhe de um log abre só a parte que pode contê-lo.
+Parquet com zstd quando o ``pyarrow`` está instalado; sem ele, CSV com
+gzip, lido do mesmo jeito.
+
+O ``Archive`` é o lado da leitura: o ``DashboardBackend`` consulta as
+partições só quando a janela pedida alcança datas arquivadas, e as
+partições lidas ficam num cache LRU (arquivos arquivados não mudam).
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+
+from soma_dashboard.pagination import PAGE_COLUMNS, LogPage
+from soma_dashboard.pool import read_connection
+from soma_dashboard.schema import TIMESTAMP_FORMAT, parse_timestamps
+
+PARQUET_EXTENSION = '.parquet'
+CSV_EXTENSION = '.csv.gz'
+PARTITION_PATTERN = re.compile(r'^date=(\d{4}-\d{2}-\d{2})$')
+PART_PATTERN = re.compile(r'^part-(\d+)-(\d+)(\.parquet|\.csv\.gz)$')
+
+# Colunas do detalhe de um log que vêm da operação associada (ver soma_dashboard.details)
+OPERATION_DETAIL_COLUMNS = {
+    'timestamp': 'operation_timestamp',
+    'input_a': 'input_a',
+    'input_b': 'input_b',
+    'result': 'operation_result',
+    'execution_time_ms': 'operation_execution_time_ms',
+    'span_id': 'span_id',
+}
+
+OPERATION_DETAIL_QUERY = """
+SELECT timestamp, input_a, input_b, result, execution_time_ms, span_id
+FROM operations
+WHERE id = ?
+"""
+
+
+def default_archive_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archive')
+
+
+def archive_format():
+    """Extensão das partições gravadas neste ambiente."""
+    return PARQUET_EXTENSION if pa is not None else CSV_EXTENSION
+
+
+def write_part(directory, table, day, first_key, last_key, frame):
+    """Grava as linhas de um dia; retorna o caminho. Regravar o mesmo lote substitui o arquivo."""
+    partition = os.path.join(directory, table, f"date={day}")
+    os.makedirs(partition, exist_ok=True)
+    path = os.path.join(partition, f"part-{first_key:012d}-{last_key:012d}{archive_format()}")
+
+    # Temporário + fsync + troca atômica: o lote só é apagado do banco depois que o arquivo existe
+    tmp_path = f"{path}.tmp"
+    if pa is not None:
+        table_data = pa.Table.from_pandas(frame, preserve_index=False)
+        pq.write_table(table_data, tmp_path, compression='zstd')
+    else:
+        frame.to_csv(tmp_path, index=False, compression='gzip')
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_part(path):
+    if path.endswith(PARQUET_EXTENSION):
+        if pa is None:
+            raise RuntimeError(f"pyarrow é necessário para ler {path}")
+        return pq.read_table(path).to_pandas()
+    return pd.read_csv(path, compression='gzip')
+
+
+class Archive:
+    """Leitura das partições em ``directory`` (padrão: ``archive`` ao lado do banco)."""
+
+    def __init__(self, directory, max_cached_parts=64):
+        self.directory = directory
+        self.max_cached_parts = max_cached_parts
+        self._parts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def days(self, table):
+        """Dias arquivados de ``table``, em ordem."""
+        root = os.path.join(self.directory, table)
+        if not os.path.isdir(root):
+            return []
+        days = []
+        for entry in os.scandir(root):
+            match = PARTITION_PATTERN.match(entry.name)
+            if match and entry.is_dir():
+                days.append(pd.Timestamp(match.group(1)))
+        return sorted(days)
+
+    def parts(self, table, day):
+        """``[(primeira chave, última chave, caminho)]`` de um dia."""
+        partition = os.path.join(self.directory, table, f"date={day.strftime('%Y-%m-%d')}")
+        if not os.path.isdir(partition):
+            return []
+        parts = []
+        for entry in os.scandir(partition):
+            match = PART_PATTERN.match(entry.name)
+            if match:
+                parts.append((int(match.group(1)), int(match.group(2)), entry.path))
+        return sorted(parts)
+
+    def horizon(self, table):
+        """Fim (exclusivo) do último dia arquivado, ou None sem partições."""
+        days = self.days(table)
+        return days[-1] + pd.Timedelta(days=1) if days else None
+
+    def covers(self, table, since=None, until=None):
+        """Alguma partição de ``table`` cai em ``[since, until)``?"""
+        return bool(self._days_in(table, since, until))
+
+    def _days_in(self, table, since, until):
+        one_day = pd.Timedelta(days=1)
+        return [day for day in self.days(table)
+                if (since is None or day + one_day > pd.Timestamp(since))
+                and (until is None or day < pd.Timestamp(until))]
+
+    def _load(self, path):
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            frame = self._parts.get(key)
+            if frame is not None:
+                self._parts.move_to_end(key)
+                return frame
+        frame = _read_part(path)
+        frame['timestamp'] = parse_timestamps(frame['timestamp'])
+        with self._lock:
+            self._parts[key] = frame
+            while len(self._parts) > self.max_cached_parts:
+                self._parts.popitem(last=False)
+        return frame
+
+    def read(self, table, since=None, until=None, columns=None):
+        """Linhas arquivadas de ``table`` em ``[since, until)``, em ordem de tempo."""
+        frames = [self._load(path)
+                  for day in self._days_in(table, since, until)
+                  for _, _, path in self.parts(table, day)]
+        if not frames:
+            return pd.DataFrame(columns=list(columns) if columns is not None else None)
+        df = pd.concat(frames, ignore_index=True)
+        # Um lote regravado depois de uma falha entre o arquivo e o DELETE pode repetir linhas
+        df = df.drop_duplicates('id')
+        if since is not None:
+            df = df[df['timestamp'] >= pd.Timestamp(since)]
+        if until is not None:
+            df = df[df['timestamp'] < pd.Timestamp(until)]
+        if columns is not None:
+            df = df[list(columns)]
+        return df.sort_values('timestamp', kind='stable', ignore_index=True)
+
+    def logs_page(self, users=None, periods=None, since=None, until=None, cursor=None, page_size=50):
+        """Mesma página do ``fetch_logs_page``, lida das partições de ``business_logs``."""
+        if cursor is not None:
+            cursor_timestamp = pd.Timestamp(cursor[0])
+            until = cursor_timestamp + pd.Timedelta(seconds=1) if until is None else min(
+                pd.Timestamp(until), cursor_timestamp + pd.Timedelta(seconds=1))
+        df = self.read('business_logs', since, until, columns=PAGE_COLUMNS)
+        if users is not None:
+            df = df[df['user_id'].isin(users)]
+        if periods is not None:
+            df = df[df['day_period'].isin(periods)]
+        if cursor is not None:
+            cursor_id = int(cursor[1])
+            df = df[(df['timestamp'] < cursor_timestamp)
+                    | ((df['timestamp'] == cursor_timestamp) & (df['id'] < cursor_id))]
+        df = df.sort_values(['timestamp', 'id'], ascending=False, kind='stable', ignore_index=True)
+        rows = df.head(page_size)
+        next_cursor = None
+        if len(df) > page_size:
+            last = rows.iloc[-1]
+            next_cursor = (last['timestamp'].strftime(TIMESTAMP_FORMAT), int(last['id']))
+        return LogPage(rows, next_cursor)
+
+    def log_detail(self, db_path, log_id):
+        """Detalhe de um log arquivado (mesmas chaves do ``fetch_log_detail``), ou None."""
+        log_id = int(log_id)
+        row = None
+        for day in reversed(self.days('business_logs')):
+            for first_key, last_key, path in self.parts('business_logs', day):
+                if first_key <= log_id <= last_key:
+                    part = self._load(path)
+                    found = part[part['id'] == log_id]
+                    if len(found):
+                        row = found.iloc[0]
+                        break
+            if row is not None:
+                break
+        if row is None:
+            return None
+
+        detail = {name: (None if pd.isna(value) else value) for name, value in row.items()}
+        detail.update({name: None for name in OPERATION_DETAIL_COLUMNS.values()})
+
+        # A operação pode seguir no banco ou já ter sido arquivada no mesmo dia
+        operation = None
+        if os.path.exists(db_path):
+            with read_connection(db_path) as conn:
+                found = conn.execute(OPERATION_DETAIL_QUERY, (detail['operation_id'],)).fetchone()
+            if found is not None:
+                operation = dict(zip(OPERATION_DETAIL_COLUMNS, found))
+                operation['timestamp'] = str(operation['timestamp'])
+        if operation is None:
+            day = detail['timestamp'].floor('D')
+            archived = self.read('operations', day - pd.Timedelta(days=1), day + pd.Timedelta(days=2))
+            archived = archived[archived['id'] == detail['operation_id']]
+            if len(archived):
+                found = archived.iloc[0]
+                operation = {name: found[name] for name in OPERATION_DETAIL_COLUMNS}
+                operation['timestamp'] = found['timestamp'].strftime(TIMESTAMP_FORMAT)
+        if operation is not None:
+            detail.update({OPERATION_DETAIL_COLUMNS[name]: value for name, value in operation.items()})
+        return detail
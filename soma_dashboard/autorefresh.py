@@ -0,0 +1,28 @@
+"""Auto-refresh por detecção de mudança, sem bloquear o script.
+
+Substitui o ``time.sleep(5)`` + ``st.rerun()``: um fragmento leve roda a cada
+``interval`` segundos, compara a versão publicada pelo ``DataRefresher``
+com a última vista pela sessão e só pede o rerun da página quando chegaram
+linhas novas. Com o sistema ocioso apenas o fragmento é reexecutado e os
+gráficos das abas não são regerados.
+"""
+from datetime import datetime
+
+import streamlit as st
+
+
+def auto_refresh_watcher(refresher, interval=5, state_key='data_version'):
+    # Este corpo só roda em reruns completos, que já carregam os dados atuais
+    st.session_state[state_key] = refresher.poll()
+
+    @st.fragment(run_every=interval)
+    def watch():
+        version = refresher.poll()
+
+        if version != st.session_state[state_key]:
+            st.session_state[state_key] = version
+            st.rerun()
+
+        st.caption(f"🟢 Verificado às {datetime.now().strftime('%H:%M:%S')} (versão {version})")
+
+    watch()
@@ -0,0 +1,432 @@
+"""Dados dos painéis num só objeto, usado em processo ou atrás do serviço HTTP.
+
+Os dois scripts do Streamlit montavam, cada um, seus stores, refresher,
+sketches, rollups e consultas. O ``DashboardBackend`` concentra esse
+trabalho e devolve só o que as páginas exibem — as N linhas mais recentes,
+agregações, percentis, páginas de log — em vez de DataFrames inteiros.
+
+Os componentes são criados sob demanda: o painel de telemetria nunca
+carrega ``business_logs``. Resultados derivados dos stores ficam em cache
+até chegar um delta (versão do ``DataRefresher``); os que vêm de consultas
+ao SQLite, por ``ttl`` segundos. Janelas e páginas que alcançam datas já
+arquivadas pelo ``soma_dashboard.retention`` juntam as partições do
+``Archive`` ao que ainda está no banco.
+
+``open_backend`` devolve um ``ServiceClient`` quando ``SOMA_DASHBOARD_SERVICE``
+aponta para um ``python -m soma_dashboard.service`` (ver
+``soma_dashboard.service``) — mesmos métodos, mesmos tipos de retorno — e
+um backend local caso contrário: ``DashboardBackend`` para um banco, ou
+``FederatedBackend`` (``soma_dashboard.federation``) quando ``db_path`` é
+um glob ou uma lista de bancos, um por réplica da Soma API.
+"""
+import glob
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from soma_dashboard import windows
+from soma_dashboard.aggregates import load_business_summary
+from soma_dashboard.anomalies import AnomalyMonitor, EwmaDetector
+from soma_dashboard.archive import Archive, default_archive_dir
+from soma_dashboard.details import fetch_log_detail
+from soma_dashboard.indexes import migrate
+from soma_dashboard.pagination import fetch_logs_page, merge_pages
+from soma_dashboard.refresher import DataRefresher
+from soma_dashboard.rollups import RollupEngine, load_rollup
+from soma_dashboard.schema import BUSINESS_LOG_SCHEMA, OPERATION_SCHEMA
+from soma_dashboard.sketches import DistinctTracker, LatencyTracker
+from soma_dashboard.snapshots import SnapshotManager
+from soma_dashboard.store import LogStore
+from soma_dashboard.traces import TraceIndex
+
+logger = logging.getLogger(__name__)
+
+SERVICE_ENV = 'SOMA_DASHBOARD_SERVICE'
+DEFAULT_TTL = 5
+
+# tabela -> (schema, coluna watermark, coluna com o id da operação)
+TABLES = {
+    'operations': (OPERATION_SCHEMA, 'rowid', 'id'),
+    'business_logs': (BUSINESS_LOG_SCHEMA, 'id', 'operation_id'),
+}
+
+# Colunas com contagem de distintos (HyperLogLog por bucket de tempo)
+DISTINCT_COLUMNS = {
+    'operations': ('trace_id',),
+    'business_logs': ('user_id', 'trace_id'),
+}
+
+
+def resolve_db_paths(db_path):
+    """Caminho, glob ou lista (separada por ``os.pathsep``) -> bancos, em ordem.
+
+    Um padrão sem nenhum arquivo fica como está: o backend reporta o banco
+    ausente em vez de subir sem réplicas.
+    """
+    specs = db_path if isinstance(db_path, (list, tuple)) else str(db_path).split(os.pathsep)
+    paths = []
+    for spec in specs:
+        matches = sorted(glob.glob(spec)) if glob.has_magic(spec) else []
+        for path in matches or [spec]:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def default_snapshot_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'dashboard_snapshots')
+
+
+def create_backend(db_path, snapshot_dir=None, **options):
+    """``DashboardBackend`` de um banco, ou ``FederatedBackend`` se ``db_path`` indicar vários."""
+    paths = resolve_db_paths(db_path)
+    if len(paths) == 1:
+        return DashboardBackend(paths[0], snapshot_dir or default_snapshot_dir(paths[0]), **options)
+    from soma_dashboard.federation import FederatedBackend
+    return FederatedBackend.from_paths(paths, snapshot_dir, **options)
+
+
+def open_backend(db_path, snapshot_dir=None, **options):
+    """``ServiceClient`` se ``SOMA_DASHBOARD_SERVICE`` estiver definida, senão backend local."""
+    url = os.environ.get(SERVICE_ENV)
+    if url:
+        from soma_dashboard.client import ServiceClient
+        return ServiceClient(url)
+    return create_backend(db_path, snapshot_dir, **options)
+
+
+class DashboardBackend:
+    """Stores, sketches, rollups e consultas de um soma_logs.db."""
+
+    def __init__(self, db_path, snapshot_dir=None, refresh_interval=5, ttl=DEFAULT_TTL, archive_dir=None):
+        self.db_path = db_path
+        self.snapshot_dir = snapshot_dir
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self.snapshots = SnapshotManager(snapshot_dir) if snapshot_dir else None
+        self.archive = Archive(archive_dir or default_archive_dir(db_path))
+        self._stores = {}
+        self._components = {}
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._refresher = DataRefresher({}, interval=refresh_interval, snapshots=self.snapshots)
+
+    # Componentes (criados na primeira vez que alguém precisa deles)
+
+    def _component(self, name, build):
+        with self._lock:
+            component = self._components.get(name)
+            if component is None:
+                component = self._components[name] = build()
+            return component
+
+    def store(self, table):
+        with self._lock:
+            store = self._stores.get(table)
+            if store is None:
+                if table not in TABLES:
+                    raise ValueError(f"Tabela desconhecida: {table}")
+                schema, key, _ = TABLES[table]
+                store = LogStore(self.db_path, table, schema, key=key)
+                if self.snapshots is not None:
+                    self.snapshots.restore(store)
+                self._stores[table] = store
+                self._refresher.add(table, store)
+            self._refresher.start()
+            return store
+
+    @property
+    def version(self):
+        return self._refresher.version
+
+    def tracker(self, table):
+        def build():
+            tracker = LatencyTracker(user_column='user_id' if table == 'business_logs' else None)
+            self.store(table).add_listener(tracker.update)
+            return tracker
+        return self._component(f'tracker.{table}', build)
+
+    def distinct(self, table):
+        def build():
+            store = self.store(table)
+            tracker = DistinctTracker(DISTINCT_COLUMNS[table])
+            store.add_listener(tracker.update)
+            return tracker
+        return self._component(f'distinct.{table}', build)
+
+    def anomaly_monitor(self):
+        def build():
+            monitor = AnomalyMonitor([EwmaDetector('user_id'), EwmaDetector('hour_of_day')])
+            self.store('business_logs').add_listener(monitor.update)
+            return monitor
+        return self._component('anomalies', build)
+
+    def trace_index(self):
+        return self._component('traces', lambda: TraceIndex(
+            {table: self.store(table) for table in TABLES},
+            id_columns={table: id_column for table, (_, _, id_column) in TABLES.items()},
+        ))
+
+    def rollup_engine(self):
+        return self._component('rollups', lambda: RollupEngine(self.db_path))
+
+    def setup_indexes(self):
+        # Migrações pendentes, uma vez por backend. Banco travado não impede os painéis:
+        # a falha vai para o log e não fica em cache, a próxima consulta tenta de novo
+        def build():
+            try:
+                return migrate(self.db_path)
+            except sqlite3.OperationalError as e:
+                logger.warning("Migração de índices de %s falhou (nova tentativa na próxima consulta): %s",
+                               self.db_path, e)
+                return None
+        applied = self._component('indexes', build)
+        return [] if applied is None else applied
+
+    # Cache dos resultados
+
+    def _cached(self, key, compute, ttl=None):
+        """Resultado de ``compute`` por ``ttl`` segundos, ou até o próximo delta se ttl=None."""
+        version = self._refresher.version
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None:
+            value, cached_version, expires_at = entry
+            if (ttl is None and cached_version == version) or (ttl is not None and now < expires_at):
+                return value
+        value = compute()
+        with self._lock:
+            if len(self._cache) > 1024:
+                self._cache.clear()
+            self._cache[key] = (value, version, now + (ttl or 0))
+        return value
+
+    def _require_db(self):
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Banco não encontrado: {self.db_path}")
+
+    def _frame(self, table):
+        self.store(table)
+        self._require_db()
+        frame, error = self._refresher.get(table)
+        if error is not None:
+            raise error
+        return frame if frame is not None else pd.DataFrame(columns=self.store(table).columns)
+
+    # Atualização
+
+    def poll(self):
+        """Versão dos dados: muda quando algum store recebe linhas novas."""
+        return self._refresher.poll()
+
+    def refresh(self):
+        with self._lock:
+            self._cache.clear()
+        self._refresher.refresh()
+        return self._refresher.version
+
+    # Linhas e estatísticas dos stores
+
+    def recent(self, table, limit=20, users=None, periods=None):
+        """``limit`` linhas mais recentes de ``table`` (filtros só em business_logs)."""
+        def compute():
+            df = self._frame(table)
+            if users is not None:
+                df = df[df['user_id'].isin(users)]
+            if periods is not None:
+                df = df[df['day_period'].isin(periods)]
+            return df.head(limit)
+        key = ('recent', table, limit, tuple(users) if users is not None else None,
+               tuple(periods) if periods is not None else None)
+        return self._cached(key, compute)
+
+    def row_count(self, table):
+        self._frame(table)
+        return len(self.store(table))
+
+    def replicas(self):
+        """Banco(s) lidos e se existem: ``{nome: existe}``."""
+        return {os.path.basename(self.db_path): os.path.exists(self.db_path)}
+
+    def operation_stats(self, exact=False):
+        """Cards e "Estatísticas Detalhadas" do painel de telemetria.
+
+        ``unique_traces`` vem do HyperLogLog; ``exact=True`` usa ``nunique``.
+        """
+        def compute():
+            df = self._frame('operations')
+            return {
+                'total': len(df),
+                'avg_execution_time': df['execution_time_ms'].mean() if len(df) else 0.0,
+                'result_min': df['result'].min() if len(df) else None,
+                'result_max': df['result'].max() if len(df) else None,
+                'result_mean': df['result'].mean() if len(df) else 0.0,
+                'result_median': df['result'].median() if len(df) else None,
+                'unique_traces': self.distinct_count('operations', 'trace_id', exact=exact),
+                'first_operation': df['timestamp'].min() if len(df) else None,
+                'last_operation': df['timestamp'].max() if len(df) else None,
+            }
+        return self._cached(('operation_stats', exact), compute)
+
+    def distinct_tracker(self, table):
+        """``DistinctTracker`` de ``table`` já com os deltas pendentes aplicados."""
+        tracker = self.distinct(table)
+        self._frame(table)
+        return tracker
+
+    def distinct_values(self, table, column, since=None, until=None):
+        """Valores distintos de ``column`` em ``[since, until)``, lidos do store."""
+        if column not in DISTINCT_COLUMNS.get(table, ()):
+            raise ValueError(f"Coluna sem contagem de distintos: {table}.{column}")
+        df = self._frame(table)
+        if since is not None:
+            df = df[df['timestamp'] >= since]
+        if until is not None:
+            df = df[df['timestamp'] < until]
+        return df[column].dropna().unique()
+
+    def distinct_count(self, table, column, since=None, until=None, exact=False):
+        """Valores distintos de ``column`` em ``[since, until)`` (sem janela: tudo).
+
+        Aproximado por padrão: junta os HyperLogLog dos buckets que a janela
+        toca, em memória fixa por bucket. ``exact=True`` conta os valores do
+        store (``nunique``), com o custo de um conjunto do tamanho da janela.
+        """
+        if exact:
+            return self._cached(('distinct_exact', table, column, since, until),
+                                lambda: len(self.distinct_values(table, column, since, until)))
+        tracker = self.distinct_tracker(table)
+        return self._cached(('distinct', table, column, since, until),
+                            lambda: tracker.count(column, since, until))
+
+    def latency_tracker(self, table):
+        """``LatencyTracker`` de ``table`` já com os deltas pendentes aplicados."""
+        tracker = self.tracker(table)
+        self._frame(table)
+        return tracker
+
+    def latency(self, table):
+        """Percentis e mín/máx/desvio de ``execution_time_ms`` (sketch incremental)."""
+        tracker = self.latency_tracker(table)
+        return self._cached(('latency', table), lambda: {
+            'percentiles': tracker.percentiles(),
+            'min': tracker.total.min,
+            'max': tracker.total.max,
+            'std': tracker.total.std,
+        })
+
+    def user_percentiles(self):
+        tracker = self.latency_tracker('business_logs')
+        return self._cached(('user_percentiles',), tracker.user_percentiles)
+
+    def top_slowest(self, table='operations'):
+        return self.latency_tracker(table).top_slowest()
+
+    def percentiles_over_time(self, table='operations', freq='h'):
+        tracker = self.latency_tracker(table)
+        return self._cached(('percentiles_over_time', table, freq), lambda: tracker.over_time(freq))
+
+    def memory(self, table):
+        store = self.store(table)
+        return self._cached(('memory', table), lambda: (store.memory_usage(), store.memory_per_row()),
+                            ttl=60)
+
+    # Consultas ao SQLite
+
+    def summary(self):
+        self._require_db()
+        self.setup_indexes()
+        return self._cached(('summary',), lambda: load_business_summary(self.db_path), ttl=self.ttl)
+
+    def history(self, source, granularity='hour'):
+        self._require_db()
+
+        def compute():
+            self.rollup_engine().advance()
+            return load_rollup(self.db_path, source, granularity)
+        return self._cached(('history', source, granularity), compute, ttl=self.ttl)
+
+    def execution_window(self, since, until, max_points=windows.DEFAULT_MAX_POINTS):
+        self._require_db()
+        self.setup_indexes()
+        return self._cached(
+            ('execution_window', since, until, max_points),
+            lambda: self._execution_window(since, until, max_points),
+            ttl=self.ttl,
+        )
+
+    def _execution_window(self, since, until, max_points):
+        window = windows.load_execution_window(self.db_path, since, until, max_points)
+        if not self.archive.covers('operations', window.since, until):
+            return window
+        archived = self.archive.read('operations', window.since, until, columns=['timestamp', 'execution_time_ms'])
+        return windows.merge_windows([window, windows.frame_window(archived, since, until, max_points)],
+                                     max_points)
+
+    def logs_page(self, users=None, periods=None, since=None, until=None, cursor=None, page_size=50):
+        self._require_db()
+        self.setup_indexes()
+        # None (sem filtro) e [] (nada selecionado) são páginas diferentes
+        key = ('logs_page', tuple(users) if users is not None else None,
+               tuple(periods) if periods is not None else None, since, until, cursor, page_size)
+        return self._cached(key, lambda: self._logs_page(users, periods, since, until, cursor, page_size),
+                            ttl=self.ttl)
+
+    def _logs_page(self, users, periods, since, until, cursor, page_size):
+        page = fetch_logs_page(self.db_path, users=users, periods=periods, since=since, until=until,
+                               cursor=cursor, page_size=page_size)
+        # O arquivo só é lido quando a página chega a datas arquivadas
+        horizon = self.archive.horizon('business_logs')
+        if horizon is None or (since is not None and pd.Timestamp(since) >= horizon):
+            return page
+        if page.has_next and page.rows['timestamp'].iloc[-1] >= horizon:
+            return page
+        if (users is not None and not users) or (periods is not None and not periods):
+            return page
+        archived = self.archive.logs_page(users=users, periods=periods, since=since, until=until,
+                                          cursor=cursor, page_size=page_size)
+        return merge_pages([page, archived], page_size)
+
+    def log_detail(self, log_id):
+        # Linhas não mudam: o TTL só limita quanto tempo o cache guarda cada uma
+        log_id = int(log_id)
+        self._require_db()
+        return self._cached(('log_detail', log_id), lambda: (
+            fetch_log_detail(self.db_path, log_id) or self.archive.log_detail(self.db_path, log_id)
+        ), ttl=300)
+
+    # Traces e anomalias (estruturas mantidas pelos listeners dos stores)
+
+    def trace(self, key):
+        index = self.trace_index()
+        self._frame('business_logs')
+        return index.find(key)
+
+    def recent_traces(self, n=20):
+        return self.trace_index().recent(n)
+
+    def trace_counts(self):
+        return self.trace_index().counts()
+
+    def anomalies(self, window=pd.Timedelta(hours=1)):
+        """Totais, sinalizadas na última ``window`` dos dados, todas as guardadas e linhas de base."""
+        monitor = self.anomaly_monitor()
+        self._frame('business_logs')
+
+        def compute():
+            return {
+                'total_flagged': monitor.total_flagged,
+                'rows_seen': monitor.rows_seen,
+                'recent': monitor.recent(window),
+                'flagged': monitor.flagged(),
+                'baselines': monitor.baselines('user_id'),
+            }
+        return self._cached(('anomalies', window), compute)
+
+    def close(self):
+        self._refresher.stop()
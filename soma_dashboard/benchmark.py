@@ -0,0 +1,519 @@
+"""Benchmark headless das etapas dos painéis por tamanho de base.
+
+Gera (ou reaproveita) um soma_logs.db sintético para cada tamanho pedido
+(ver ``soma_dashboard.synthetic``) e cronometra, sem Streamlit, as mesmas
+etapas que ``telemetry_dashboard.py`` e ``business_logs_dashboard.py``
+executam: leitura SQL, parse de timestamp, tipagem, carga do store,
+filtros, janela do tempo de execução, paginação, agregações, sketches,
+rollups e renderização dos gráficos.
+
+Com ``--concurrent`` também mede a latência de leitura com inserts
+simultâneos no estilo do ``LoggingService`` (uma conexão nova por insert),
+comparando conexões avulsas com journal padrão contra o pool somente
+leitura em WAL (ver ``soma_dashboard.pool``).
+
+Cada etapa roda ``--repeat`` vezes para a latência (mediana e melhor) e
+mais uma vez sob ``tracemalloc`` para o pico de memória alocada pela etapa
+(memória interna do SQLite não entra na conta). Com ``--baseline`` o
+resultado é comparado com um JSON anterior e o comando sai com código 1 se
+alguma etapa ficou mais lenta que a tolerância.
+
+Uso::
+
+    python -m soma_dashboard.benchmark --rows 10000 1000000 --json atual.json
+    python -m soma_dashboard.benchmark --rows 10000 --baseline atual.json
+    python -m soma_dashboard.benchmark --rows 100000 --dashboard business --concurrent 10
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from soma_dashboard import charts
+from soma_dashboard.aggregates import TOTALS_QUERY, USER_STATS_QUERY, load_business_summary
+from soma_dashboard.charts import SAVEFIG_OPTIONS
+from soma_dashboard.indexes import migrate
+from soma_dashboard.pagination import fetch_logs_page
+from soma_dashboard.pool import read_connection
+from soma_dashboard.rollups import ROLLUP_SOURCES, RollupEngine, load_rollup
+from soma_dashboard.schema import BUSINESS_LOG_SCHEMA, OPERATION_SCHEMA, parse_timestamps
+from soma_dashboard.sketches import DistinctTracker, LatencyTracker
+from soma_dashboard.store import LogStore
+from soma_dashboard.synthetic import INSERT_BUSINESS_LOG, INSERT_OPERATION, generate_database, generate_rows
+from soma_dashboard.windows import load_execution_window
+
+DASHBOARDS = ('telemetry', 'business')
+
+# Linhas pré-geradas que o escritor do teste concorrente insere em ciclo
+WRITER_ROWS = 10_000
+
+# Leituras do teste concorrente: cards/estatísticas + primeira página dos logs
+CONCURRENT_READ_QUERIES = [
+    TOTALS_QUERY,
+    USER_STATS_QUERY,
+    "SELECT id, user_id, timestamp FROM business_logs ORDER BY timestamp DESC, id DESC LIMIT 51",
+]
+
+
+@dataclass
+class Stage:
+    name: str
+    run: object            # callable sem argumentos
+    setup: object = None   # chamado antes de cada execução, fora da medição
+
+
+@dataclass
+class StageResult:
+    rows: int
+    dashboard: str
+    stage: str
+    seconds: list = field(default_factory=list)
+    peak_bytes: int = 0
+
+    @property
+    def median(self):
+        return statistics.median(self.seconds)
+
+    @property
+    def best(self):
+        return min(self.seconds)
+
+    def to_dict(self):
+        return {**asdict(self), 'median': self.median, 'best': self.best}
+
+
+def _read_table(db_path, table, schema, key):
+    # Mesma consulta da carga inicial do LogStore (sem watermark)
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query(
+            f"SELECT {key} AS _key, {', '.join(schema.source_columns)} FROM {table} ORDER BY {key}",
+            conn,
+        )
+    finally:
+        conn.close()
+
+
+def _png(chart, *args):
+    buffer = BytesIO()
+    chart(*args).savefig(buffer, **SAVEFIG_OPTIONS)
+    return buffer.getvalue()
+
+
+def _reset_rollup(db_path, source):
+    # Apaga o rollup da origem para cronometrar o backfill completo
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {ROLLUP_SOURCES[source]['rollup_table']}")
+        try:
+            conn.execute("DELETE FROM rollup_watermarks WHERE source = ?", (source,))
+        except sqlite3.OperationalError:
+            pass  # tabela de watermarks ainda não existe
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _rollup_stages(db_path, source, ctx):
+    def advance():
+        RollupEngine(db_path, sources={source: ROLLUP_SOURCES[source]}).advance()
+
+    def history():
+        ctx['history'] = load_rollup(db_path, source, 'hour')
+
+    return [
+        Stage('rollup_backfill', advance, setup=lambda: _reset_rollup(db_path, source)),
+        Stage('rollup_read', history),
+    ]
+
+
+def telemetry_stages(db_path, limit=20, window=pd.Timedelta(hours=1)):
+    """Etapas do telemetry_dashboard.py, na ordem em que o painel as executa.
+
+    ``window`` é a janela do gráfico de tempo de execução (padrão do painel:
+    última hora), contada a partir da operação mais recente da base.
+    """
+    ctx = {}
+
+    def sql_load():
+        ctx['raw'] = _read_table(db_path, 'operations', OPERATION_SCHEMA, 'rowid')
+
+    def store_load():
+        store = LogStore(db_path, 'operations', OPERATION_SCHEMA, key='rowid')
+        store.refresh()
+        ctx['df'] = store.frame()
+
+    def filtering():
+        ctx['filtered'] = ctx['df'].head(limit)
+
+    def execution_window():
+        # Mesma consulta do DashboardBackend.execution_window (COUNT + pontos ou buckets)
+        until = ctx['df']['timestamp'].max().ceil('5s')
+        ctx['window'] = load_execution_window(db_path, until - window, until)
+
+    def aggregation():
+        # DashboardBackend.operation_stats; os traces únicos vêm do DistinctTracker
+        df = ctx['df']
+        ctx['stats'] = (len(df), df['execution_time_ms'].mean(), df['result'].max(),
+                        df['result'].median(), df['timestamp'].min(), df['timestamp'].max())
+
+    def distinct():
+        tracker = DistinctTracker(['trace_id'])
+        tracker.update(ctx['df'])
+        ctx['unique_traces'] = tracker.count('trace_id')
+
+    def latency():
+        tracker = LatencyTracker()
+        tracker.update(ctx['df'])
+        ctx['latency'] = tracker.percentiles()
+        ctx['top_slow'] = tracker.top_slowest()
+        ctx['percentiles'] = tracker.over_time('h')
+
+    def rendering():
+        filtered, top_slow, execution = ctx['filtered'], ctx['top_slow'], ctx['window']
+        labels = charts.operation_labels(top_slow)
+        if not execution.empty:
+            _png(charts.execution_time, execution.points, execution.label)
+        _png(charts.results_histogram, filtered['result'].values)
+        _png(charts.slowest_operations, labels, top_slow['execution_time_ms'].values)
+        if not ctx['history'].empty:
+            _png(charts.history, ctx['history'], 'Hora')
+        if not ctx['percentiles'].empty:
+            _png(charts.percentiles_over_time, ctx['percentiles'], 'Hora')
+
+    return [
+        Stage('sql_load', sql_load),
+        Stage('timestamp_parse', lambda: parse_timestamps(ctx['raw']['timestamp'])),
+        Stage('schema_transform', lambda: OPERATION_SCHEMA.transform(ctx['raw'])),
+        Stage('store_load', store_load),
+        Stage('filtering', filtering),
+        Stage('execution_window', execution_window, setup=lambda: migrate(db_path)),
+        Stage('aggregation', aggregation),
+        Stage('distinct_sketch', distinct),
+        Stage('latency_sketch', latency),
+        *_rollup_stages(db_path, 'operations', ctx),
+        Stage('rendering', rendering),
+    ]
+
+
+def business_stages(db_path, limit=100, page_size=50):
+    """Etapas do business_logs_dashboard.py, na ordem em que o painel as executa."""
+    ctx = {}
+
+    def sql_load():
+        ctx['raw'] = _read_table(db_path, 'business_logs', BUSINESS_LOG_SCHEMA, 'id')
+
+    def store_load():
+        store = LogStore(db_path, 'business_logs', BUSINESS_LOG_SCHEMA, key='id')
+        store.refresh()
+        ctx['df'] = store.frame()
+
+    def filtering():
+        df = ctx['df']
+        users = df['user_id'].unique().tolist()
+        periods = ['MORNING', 'AFTERNOON', 'EVENING', 'NIGHT']
+        ctx['filtered'] = df[df['user_id'].isin(users) & df['day_period'].isin(periods)].head(limit)
+        ctx['users'] = users
+
+    def pagination():
+        # Página 1 e página 5 com filtro de usuário e período (índices já criados)
+        users, cursor = ctx['users'][:3], None
+        for _ in range(5):
+            page = fetch_logs_page(db_path, users=users, periods=['AFTERNOON'],
+                                   cursor=cursor, page_size=page_size)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+    def aggregation():
+        ctx['summary'] = load_business_summary(db_path)
+        filtered = ctx['filtered']
+        ctx['user_counts'] = filtered['user_id'].value_counts().loc[lambda counts: counts > 0]
+        ctx['hour_counts'] = filtered['hour_of_day'].value_counts().sort_index()
+        ctx['period_counts'] = filtered['day_period'].value_counts().loc[lambda counts: counts > 0]
+
+    def latency():
+        tracker = LatencyTracker(user_column='user_id')
+        tracker.update(ctx['df'])
+        ctx['user_percentiles'] = tracker.user_percentiles()
+
+    def rendering():
+        user_stats = ctx['summary'].user_stats
+        _png(charts.operations_by_user, ctx['user_counts'])
+        _png(charts.avg_time_by_user, user_stats['user_id'].values, user_stats['avg_execution_time'].values)
+        _png(charts.operations_by_hour, ctx['hour_counts'])
+        _png(charts.operations_by_period, ctx['period_counts'])
+        if not ctx['history'].empty:
+            _png(charts.history, ctx['history'], 'Hora')
+
+    return [
+        Stage('sql_load', sql_load),
+        Stage('timestamp_parse', lambda: parse_timestamps(ctx['raw']['timestamp'])),
+        Stage('schema_transform', lambda: BUSINESS_LOG_SCHEMA.transform(ctx['raw'])),
+        Stage('store_load', store_load),
+        Stage('filtering', filtering),
+        Stage('pagination', pagination, setup=lambda: migrate(db_path)),
+        Stage('aggregation', aggregation),
+        Stage('latency_sketch', latency),
+        *_rollup_stages(db_path, 'business_logs', ctx),
+        Stage('rendering', rendering),
+    ]
+
+
+STAGE_BUILDERS = {
+    'telemetry': telemetry_stages,
+    'business': business_stages,
+}
+
+
+def measure(stage, repeat=3):
+    result = StageResult(rows=0, dashboard='', stage=stage.name)
+    for _ in range(repeat):
+        if stage.setup is not None:
+            stage.setup()
+        started = time.perf_counter()
+        stage.run()
+        result.seconds.append(time.perf_counter() - started)
+
+    # Execução extra só para o pico de memória (tracemalloc deixa tudo mais lento)
+    if stage.setup is not None:
+        stage.setup()
+    tracemalloc.start()
+    try:
+        stage.run()
+        result.peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmark(db_path, rows, dashboards=DASHBOARDS, repeat=3):
+    results = []
+    for dashboard in dashboards:
+        for stage in STAGE_BUILDERS[dashboard](db_path):
+            result = measure(stage, repeat)
+            result.rows = rows
+            result.dashboard = dashboard
+            results.append(result)
+    return results
+
+
+def dataset_path(workdir, rows, users, days, seed):
+    path = os.path.join(workdir, f"soma_logs_{rows}_{users}u_{days}d_{seed}.db")
+    if not os.path.exists(path):
+        print(f"Gerando {rows} operações em {path}...", file=sys.stderr)
+        generate_database(f"{path}.tmp", rows, users, days, seed)
+        os.replace(f"{path}.tmp", path)
+    return path
+
+
+def _copy_database(source, target, journal_mode):
+    # backup() em vez de copiar o arquivo: a base pode estar em WAL com páginas no -wal
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+        dst.execute(f"PRAGMA journal_mode = {journal_mode}")
+    finally:
+        src.close()
+        dst.close()
+
+
+@contextmanager
+def _direct_connection(db_path):
+    # Como os leitores faziam antes do pool: conexão nova por chamada
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _percentiles_ms(values):
+    if not values:
+        return {'p50': float('nan'), 'p99': float('nan'), 'max': float('nan')}
+    values = np.asarray(values) * 1000
+    return {'p50': np.percentile(values, 50), 'p99': np.percentile(values, 99), 'max': values.max()}
+
+
+def concurrent_benchmark(source_db, seconds=10, readers=2, workdir=None):
+    """Leituras dos painéis com inserts simultâneos, sem pool x com pool em WAL.
+
+    O escritor imita o ``LoggingService``: conexão nova, um insert em
+    ``operations`` e outro em ``business_logs``, commit, sem pausa entre
+    requisições. Retorna um dict por modo com latências de leitura/escrita e
+    quantos inserts falharam com "database is locked".
+    """
+    workdir = workdir or os.path.dirname(source_db)
+    modes = {
+        'direto_rollback': ('DELETE', _direct_connection),
+        'pool_wal': ('WAL', read_connection),
+    }
+    report = {}
+    for mode, (journal_mode, connect) in modes.items():
+        db_path = os.path.join(workdir, f"concurrent_{mode}.db")
+        _copy_database(source_db, db_path, journal_mode)
+        migrate(db_path)
+
+        stop = threading.Event()
+        pending_rows = next(generate_rows(WRITER_ROWS, seed=7, chunk_size=WRITER_ROWS))
+        read_times, write_times, write_errors = [], [], []
+
+        def reader():
+            while not stop.is_set():
+                started = time.perf_counter()
+                with connect(db_path) as conn:
+                    for query in CONCURRENT_READ_QUERIES:
+                        conn.execute(query).fetchall()
+                read_times.append(time.perf_counter() - started)
+
+        def writer():
+            while True:
+                for operation, business_log in zip(*pending_rows):
+                    if stop.is_set():
+                        return
+                    started = time.perf_counter()
+                    try:
+                        # Mesmo timeout padrão do driver JDBC do SQLite (3 s)
+                        conn = sqlite3.connect(db_path, timeout=3)
+                        try:
+                            conn.execute(INSERT_OPERATION, operation)
+                            conn.execute(INSERT_BUSINESS_LOG, business_log)
+                            conn.commit()
+                        finally:
+                            conn.close()
+                    except sqlite3.OperationalError as e:
+                        write_errors.append(str(e))
+                    write_times.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        report[mode] = {
+            'reads': len(read_times),
+            'read_ms': _percentiles_ms(read_times),
+            'writes': len(write_times),
+            'write_ms': _percentiles_ms(write_times),
+            'write_errors': len(write_errors),
+        }
+    return report
+
+
+def format_concurrent_report(rows, report):
+    lines = [f"{'linhas':>10}  {'modo':<16} {'leituras':>8} {'leit p50':>9} {'leit p99':>9} "
+             f"{'inserts':>8} {'ins p50':>8} {'ins p99':>8} {'ins máx':>8} {'locked':>7}"]
+    for mode, item in report.items():
+        read_ms, write_ms = item['read_ms'], item['write_ms']
+        lines.append(
+            f"{rows:>10}  {mode:<16} {item['reads']:>8} {read_ms['p50']:>9.1f} {read_ms['p99']:>9.1f} "
+            f"{item['writes']:>8} {write_ms['p50']:>8.1f} {write_ms['p99']:>8.1f} {write_ms['max']:>8.1f} "
+            f"{item['write_errors']:>7}"
+        )
+    return '\n'.join(lines)
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.005):
+    """Etapas cuja mediana piorou mais que ``tolerance`` em relação ao baseline."""
+    previous = {(item['rows'], item['dashboard'], item['stage']): item['median'] for item in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result.rows, result.dashboard, result.stage))
+        # Etapas muito rápidas só oscilam com ruído do sistema
+        if before is None or max(before, result.median) < min_seconds:
+            continue
+        if result.median > before * (1 + tolerance):
+            regressions.append((result, before))
+    return regressions
+
+
+def format_report(results):
+    lines = [f"{'linhas':>10}  {'painel':<10} {'etapa':<17} {'mediana ms':>11} {'melhor ms':>10} {'pico MB':>8}"]
+    for result in results:
+        lines.append(
+            f"{result.rows:>10}  {result.dashboard:<10} {result.stage:<17} "
+            f"{result.median * 1000:>11.1f} {result.best * 1000:>10.1f} {result.peak_bytes / 1024**2:>8.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas dos painéis")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help="tamanhos de base a medir")
+    parser.add_argument('--dashboard', choices=DASHBOARDS, action='append',
+                        help="painel a medir (padrão: os dois)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'soma_benchmark'),
+                        help="onde ficam as bases geradas (reaproveitadas entre execuções)")
+    parser.add_argument('--json', help="grava o resultado neste arquivo")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="piora relativa aceita na mediana (0.25 = 25%%)")
+    parser.add_argument('--concurrent', type=float, default=0, metavar='SEGUNDOS',
+                        help="duração do teste de leitura com inserts simultâneos (0 = não roda)")
+    parser.add_argument('--readers', type=int, default=2,
+                        help="threads de leitura no teste concorrente")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    dashboards = args.dashboard or DASHBOARDS
+
+    results = []
+    concurrent = {}
+    for rows in args.rows:
+        db_path = dataset_path(args.workdir, rows, args.users, args.days, args.seed)
+        results.extend(run_benchmark(db_path, rows, dashboards, args.repeat))
+        if args.concurrent:
+            concurrent[rows] = concurrent_benchmark(db_path, args.concurrent, args.readers, args.workdir)
+    print(format_report(results))
+    for rows, report in concurrent.items():
+        print()
+        print(format_concurrent_report(rows, report))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+
+    # O pool nunca pode fazer um insert da API falhar por lock
+    blocked = [rows for rows, report in concurrent.items() if report['pool_wal']['write_errors']]
+    for rows in blocked:
+        print(f"BLOQUEIO {rows}: inserts falharam com o pool em WAL", file=sys.stderr)
+    if blocked:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for result, before in regressions:
+            print(f"REGRESSÃO {result.rows} {result.dashboard}/{result.stage}: "
+                  f"{before * 1000:.1f} ms -> {result.median * 1000:.1f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
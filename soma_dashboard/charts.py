@@ -0,0 +1,279 @@
+"""Gráficos dos painéis com cache de imagens renderizadas.
+
+Cada gráfico é uma função pura que recebe só o agregado que desenha e
+devolve uma ``Figure`` do matplotlib (API orientada a objetos, sem o estado
+global do ``pyplot``, para poder renderizar em threads). O ``ChartRenderer``
+identifica cada gráfico pelo hash dos seus dados, guarda o PNG resultante
+num cache LRU compartilhado entre sessões e renderiza os que faltam em
+paralelo num pool de threads; reruns sem dados novos não chamam o
+matplotlib. O próprio import do matplotlib (centenas de ms) só acontece na
+primeira renderização, dentro do pool, e não no carregamento dos painéis.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Mesmos parâmetros que o st.pyplot usa ao salvar a figura
+SAVEFIG_OPTIONS = {'format': 'png', 'bbox_inches': 'tight', 'dpi': 200}
+
+PERIOD_COLORS = ['#FFD700', '#FF6347', '#4169E1', '#2F4F4F']  # Cores para manhã, tarde, noite, madrugada
+
+
+def _figure(figsize):
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _annotate_bars(ax, bars, labels):
+    # Adicionar valores nas barras
+    for bar, label in zip(bars, labels):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                label, ha='center', va='bottom')
+
+
+def operations_by_user(user_counts):
+    fig = _figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bars = ax.bar(range(len(user_counts)), user_counts.values, color='lightblue', alpha=0.8)
+    ax.set_xlabel('Usuários')
+    ax.set_ylabel('Número de Operações')
+    ax.set_title('Operações por Usuário')
+    ax.set_xticks(range(len(user_counts)))
+    ax.set_xticklabels(user_counts.index, rotation=45)
+    _annotate_bars(ax, bars, [f'{count}' for count in user_counts.values])
+    fig.tight_layout()
+    return fig
+
+
+def avg_time_by_user(users, avg_times):
+    fig = _figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bars = ax.bar(range(len(users)), avg_times, color='lightcoral', alpha=0.8)
+    ax.set_xlabel('Usuários')
+    ax.set_ylabel('Tempo Médio (ms)')
+    ax.set_title('Tempo Médio de Execução por Usuário')
+    ax.set_xticks(range(len(users)))
+    ax.set_xticklabels(users, rotation=45)
+    _annotate_bars(ax, bars, [f'{time_val:.1f}ms' for time_val in avg_times])
+    fig.tight_layout()
+    return fig
+
+
+def operations_by_hour(hour_counts):
+    fig = _figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.plot(hour_counts.index, hour_counts.values, marker='o', linewidth=2, markersize=6)
+    ax.set_xlabel('Hora do Dia')
+    ax.set_ylabel('Número de Operações')
+    ax.set_title('Distribuição de Operações por Hora')
+    ax.set_xticks(range(0, 24, 2))
+    ax.grid(True, alpha=0.3)
+
+    # Destacar picos
+    max_hour = hour_counts.idxmax()
+    max_count = hour_counts.max()
+    ax.annotate(f'Pico: {max_count} ops\nàs {max_hour}h',
+                xy=(max_hour, max_count),
+                xytext=(max_hour+2, max_count+1),
+                arrowprops=dict(arrowstyle='->', color='red'))
+    return fig
+
+
+def operations_by_period(period_counts):
+    fig = _figure(figsize=(8, 8))
+    ax = fig.subplots()
+    ax.pie(period_counts.values,
+           labels=period_counts.index,
+           autopct='%1.1f%%',
+           colors=PERIOD_COLORS,
+           startangle=90)
+    ax.set_title('Distribuição por Período do Dia')
+    return fig
+
+
+def history(df_history, granularity_label):
+    fig = _figure(figsize=(12, 5))
+    ax = fig.subplots()
+    ax.plot(df_history['bucket'], df_history['operations'], color='steelblue', linewidth=2, label='Operações')
+    ax.set_xlabel('Período')
+    ax.set_ylabel('Número de Operações')
+    ax.set_title(f"Operações e Tempo Médio por {granularity_label.lower()}")
+    ax.grid(True, alpha=0.3)
+
+    ax_time = ax.twinx()
+    ax_time.plot(df_history['bucket'], df_history['execution_time_avg'], color='lightcoral', linewidth=1.5, label='Tempo médio (ms)')
+    ax_time.set_ylabel('Tempo Médio (ms)')
+
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+
+def execution_time(points, bucket_label):
+    """Tempo de execução na janela: média e faixa mín–máx de cada bucket.
+
+    ``points`` vem de ``soma_dashboard.windows`` (colunas timestamp,
+    avg_ms, min_ms, max_ms); com pontos individuais a faixa some.
+    """
+    fig = _figure(figsize=(10, 6))
+    ax = fig.subplots()
+
+    ax.fill_between(points['timestamp'], points['min_ms'], points['max_ms'],
+                    color='steelblue', alpha=0.2, linewidth=0, label='Mín–máx')
+    ax.plot(points['timestamp'], points['avg_ms'], color='steelblue', linewidth=1.5,
+            marker='o' if len(points) <= 50 else None, markersize=4, label='Média')
+    ax.set_xlabel('Horário (UTC)')
+    ax.set_ylabel('Tempo (ms)')
+    ax.set_title(f'Tempo de Execução ({bucket_label})')
+    ax.grid(True, alpha=0.3)
+
+    # Destaca o pior tempo da janela (o pico não se perde na média do bucket)
+    if len(points):
+        peak = points['max_ms'].idxmax()
+        peak_time, peak_value = points.loc[peak, 'timestamp'], points.loc[peak, 'max_ms']
+        ax.annotate(f'{peak_value}ms', (peak_time, peak_value), textcoords="offset points",
+                    xytext=(0, 8), ha='center', color='firebrick')
+    ax.legend(loc='upper left')
+
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+
+def results_histogram(results):
+    fig = _figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.hist(results, bins=min(10, len(set(results))), alpha=0.7, color='skyblue', edgecolor='black')
+    ax.set_xlabel('Resultado da Soma')
+    ax.set_ylabel('Frequência')
+    ax.set_title('Distribuição dos Resultados')
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+def operation_labels(df):
+    """Rótulos ``a+b=resultado`` das operações, numa concatenação vetorizada."""
+    return (df['input_a'].astype(str) + '+' + df['input_b'].astype(str) + '=' + df['result'].astype(str)).tolist()
+
+
+def slowest_operations(labels, times):
+    fig = _figure(figsize=(12, 6))
+    ax = fig.subplots()
+    bars = ax.bar(range(len(labels)), times, color='lightcoral', alpha=0.8)
+    ax.set_xlabel('Operações')
+    ax.set_ylabel('Tempo (ms)')
+    ax.set_title('Top 5 Operações Mais Lentas')
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=45)
+    _annotate_bars(ax, bars, [f'{time_val}ms' for time_val in times])
+    fig.tight_layout()
+    return fig
+
+
+def percentiles_over_time(df_percentiles, granularity_label):
+    fig = _figure(figsize=(12, 5))
+    ax = fig.subplots()
+    for name in ['p50', 'p90', 'p95', 'p99']:
+        ax.plot(df_percentiles.index, df_percentiles[name], linewidth=1.5, label=name)
+    ax.set_xlabel('Período')
+    ax.set_ylabel('Tempo (ms)')
+    ax.set_title(f"Percentis de Tempo de Execução por {granularity_label.lower()}")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+
+def _fingerprint(value, digest):
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(repr(list(names)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype}{value.shape}".encode())
+        if value.dtype == object:
+            digest.update(pd.util.hash_array(value.ravel()).tobytes())
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _fingerprint(item, digest)
+    else:
+        digest.update(repr(value).encode())
+
+
+def chart_key(chart, args, kwargs):
+    """Hash do gráfico + dados de entrada (a chave do cache)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{chart.__module__}.{chart.__qualname__}".encode())
+    _fingerprint(list(args), digest)
+    _fingerprint(sorted(kwargs.items()), digest)
+    return digest.hexdigest()
+
+
+class ChartRenderer:
+    """Cache LRU de PNGs + pool de threads para renderizar os que faltam.
+
+    Pedidos simultâneos do mesmo gráfico (mesma chave) compartilham a mesma
+    renderização em andamento.
+    """
+
+    def __init__(self, max_entries=64, max_workers=4):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='soma-charts')
+
+    def submit(self, chart, *args, **kwargs):
+        """Agenda o gráfico e retorna um ``Future`` com os bytes do PNG."""
+        key = chart_key(chart, args, kwargs)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.cache_hit = True  # lido pela instrumentação dos painéis
+                future.set_result(self._cache[key])
+                return future
+            if key in self._pending:
+                self.hits += 1
+                return self._pending[key]
+
+            self.misses += 1
+            future = self._executor.submit(self._render, key, chart, args, kwargs)
+            self._pending[key] = future
+            return future
+
+    def render(self, chart, *args, **kwargs):
+        return self.submit(chart, *args, **kwargs).result()
+
+    def _render(self, key, chart, args, kwargs):
+        try:
+            fig = chart(*args, **kwargs)
+            buffer = BytesIO()
+            fig.savefig(buffer, **SAVEFIG_OPTIONS)
+            png = buffer.getvalue()
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+            raise
+
+        with self._lock:
+            self._pending.pop(key, None)
+            self._cache[key] = png
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return png
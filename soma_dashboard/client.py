@@ -0,0 +1,154 @@
+"""Cliente do ``soma_dashboard.service`` com a interface do ``DashboardBackend``.
+
+Os painéis chamam os mesmos métodos com os mesmos argumentos e recebem os
+mesmos tipos, venha o dado do processo local ou do serviço. Cada thread
+mantém a sua conexão HTTP aberta (keep-alive), e DataFrames chegam em
+Arrow quando o ``pyarrow`` está instalado.
+
+Erros do serviço viram exceções: banco inexistente -> ``FileNotFoundError``
+(a mesma do backend local), o resto -> ``ServiceError``.
+"""
+import http.client
+import json
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from soma_dashboard import payloads
+from soma_dashboard.service import ROUTES, encode_params
+
+
+class ServiceError(RuntimeError):
+    """Falha devolvida pelo serviço (ou serviço fora do ar)."""
+
+    def __init__(self, message, status=None, error=None):
+        self.status = status
+        self.error = error
+        super().__init__(message)
+
+
+# método do backend -> (caminho, {parâmetro: tipo})
+_METHODS = {method: (path, spec) for path, (method, spec, _) in ROUTES.items()}
+
+
+class ServiceClient:
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _request(self, http_method, path):
+        headers = {'Accept': payloads.JSON_CONTENT_TYPE}
+        if payloads.arrow_available():
+            headers['Accept'] = f"{payloads.ARROW_CONTENT_TYPE}, {payloads.JSON_CONTENT_TYPE}"
+        # Conexão keep-alive que o servidor fechou: uma nova tentativa com conexão nova
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(http_method, path, headers=headers)
+                response = conn.getresponse()
+                return response.status, response.getheader('Content-Type', ''), response.read()
+            except (ConnectionError, http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise ServiceError(f"Serviço indisponível em {self.url}: {e}") from e
+
+    def _call(self, method, http_method='GET', **params):
+        path, spec = _METHODS[method]
+        query = urlencode(encode_params(spec, params))
+        status, content_type, body = self._request(http_method, f"{path}?{query}" if query else path)
+
+        if status != 200:
+            try:
+                error = json.loads(body)
+            except ValueError:
+                error = {'error': 'HTTPError', 'message': body.decode(errors='replace')}
+            if status == 404 and error.get('error') == 'FileNotFoundError':
+                raise FileNotFoundError(error['message'])
+            raise ServiceError(error.get('message', ''), status=status, error=error.get('error'))
+
+        if content_type.startswith(payloads.ARROW_CONTENT_TYPE):
+            return payloads.arrow_to_frame(body)
+        return payloads.loads(body)
+
+    def health(self):
+        status, _, body = self._request('GET', '/health')
+        return json.loads(body)
+
+    def poll(self):
+        return self._call('poll')
+
+    def refresh(self):
+        return self._call('refresh', http_method='POST')
+
+    def recent(self, table, limit=20, users=None, periods=None):
+        return self._call('recent', table=table, limit=limit, users=users, periods=periods)
+
+    def row_count(self, table):
+        return self._call('row_count', table=table)
+
+    def replicas(self):
+        return self._call('replicas')
+
+    def operation_stats(self, exact=False):
+        return self._call('operation_stats', exact=exact)
+
+    def distinct_count(self, table, column, since=None, until=None, exact=False):
+        return self._call('distinct_count', table=table, column=column, since=since, until=until, exact=exact)
+
+    def latency(self, table):
+        return self._call('latency', table=table)
+
+    def user_percentiles(self):
+        return self._call('user_percentiles')
+
+    def top_slowest(self, table='operations'):
+        return self._call('top_slowest', table=table)
+
+    def percentiles_over_time(self, table='operations', freq='h'):
+        return self._call('percentiles_over_time', table=table, freq=freq)
+
+    def memory(self, table):
+        return self._call('memory', table=table)
+
+    def summary(self):
+        return self._call('summary')
+
+    def history(self, source, granularity='hour'):
+        return self._call('history', source=source, granularity=granularity)
+
+    def execution_window(self, since, until, max_points=None):
+        return self._call('execution_window', since=since, until=until, max_points=max_points)
+
+    def logs_page(self, users=None, periods=None, since=None, until=None, cursor=None, page_size=50):
+        return self._call('logs_page', users=users, periods=periods, since=since, until=until,
+                          cursor=cursor, page_size=page_size)
+
+    def log_detail(self, log_id):
+        return self._call('log_detail', log_id=log_id)
+
+    def trace(self, key):
+        return self._call('trace', key=key)
+
+    def recent_traces(self, n=20):
+        return self._call('recent_traces', n=n)
+
+    def trace_counts(self):
+        return self._call('trace_counts')
+
+    def anomalies(self, window=None):
+        return self._call('anomalies', window=window)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,68 @@
+"""Seletor e detalhe de um log de negócio.
+
+Os rótulos do seletor são montados de uma vez só (concatenação vetorizada)
+num dicionário ``id -> rótulo``, então o ``format_func`` do ``selectbox`` é
+uma busca O(1). O detalhe é buscado sob demanda pela chave primária, já com
+a linha correspondente de ``operations`` (via ``operation_id``), em vez de
+andar junto com cada linha da página.
+"""
+import sqlite3
+
+import pandas as pd
+
+from soma_dashboard.pool import read_connection
+
+DETAIL_QUERY = """
+SELECT
+    b.id,
+    b.operation_id,
+    b.user_id,
+    b.timestamp,
+    b.hour_of_day,
+    b.day_period,
+    b.operation_type,
+    b.input_values,
+    b.result_value,
+    b.execution_time_ms,
+    b.trace_id,
+    b.ip_address,
+    b.status,
+    b.message,
+    o.timestamp as operation_timestamp,
+    o.input_a,
+    o.input_b,
+    o.result as operation_result,
+    o.execution_time_ms as operation_execution_time_ms,
+    o.span_id
+FROM business_logs b
+LEFT JOIN operations o ON o.id = b.operation_id
+WHERE b.id = ?
+"""
+
+
+def build_log_labels(df):
+    """``{id: "usuário - a + b = resultado (HH:MM:SS)"}`` numa única passada."""
+    if df.empty:
+        return {}
+    labels = (
+        df['user_id'].astype(str) + ' - '
+        + df['input_values'].astype(str) + ' = '
+        + df['result_value'].astype(str)
+        + ' (' + df['timestamp'].dt.strftime('%H:%M:%S') + ')'
+    )
+    return dict(zip(df['id'].tolist(), labels.tolist()))
+
+
+def fetch_log_detail(db_path, log_id):
+    """Log completo + operação associada, ou None se o id não existir."""
+    with read_connection(db_path) as conn:
+        # row_factory só no cursor: a conexão volta ao pool sem alteração
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute(DETAIL_QUERY, (int(log_id),)).fetchone()
+
+    if row is None:
+        return None
+    detail = dict(row)
+    detail['timestamp'] = pd.to_datetime(detail['timestamp'])
+    return detail
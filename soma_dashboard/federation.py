@@ -0,0 +1,332 @@
+"""Leitura federada de vários soma_logs.db, um por réplica da Soma API.
+
+Em produção cada réplica grava o seu próprio SQLite pelo
+``LoggingService``. O ``FederatedBackend`` tem a interface do
+``DashboardBackend`` e mantém um backend por banco (stores, sketches e
+caches próprios). Cada chamada roda em todas as réplicas ao mesmo tempo
+num pool de threads, e o que volta são resultados parciais já agregados
+— contagens, somas, sketches, top-N, estatísticas por usuário — que são
+combinados aqui, em vez de concatenar as linhas de todos os bancos num
+DataFrame só.
+
+As linhas que aparecem nas páginas (``recent``, ``logs_page``) ganham a
+coluna ``replica``, e o id de um log passa a ser ``"réplica:id"``: os ids
+de ``business_logs`` se repetem entre bancos. Uma réplica fora do ar não
+derruba o painel; os resultados vêm das demais e ``replicas()`` mostra
+quais bancos existem. Só quando nenhuma responde o erro sobe.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from soma_dashboard import windows
+from soma_dashboard.aggregates import merge_summaries
+from soma_dashboard.anomalies import merge_baselines
+from soma_dashboard.backend import DashboardBackend, default_snapshot_dir
+from soma_dashboard.pagination import LogPage
+from soma_dashboard.rollups import merge_rollups
+from soma_dashboard.sketches import DistinctTracker, LatencyTracker
+from soma_dashboard.traces import Trace
+
+MAX_WORKERS = 16
+# Cursor de uma réplica que já entregou todas as linhas
+EXHAUSTED = 'fim'
+
+
+def replica_names(paths):
+    """Nome curto e único de cada banco: o arquivo, a pasta ou, em último caso, a posição."""
+    candidates = [
+        [os.path.splitext(os.path.basename(path))[0] for path in paths],
+        [os.path.basename(os.path.dirname(os.path.abspath(path))) for path in paths],
+    ]
+    for names in candidates:
+        if len(set(names)) == len(names):
+            return names
+    return [f"{name}-{i}" for i, name in enumerate(candidates[0], start=1)]
+
+
+def _weighted_median(medians, weights):
+    # Mediana das medianas ponderada pelas operações: aproximação, sem ler as linhas
+    pairs = sorted((m, w) for m, w in zip(medians, weights) if m is not None and not pd.isna(m) and w)
+    if not pairs:
+        return None
+    half, running = sum(w for _, w in pairs) / 2, 0
+    for median, weight in pairs:
+        running += weight
+        if running >= half:
+            return median
+
+
+class FederatedBackend:
+    """Interface do ``DashboardBackend`` sobre várias réplicas."""
+
+    def __init__(self, backends, max_workers=MAX_WORKERS):
+        self.backends = dict(backends)
+        self.db_path = os.pathsep.join(backend.db_path for backend in self.backends.values())
+        self._executor = ThreadPoolExecutor(max_workers=min(max_workers, len(self.backends)),
+                                            thread_name_prefix='soma-dashboard-federation')
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_paths(cls, paths, snapshot_dir=None, **options):
+        backends = {}
+        for name, path in zip(replica_names(paths), paths):
+            # Snapshots por réplica: os arquivos são nomeados só pela tabela
+            base = snapshot_dir or default_snapshot_dir(path)
+            backends[name] = DashboardBackend(path, os.path.join(base, name), **options)
+        return cls(backends)
+
+    # Execução nas réplicas
+
+    def _gather(self, call):
+        """``call(backend)`` em todas as réplicas: ``{nome: resultado}`` das que responderam."""
+        futures = {name: self._executor.submit(call, backend) for name, backend in self.backends.items()}
+        results, errors = {}, []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except FileNotFoundError as e:
+                errors.append(e)
+        if not results:
+            raise errors[0]
+        return results
+
+    @property
+    def version(self):
+        return sum(backend.version for backend in self.backends.values())
+
+    def _cached(self, key, compute):
+        # Resultados combinados a partir dos sketches valem até o próximo delta em alguma réplica
+        version = self.version
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and entry[1] == version:
+            return entry[0]
+        value = compute()
+        with self._lock:
+            if len(self._cache) > 256:
+                self._cache.clear()
+            self._cache[key] = (value, version)
+        return value
+
+    @staticmethod
+    def _tag(frames, sort_by=None, limit=None):
+        # Linhas das réplicas numa tabela só, com a origem de cada uma
+        tagged = [frame.assign(replica=name) for name, frame in frames.items() if not frame.empty]
+        if not tagged:
+            # Nenhuma linha: mantém as colunas que as páginas esperam
+            empty = next(iter(frames.values()), pd.DataFrame())
+            return empty.iloc[0:0].assign(replica=pd.Series(dtype=object))
+        df = pd.concat(tagged, ignore_index=True)
+        if sort_by is not None:
+            df = df.sort_values(sort_by, ascending=False, kind='stable', ignore_index=True)
+        return df.head(limit) if limit is not None else df
+
+    # Atualização
+
+    def poll(self):
+        return sum(self._gather(lambda backend: backend.poll()).values())
+
+    def refresh(self):
+        with self._lock:
+            self._cache.clear()
+        return sum(self._gather(lambda backend: backend.refresh()).values())
+
+    # Linhas e estatísticas dos stores
+
+    def recent(self, table, limit=20, users=None, periods=None):
+        frames = self._gather(lambda backend: backend.recent(table, limit, users, periods))
+        return self._tag(frames, sort_by='timestamp', limit=limit)
+
+    def row_count(self, table):
+        return sum(self._gather(lambda backend: backend.row_count(table)).values())
+
+    def replicas(self):
+        return {name: os.path.exists(backend.db_path) for name, backend in self.backends.items()}
+
+    def operation_stats(self, exact=False):
+        parts = list(self._gather(lambda backend: backend.operation_stats()).values())
+        totals = [part['total'] for part in parts]
+        total = sum(totals)
+
+        def weighted(key):
+            return sum(part[key] * part['total'] for part in parts) / total if total else 0.0
+
+        def extreme(key, pick):
+            values = [part[key] for part in parts if part[key] is not None and not pd.isna(part[key])]
+            return pick(values) if values else None
+
+        return {
+            'total': total,
+            'avg_execution_time': weighted('avg_execution_time'),
+            'result_min': extreme('result_min', min),
+            'result_max': extreme('result_max', max),
+            'result_mean': weighted('result_mean'),
+            'result_median': _weighted_median([part['result_median'] for part in parts], totals),
+            'unique_traces': self.distinct_count('operations', 'trace_id', exact=exact),
+            'first_operation': extreme('first_operation', min),
+            'last_operation': extreme('last_operation', max),
+        }
+
+    def distinct_tracker(self, table):
+        trackers = self._gather(lambda backend: backend.distinct_tracker(table))
+        return self._cached(('distinct_tracker', table), lambda: DistinctTracker.merged(trackers.values()))
+
+    def distinct_count(self, table, column, since=None, until=None, exact=False):
+        """Distintos em todas as réplicas: união dos HyperLogLog (ou dos valores, com ``exact``)."""
+        if exact:
+            def compute():
+                parts = self._gather(lambda backend: backend.distinct_values(table, column, since, until))
+                return len(set().union(*parts.values()))
+            return self._cached(('distinct_exact', table, column, since, until), compute)
+        tracker = self.distinct_tracker(table)
+        return self._cached(('distinct', table, column, since, until),
+                            lambda: tracker.count(column, since, until))
+
+    def latency_tracker(self, table):
+        trackers = self._gather(lambda backend: backend.latency_tracker(table))
+        return self._cached(('tracker', table), lambda: LatencyTracker.merged(trackers.values()))
+
+    def latency(self, table):
+        tracker = self.latency_tracker(table)
+        return {
+            'percentiles': tracker.percentiles(),
+            'min': tracker.total.min,
+            'max': tracker.total.max,
+            'std': tracker.total.std,
+        }
+
+    def user_percentiles(self):
+        return self.latency_tracker('business_logs').user_percentiles()
+
+    def top_slowest(self, table='operations'):
+        return self.latency_tracker(table).top_slowest()
+
+    def percentiles_over_time(self, table='operations', freq='h'):
+        tracker = self.latency_tracker(table)
+        return self._cached(('percentiles_over_time', table, freq), lambda: tracker.over_time(freq))
+
+    def memory(self, table):
+        parts = self._gather(lambda backend: backend.memory(table)).values()
+        total = sum(usage for usage, _ in parts)
+        rows = sum(usage / per_row for usage, per_row in parts if per_row)
+        return total, total / rows if rows else 0.0
+
+    # Consultas ao SQLite
+
+    def summary(self):
+        return merge_summaries(self._gather(lambda backend: backend.summary()).values())
+
+    def history(self, source, granularity='hour'):
+        return merge_rollups(self._gather(lambda backend: backend.history(source, granularity)).values())
+
+    def execution_window(self, since, until, max_points=windows.DEFAULT_MAX_POINTS):
+        parts = self._gather(lambda backend: backend.execution_window(since, until, max_points))
+        return windows.merge_windows(parts.values(), max_points)
+
+    def logs_page(self, users=None, periods=None, since=None, until=None, cursor=None, page_size=50):
+        """Página por keyset em cada réplica, intercaladas por timestamp.
+
+        O cursor é ``{réplica: cursor da réplica}``: cada uma continua de onde
+        parou a sua última linha exibida, então nenhuma linha se repete nem
+        fica de fora entre páginas.
+        """
+        cursor = cursor or {}
+        active = {name: backend for name, backend in self.backends.items() if cursor.get(name) != EXHAUSTED}
+        futures = {
+            name: self._executor.submit(
+                backend.logs_page, users=users, periods=periods, since=since, until=until,
+                cursor=tuple(cursor[name]) if cursor.get(name) else None, page_size=page_size,
+            )
+            for name, backend in active.items()
+        }
+        pages, errors = {}, []
+        for name, future in futures.items():
+            try:
+                pages[name] = future.result()
+            except FileNotFoundError as e:
+                errors.append(e)
+        if not pages and errors:
+            raise errors[0]
+
+        merged = self._tag({name: page.rows for name, page in pages.items()})
+        if not merged.empty:
+            merged = merged.sort_values(['timestamp', 'replica', 'id'], ascending=[False, True, False],
+                                        kind='stable', ignore_index=True).head(page_size)
+
+        next_cursor = {name: cursor.get(name) for name in self.backends}
+        has_more = False
+        for name, page in pages.items():
+            shown = merged[merged['replica'] == name] if not merged.empty else merged
+            if len(shown):
+                last = shown.iloc[-1]
+                next_cursor[name] = (last['timestamp'].strftime('%Y-%m-%d %H:%M:%S'), int(last['id']))
+            if len(shown) < len(page.rows) or page.has_next:
+                has_more = True
+            else:
+                next_cursor[name] = EXHAUSTED
+
+        if not merged.empty:
+            merged['id'] = merged['replica'].astype(str) + ':' + merged['id'].astype(str)
+        return LogPage(merged, next_cursor if has_more else None)
+
+    def log_detail(self, log_id):
+        """Detalhe de ``"réplica:id"`` (o id das páginas federadas)."""
+        name, _, local_id = str(log_id).rpartition(':')
+        if name not in self.backends:
+            raise ValueError(f"Réplica desconhecida no id do log: {log_id}")
+        detail = self.backends[name].log_detail(local_id)
+        if detail is not None:
+            detail = dict(detail, id=f"{name}:{detail['id']}", replica=name)
+        return detail
+
+    # Traces e anomalias
+
+    def trace(self, key):
+        found = {name: trace for name, trace in self._gather(lambda backend: backend.trace(key)).items()
+                 if trace is not None}
+        if not found:
+            return None
+        # Normalmente uma réplica só; um trace que passou por várias junta as linhas de todas
+        trace_id = next(iter(found.values())).trace_id
+        return Trace(
+            trace_id,
+            self._tag({name: trace.operations for name, trace in found.items() if trace.operations is not None}),
+            self._tag({name: trace.business_logs for name, trace in found.items()
+                       if trace.business_logs is not None}),
+        )
+
+    def recent_traces(self, n=20):
+        # Os índices não guardam horário: intercala as listas (cada uma já da mais recente)
+        lists = list(self._gather(lambda backend: backend.recent_traces(n)).values())
+        merged = []
+        for position in range(n):
+            for trace_ids in lists:
+                if position < len(trace_ids) and trace_ids[position] not in merged:
+                    merged.append(trace_ids[position])
+        return merged[:n]
+
+    def trace_counts(self):
+        counts = {}
+        for part in self._gather(lambda backend: backend.trace_counts()).values():
+            for name, count in part.items():
+                counts[name] = counts.get(name, 0) + count
+        return counts
+
+    def anomalies(self, window=pd.Timedelta(hours=1)):
+        parts = self._gather(lambda backend: backend.anomalies(window))
+        return {
+            'total_flagged': sum(part['total_flagged'] for part in parts.values()),
+            'rows_seen': sum(part['rows_seen'] for part in parts.values()),
+            'recent': self._tag({name: part['recent'] for name, part in parts.items()}, sort_by='timestamp'),
+            'flagged': self._tag({name: part['flagged'] for name, part in parts.items()}, sort_by='timestamp'),
+            'baselines': merge_baselines(part['baselines'] for part in parts.values()),
+        }
+
+    def close(self):
+        for backend in self.backends.values():
+            backend.close()
+        self._executor.shutdown(wait=False)
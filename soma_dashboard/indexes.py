@@ -0,0 +1,241 @@
+"""Migrações de índices do soma_logs.db e conferência dos planos dos painéis.
+
+O ``LoggingService`` cria as tabelas só com as chaves primárias. Os painéis
+ordenam por ``timestamp``, filtram por ``user_id``/``day_period``, agregam
+por usuário, buscam o detalhe pelo ``operation_id`` e recortam
+``operations`` por janela de tempo; cada migração abaixo
+cria os índices de um desses padrões e fica registrada em
+``dashboard_migrations`` para rodar uma única vez por banco.
+
+``check_queries`` roda ``EXPLAIN QUERY PLAN`` em cada consulta que os
+painéis emitem (``dashboard_queries``) e aponta as que fariam full scan
+numa tabela acima do limite — as mesmas que o ``QueryGuard`` do pool
+recusa em tempo de execução.
+
+Uso::
+
+    python -m soma_dashboard.indexes /caminho/soma_logs.db           # migra e confere
+    python -m soma_dashboard.indexes /caminho/soma_logs.db --check   # só confere
+    python -m soma_dashboard.indexes /caminho/soma_logs.db --wal     # migra e passa para WAL
+
+Criar índices numa tabela grande segura o lock de escrita enquanto roda;
+cada índice tem a sua própria transação, mas em bases de milhões de linhas
+prefira rodar pela linha de comando fora do horário de pico.
+
+``--wal`` passa o journal do banco para WAL, para que os leitores dos
+painéis não atrasem os commits do ``LoggingService``. A configuração fica
+gravada no arquivo e vale também para a Soma API; o pool dos painéis nunca
+a altera por conta própria (ver ``soma_dashboard.pool``).
+"""
+import argparse
+import sqlite3
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from soma_dashboard.aggregates import (
+    HOUR_COUNTS_QUERY,
+    PERIOD_COUNTS_QUERY,
+    TOTALS_QUERY,
+    USER_PERIOD_QUERY,
+    USER_STATS_QUERY,
+)
+from soma_dashboard.archive import OPERATION_DETAIL_QUERY
+from soma_dashboard.details import DETAIL_QUERY
+from soma_dashboard.pagination import build_page_query
+from soma_dashboard.pool import enable_wal
+from soma_dashboard.queryplan import DEFAULT_MAX_SCAN_ROWS, explain, full_scans
+from soma_dashboard.rollups import DEFAULT_WINDOWS, ROLLUP_SOURCES, build_rollup_query
+from soma_dashboard.schema import BUSINESS_LOG_SCHEMA, OPERATION_SCHEMA
+from soma_dashboard.store import LogStore
+from soma_dashboard.windows import BUCKETS_QUERY, COUNT_QUERY, POINTS_QUERY
+
+MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS dashboard_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# (versão, descrição, comandos) — nunca altere uma migração já publicada, crie outra
+MIGRATIONS = [
+    (1, "Paginação dos logs por tempo e por usuário", [
+        "CREATE INDEX IF NOT EXISTS idx_business_logs_timestamp ON business_logs (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_business_logs_user_timestamp ON business_logs (user_id, timestamp)",
+    ]),
+    (2, "Filtro por período, join com operations e agregações por usuário", [
+        "CREATE INDEX IF NOT EXISTS idx_business_logs_period_timestamp ON business_logs (day_period, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_business_logs_operation_id ON business_logs (operation_id)",
+        # Cobre cards, estatísticas por usuário/período/hora: as agregações leem só o índice
+        "CREATE INDEX IF NOT EXISTS idx_business_logs_user_stats ON business_logs "
+        "(user_id, day_period, hour_of_day, timestamp, execution_time_ms, result_value)",
+    ]),
+    (3, "Tempo de execução por janela de tempo", [
+        # Cobre a contagem, os pontos e os buckets de soma_dashboard.windows
+        "CREATE INDEX IF NOT EXISTS idx_operations_timestamp ON operations (timestamp, execution_time_ms)",
+    ]),
+]
+
+# Valores de exemplo para os planos (o plano não depende dos valores, só da forma)
+_SAMPLE_USERS = ['user1', 'user2']
+_SAMPLE_PERIODS = ['MORNING', 'AFTERNOON']
+_SAMPLE_SINCE = '2024-01-01 00:00:00'
+_SAMPLE_UNTIL = '2024-01-02 00:00:00'
+_SAMPLE_CURSOR = ('2024-01-01 12:00:00', 1000)
+
+
+@dataclass
+class QueryCheck:
+    name: str
+    plan: list
+    scanned_tables: list     # tabelas lidas por inteiro, com o tamanho: [(tabela, linhas)]
+    max_scan_rows: int
+    error: str = None
+
+    @property
+    def refused(self):
+        return any(rows > self.max_scan_rows for _, rows in self.scanned_tables)
+
+
+def applied_versions(conn):
+    conn.execute(MIGRATIONS_TABLE)
+    return {row[0] for row in conn.execute("SELECT version FROM dashboard_migrations")}
+
+
+def migrate(db_path, timeout=5):
+    """Aplica as migrações pendentes; retorna as versões aplicadas agora."""
+    conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+    try:
+        done = applied_versions(conn)
+        applied = []
+        for version, description, statements in MIGRATIONS:
+            if version in done:
+                continue
+            # Uma transação por índice: o lock de escrita fica preso o mínimo possível
+            for statement in statements:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(statement)
+                conn.execute("COMMIT")
+            conn.execute(
+                "INSERT INTO dashboard_migrations (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            applied.append(version)
+
+        if applied:
+            # Estatísticas para o planner escolher entre os índices (amostradas: rápido)
+            conn.execute("PRAGMA analysis_limit = 1000")
+            conn.execute("ANALYZE business_logs")
+            conn.execute("ANALYZE operations")
+        return applied
+    finally:
+        conn.close()
+
+
+def dashboard_queries():
+    """``[(nome, sql, parâmetros)]`` de todas as consultas de leitura dos painéis."""
+    queries = []
+    for table, schema, key in (('operations', OPERATION_SCHEMA, 'rowid'),
+                               ('business_logs', BUSINESS_LOG_SCHEMA, 'id')):
+        store = LogStore(None, table, schema, key=key)
+        queries.append((f"store.{table}.max", f"SELECT MAX({key}) FROM {table}", ()))
+        queries.append((f"store.{table}.delta", store.delta_query(), (0,)))
+
+    queries += [
+        ('aggregates.totals', TOTALS_QUERY, ()),
+        ('aggregates.user_stats', USER_STATS_QUERY, ()),
+        ('aggregates.hour_counts', HOUR_COUNTS_QUERY, ()),
+        ('aggregates.period_counts', PERIOD_COUNTS_QUERY, ()),
+        ('aggregates.user_periods', USER_PERIOD_QUERY, ()),
+        ('details.log', DETAIL_QUERY, (1,)),
+        ('archive.operation', OPERATION_DETAIL_QUERY, ('00000000-0000-0000-0000-000000000000',)),
+        ('windows.count', COUNT_QUERY, (_SAMPLE_SINCE, _SAMPLE_UNTIL)),
+        ('windows.points', POINTS_QUERY, (_SAMPLE_SINCE, _SAMPLE_UNTIL)),
+        ('windows.buckets', BUCKETS_QUERY, (60, 60, _SAMPLE_SINCE, _SAMPLE_UNTIL)),
+    ]
+
+    pages = {
+        'pagination.all': {},
+        'pagination.users': {'users': _SAMPLE_USERS},
+        'pagination.periods': {'periods': _SAMPLE_PERIODS},
+        'pagination.users_periods': {'users': _SAMPLE_USERS, 'periods': _SAMPLE_PERIODS},
+        'pagination.window': {'users': _SAMPLE_USERS, 'periods': _SAMPLE_PERIODS,
+                              'since': _SAMPLE_SINCE, 'until': _SAMPLE_UNTIL},
+        'pagination.next_page': {'users': _SAMPLE_USERS, 'periods': _SAMPLE_PERIODS,
+                                 'cursor': _SAMPLE_CURSOR},
+    }
+    for name, filters in pages.items():
+        queries.append((name, *build_page_query(**filters)))
+
+    for source in ROLLUP_SOURCES:
+        for granularity in ('hour', 'minute'):
+            queries.append((f"rollups.{source}.{granularity}",
+                            *build_rollup_query(source, granularity, since=_SAMPLE_SINCE)))
+            # Leitura padrão do histórico: janela contada do bucket mais recente
+            queries.append((f"rollups.{source}.{granularity}.default",
+                            *build_rollup_query(source, granularity, window=DEFAULT_WINDOWS[granularity])))
+    return queries
+
+
+def check_queries(db_path, max_scan_rows=DEFAULT_MAX_SCAN_ROWS):
+    """``EXPLAIN QUERY PLAN`` de cada consulta dos painéis -> ``[QueryCheck]``."""
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        sizes = {}
+        checks = []
+        for name, sql, params in dashboard_queries():
+            try:
+                plan = explain(conn, sql, params)
+            except sqlite3.OperationalError as e:
+                # Ex.: rollups ainda não criados
+                checks.append(QueryCheck(name, [], [], max_scan_rows, error=str(e)))
+                continue
+
+            scanned = []
+            for table in full_scans(sql, plan):
+                if table not in sizes:
+                    sizes[table] = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+                scanned.append((table, sizes[table]))
+            checks.append(QueryCheck(name, plan, scanned, max_scan_rows))
+        return checks
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra os índices do soma_logs.db e confere os planos")
+    parser.add_argument('db_path')
+    parser.add_argument('--check', action='store_true', help="só confere os planos, sem migrar")
+    parser.add_argument('--wal', action='store_true',
+                        help="passa o journal do banco para WAL (vale também para a Soma API)")
+    parser.add_argument('--max-scan-rows', type=int, default=DEFAULT_MAX_SCAN_ROWS,
+                        help="maior tabela que uma consulta pode ler por inteiro")
+    args = parser.parse_args(argv)
+
+    if not args.check:
+        applied = migrate(args.db_path)
+        print(f"Migrações aplicadas: {applied or 'nenhuma pendente'}")
+    if args.wal:
+        print(f"Journal: {enable_wal(args.db_path)}")
+
+    checks = check_queries(args.db_path, args.max_scan_rows)
+    for check in checks:
+        if check.error:
+            print(f"  ?  {check.name}: {check.error}")
+            continue
+        status = 'FULL SCAN' if check.refused else 'ok'
+        print(f"{status:>9}  {check.name}: {' | '.join(check.plan)}")
+        for table, rows in check.scanned_tables:
+            print(f"{'':>11}lê {table} inteira (~{rows} linhas)")
+
+    refused = [check.name for check in checks if check.refused]
+    if refused:
+        print(f"{len(refused)} consulta(s) acima de {args.max_scan_rows} linhas: {', '.join(refused)}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
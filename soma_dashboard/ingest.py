@@ -0,0 +1,506 @@
+"""Carga em lote de logs externos no soma_logs.db.
+
+A Soma API grava uma linha por requisição em ``operations`` e outra em
+``business_logs``. Para backfill de histórico ou para reproduzir tráfego
+de produção num banco de teste, este módulo lê arquivos JSONL (um objeto
+por linha; ``-`` é a entrada padrão e ``.gz`` é descompactado) e grava as
+duas linhas de cada operação em transações grandes com ``executemany``.
+
+Cada linha pode ser:
+
+- um registro plano de uma operação, com os nomes das colunas
+  (``operation_id``, ``user_id``, ``input_a``...), dos atributos do span
+  (``operation.id``, ``user.id``, ``input.a``...) ou do ``SomaResponse``
+  (``operationId``, ``inputA``...) — o que inclui exportações das próprias
+  tabelas;
+- uma exportação OTLP/JSON do OpenTelemetry (file exporter do Collector):
+  ``resourceSpans`` (spans ``soma-operation``) ou ``resourceLogs`` (linhas
+  "Sum operation completed" do ``SomaController``). Spans e logs de outras
+  origens são ignorados.
+
+O caminho é um pipeline de geradores — ``read_lines`` -> ``parse_records``
+-> ``to_rows`` -> ``batched`` -> ``insert_batch`` — e nada além de um lote
+fica em memória. Registros inválidos são contados e descartados, sem
+interromper a carga. Recarregar o mesmo arquivo não duplica linhas: a
+operação é identificada pelo ``operation_id`` (derivado de trace e span
+quando a origem não tem um).
+
+Uso::
+
+    python -m soma_dashboard.ingest /caminho/soma_logs.db historico.jsonl.gz
+    otelcol ... | python -m soma_dashboard.ingest /tmp/soma_logs.db - --replay
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+
+from soma_dashboard.indexes import migrate
+from soma_dashboard.synthetic import create_tables, day_period
+
+DEFAULT_BATCH_SIZE = 50_000
+MAX_REJECTION_SAMPLES = 5
+SPAN_NAME = 'soma-operation'
+
+# Mesma regra do LoggingService.getDayPeriod, por hora
+PERIOD_BY_HOUR = tuple(day_period(range(24)).tolist())
+
+# Namespace dos operation_id derivados de trace_id/span_id
+OPERATION_NAMESPACE = uuid.UUID('6f1d3a52-4c0e-4b8e-9a57-2f7c1e0b9d44')
+
+# coluna -> nomes aceitos no registro, em ordem de preferência
+FIELD_ALIASES = {
+    'operation_id': ('operation_id', 'operation.id', 'operationId'),
+    'timestamp': ('timestamp', 'time', '@timestamp'),
+    'user_id': ('user_id', 'user.id', 'userId'),
+    'operation_type': ('operation_type', 'operation.type', 'operationType'),
+    'input_a': ('input_a', 'input.a', 'inputA', 'a'),
+    'input_b': ('input_b', 'input.b', 'inputB', 'b'),
+    'input_values': ('input_values',),
+    'result': ('result', 'result_value', 'operation.result'),
+    'execution_time_ms': ('execution_time_ms', 'operation.execution_time_ms', 'executionTimeMs'),
+    'trace_id': ('trace_id', 'traceId'),
+    'span_id': ('span_id', 'spanId'),
+    'ip_address': ('ip_address', 'client.ip'),
+    'hour_of_day': ('hour_of_day',),
+    'day_period': ('day_period',),
+    'status': ('status',),
+    'message': ('message',),
+}
+
+# nome no registro -> (coluna, preferência)
+_ALIAS_COLUMNS = {
+    alias: (column, priority)
+    for column, aliases in FIELD_ALIASES.items()
+    for priority, alias in enumerate(aliases)
+}
+
+# Linha de log do SomaController ao fim de cada operação
+COMPLETED_MESSAGE = re.compile(
+    r"Sum operation completed: (-?\d+) \+ (-?\d+) = (-?\d+) \((\d+)ms\) for user (\S+)"
+)
+
+# Lote em tabela temporária: a chave primária descarta operation_id repetido
+# dentro do lote, e as inserções nas tabelas reais viram dois INSERT ... SELECT
+CREATE_BATCH_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS ingest_batch (
+        operation_id TEXT PRIMARY KEY,
+        timestamp TEXT,
+        operation_type TEXT,
+        input_a INTEGER,
+        input_b INTEGER,
+        result INTEGER,
+        execution_time_ms INTEGER,
+        trace_id TEXT,
+        span_id TEXT,
+        user_id TEXT,
+        hour_of_day INTEGER,
+        day_period TEXT,
+        input_values TEXT,
+        ip_address TEXT,
+        status TEXT,
+        message TEXT
+    )
+"""
+
+INSERT_BATCH = "INSERT OR IGNORE INTO ingest_batch VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+# business_logs antes de operations: só entram as operações que ainda não existiam
+INSERT_BUSINESS_LOGS = """
+    INSERT INTO business_logs
+    (operation_id, user_id, timestamp, hour_of_day, day_period, operation_type,
+     input_values, result_value, execution_time_ms, trace_id, ip_address, status, message)
+    SELECT operation_id, user_id, timestamp, hour_of_day, day_period, operation_type,
+           input_values, result, execution_time_ms, trace_id, ip_address, status, message
+    FROM ingest_batch b
+    WHERE NOT EXISTS (SELECT 1 FROM operations o WHERE o.id = b.operation_id)
+    ORDER BY b.rowid
+"""
+
+INSERT_OPERATIONS = """
+    INSERT OR IGNORE INTO operations
+    (id, timestamp, operation_type, input_a, input_b, result, execution_time_ms, trace_id, span_id)
+    SELECT operation_id, timestamp, operation_type, input_a, input_b, result, execution_time_ms,
+           trace_id, span_id
+    FROM ingest_batch
+    ORDER BY rowid
+"""
+
+
+class SkipRecord(Exception):
+    """Registro que não descreve uma operação (outro span, outra linha de log)."""
+
+
+@dataclass
+class IngestReport:
+    lines: int = 0
+    records: int = 0
+    operations: int = 0           # linhas novas em operations
+    business_logs: int = 0        # linhas novas em business_logs
+    duplicates: int = 0           # operações que o banco já tinha
+    skipped: int = 0
+    rejected: int = 0
+    rejections: list = field(default_factory=list)   # amostras: (linha, motivo)
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        """Registros por segundo."""
+        return self.records / self.seconds if self.seconds else 0.0
+
+    def reject(self, line_number, reason):
+        self.rejected += 1
+        if len(self.rejections) < MAX_REJECTION_SAMPLES:
+            self.rejections.append((line_number, reason))
+
+    def describe(self):
+        return (
+            f"{self.records} registros em {self.seconds:.1f}s ({self.rate:,.0f}/s): "
+            f"{self.operations} operações e {self.business_logs} business logs novos, "
+            f"{self.duplicates} já existentes, {self.skipped} ignorados, {self.rejected} rejeitados"
+        )
+
+
+# Leitura
+
+def _open(path):
+    if path == '-':
+        return sys.stdin
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def read_lines(paths):
+    """Linhas não vazias de cada arquivo, em ordem: ``(número, linha)`` contínuo entre arquivos."""
+    number = 0
+    for path in paths:
+        stream = _open(path)
+        try:
+            for line in stream:
+                number += 1
+                line = line.strip()
+                if line:
+                    yield number, line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def _otlp_value(value):
+    # AnyValue do OTLP/JSON: intValue chega como texto (int64)
+    for kind in ('stringValue', 'intValue', 'doubleValue', 'boolValue'):
+        if kind in value:
+            return int(value[kind]) if kind == 'intValue' else value[kind]
+    return None
+
+
+def _otlp_attributes(attributes):
+    return {item['key']: _otlp_value(item.get('value', {})) for item in attributes or ()}
+
+
+def _span_record(span):
+    attributes = _otlp_attributes(span.get('attributes'))
+    if span.get('name') != SPAN_NAME and 'operation.id' not in attributes:
+        raise SkipRecord()
+    record = dict(attributes)
+    record['trace_id'] = span.get('traceId')
+    record['span_id'] = span.get('spanId')
+    record['timestamp'] = int(span['startTimeUnixNano']) if span.get('startTimeUnixNano') else None
+    if 'operation.execution_time_ms' not in record and span.get('endTimeUnixNano'):
+        record['execution_time_ms'] = (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) // 1_000_000
+    if span.get('status', {}).get('code') in (2, 'STATUS_CODE_ERROR'):
+        record['status'] = 'ERROR'
+        record['message'] = span['status'].get('message')
+    return record
+
+
+def _log_record(log):
+    record = _otlp_attributes(log.get('attributes'))
+    body = _otlp_value(log.get('body', {}))
+    match = COMPLETED_MESSAGE.search(body) if isinstance(body, str) else None
+    if match is None and 'operation.id' not in record:
+        raise SkipRecord()
+    if match is not None:
+        a, b, result, execution_time, user_id = match.groups()
+        record.update({'input_a': int(a), 'input_b': int(b), 'result': int(result),
+                       'execution_time_ms': int(execution_time), 'user_id': user_id})
+    record['trace_id'] = log.get('traceId') or None
+    record['span_id'] = log.get('spanId') or None
+    record['timestamp'] = int(log.get('timeUnixNano') or log.get('observedTimeUnixNano') or 0) or None
+    return record
+
+
+def _expand(document):
+    """Registros planos de uma linha: a própria linha ou os spans/logs de uma exportação OTLP."""
+    if 'resourceSpans' in document:
+        for resource in document['resourceSpans']:
+            for scope in resource.get('scopeSpans') or resource.get('instrumentationLibrarySpans') or ():
+                for span in scope.get('spans', ()):
+                    yield _span_record, span
+    elif 'resourceLogs' in document:
+        for resource in document['resourceLogs']:
+            for scope in resource.get('scopeLogs') or resource.get('instrumentationLibraryLogs') or ():
+                for log in scope.get('logRecords', ()):
+                    yield _log_record, log
+    else:
+        yield None, document
+
+
+def parse_records(lines, report):
+    """``(número, linha)`` -> ``(número, registro plano)``; JSON inválido é rejeitado."""
+    for number, line in lines:
+        report.lines += 1
+        try:
+            document = json.loads(line)
+            if not isinstance(document, dict):
+                raise ValueError("a linha não é um objeto JSON")
+        except ValueError as e:
+            report.reject(number, f"JSON inválido: {e}")
+            continue
+        for convert, item in _expand(document):
+            report.records += 1
+            try:
+                yield number, convert(item) if convert else item
+            except SkipRecord:
+                report.skipped += 1
+            except (KeyError, TypeError, ValueError) as e:
+                report.reject(number, f"{type(e).__name__}: {e}")
+
+
+# Mapeamento para as colunas
+
+def columns(record):
+    """Registro plano -> ``{coluna: valor}`` pelos ``FIELD_ALIASES`` (nulos ignorados)."""
+    values = {}
+    priorities = {}
+    for name, value in record.items():
+        target = _ALIAS_COLUMNS.get(name)
+        if target is None or value is None:
+            continue
+        column, priority = target
+        if priorities.get(column, priority + 1) > priority:
+            values[column] = value
+            priorities[column] = priority
+    return values
+
+
+def _integer(value, column, required=True):
+    if value is None or value == '':
+        if required:
+            raise ValueError(f"{column} ausente")
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{column} inválido: {value!r}")
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(f"{column} inválido: {value!r}")
+        return int(value)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{column} inválido: {value!r}") from None
+
+
+def parse_timestamp(value):
+    """Texto ISO ou epoch (s, ms, µs ou ns) -> ``datetime`` UTC sem fuso, como o CURRENT_TIMESTAMP."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+        # A magnitude diz a unidade: epoch em segundos ainda tem 10 dígitos
+        while abs(seconds) >= 1e11:
+            seconds /= 1000
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str):
+        parsed = datetime.fromisoformat(value.strip())
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    raise ValueError(f"timestamp inválido: {value!r}")
+
+
+def _timestamp_text(value, shift):
+    timestamp = parse_timestamp(value)
+    if shift is None and isinstance(value, str) and len(value) == 19 and value[10] == ' ':
+        # Já no formato do CURRENT_TIMESTAMP (exportação das tabelas): sem strftime
+        return value, timestamp.hour
+    if shift is not None:
+        timestamp += shift
+    return timestamp.strftime('%Y-%m-%d %H:%M:%S'), timestamp.hour
+
+
+def to_row(record, shift=None, new_ids=False):
+    """Registro plano -> tupla de ``ingest_batch``; ``ValueError`` se faltar algo essencial."""
+    values = columns(record)
+    if 'timestamp' not in values:
+        raise ValueError("timestamp ausente")
+    timestamp, hour = _timestamp_text(values['timestamp'], shift)
+
+    input_a = values.get('input_a')
+    input_b = values.get('input_b')
+    input_values = values.get('input_values')
+    if (input_a is None or input_b is None) and isinstance(input_values, str) and ' + ' in input_values:
+        input_a, input_b = input_values.split(' + ', 1)
+    input_a = _integer(input_a, 'input_a')
+    input_b = _integer(input_b, 'input_b')
+    operation_type = values.get('operation_type') or 'sum'
+
+    result = _integer(values.get('result'), 'result', required=False)
+    if result is None:
+        if operation_type != 'sum':
+            raise ValueError("result ausente")
+        result = input_a + input_b
+    execution_time = _integer(values.get('execution_time_ms'), 'execution_time_ms')
+    if execution_time < 0:
+        raise ValueError(f"execution_time_ms negativo: {execution_time}")
+
+    trace_id = values.get('trace_id')
+    span_id = values.get('span_id')
+    operation_id = values.get('operation_id')
+    if new_ids:
+        operation_id = str(uuid.uuid4())
+    elif operation_id is None:
+        if not trace_id:
+            raise ValueError("operation_id ausente (e sem trace_id para derivá-lo)")
+        operation_id = str(uuid.uuid5(OPERATION_NAMESPACE, f"{trace_id}:{span_id or ''}"))
+
+    # hour_of_day/day_period gravados pela API seguem o relógio local dela: mantidos,
+    # a não ser que o replay tenha movido o timestamp
+    if shift is None and 'hour_of_day' in values:
+        hour = _integer(values['hour_of_day'], 'hour_of_day')
+    period = values.get('day_period') if shift is None else None
+    user_id = str(values.get('user_id') or 'anonymous')
+    input_values = f"{input_a} + {input_b}"
+    message = values.get('message') or (
+        f"User {user_id} performed {operation_type} operation: {input_values} = {result}"
+    )
+
+    return (
+        str(operation_id), timestamp, operation_type, input_a, input_b, result, execution_time,
+        trace_id, span_id, user_id, hour, period or PERIOD_BY_HOUR[hour], input_values,
+        values.get('ip_address'), values.get('status') or 'SUCCESS', message,
+    )
+
+
+def to_rows(records, report, replay=False, now=None):
+    """Registros -> linhas válidas. ``replay`` desloca os timestamps para que o
+    primeiro registro caia em ``now`` (intervalos preservados) e gera novos
+    ``operation_id``, para repetir o mesmo tráfego no banco que já o contém."""
+    shift = None
+    for number, record in records:
+        try:
+            if replay and shift is None:
+                first = parse_timestamp(columns(record).get('timestamp'))
+                shift = (now or datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)) - first
+            yield to_row(record, shift, new_ids=replay)
+        except (KeyError, TypeError, ValueError) as e:
+            report.reject(number, f"{type(e).__name__}: {e}")
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+# Escrita
+
+def connect(db_path, timeout=30):
+    """Conexão de escrita para a carga (cria as tabelas se o banco for novo)."""
+    conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+    create_tables(conn)
+    # Em WAL, NORMAL só sincroniza no checkpoint; sem WAL, cada lote ainda é atômico
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -65536")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(CREATE_BATCH_TABLE)
+    return conn
+
+
+def insert_batch(conn, rows):
+    """Grava um lote numa transação; retorna ``(operações novas, business logs novos)``."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(INSERT_BATCH, rows)
+        business_logs = conn.execute(INSERT_BUSINESS_LOGS).rowcount
+        operations = conn.execute(INSERT_OPERATIONS).rowcount
+        conn.execute("DELETE FROM ingest_batch")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return operations, business_logs
+
+
+def _optimize(db_path):
+    # Estatísticas do planner com a nova distribuição (amostradas: rápido)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+
+def ingest(db_path, paths, batch_size=DEFAULT_BATCH_SIZE, replay=False, progress=None):
+    """Carrega ``paths`` em ``db_path``; ``progress(report)`` é chamado a cada lote."""
+    report = IngestReport()
+    started = time.perf_counter()
+    conn = connect(db_path)
+    try:
+        records = parse_records(read_lines(paths), report)
+        for batch in batched(to_rows(records, report, replay=replay), batch_size):
+            operations, business_logs = insert_batch(conn, batch)
+            report.operations += operations
+            report.business_logs += business_logs
+            report.duplicates += len(batch) - operations
+            report.seconds = time.perf_counter() - started
+            if progress is not None:
+                progress(report)
+    finally:
+        conn.close()
+    # Índices dos painéis só depois da carga: num banco que ainda não os tinha,
+    # criá-los sobre a tabela pronta sai mais barato que mantê-los linha a linha.
+    # Num banco já migrado não faz nada.
+    if not migrate(db_path):
+        _optimize(db_path)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carrega logs JSONL (ou exportações OTLP) no soma_logs.db")
+    parser.add_argument('db_path')
+    parser.add_argument('paths', nargs='+', help="arquivos JSONL (.gz aceito); '-' lê da entrada padrão")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="linhas por transação")
+    parser.add_argument('--replay', action='store_true',
+                        help="desloca os timestamps para agora e gera novos operation_id")
+    parser.add_argument('--quiet', action='store_true', help="sem progresso a cada lote")
+    args = parser.parse_args(argv)
+    missing = [path for path in args.paths if path != '-' and not os.path.exists(path)]
+    if missing:
+        parser.error(f"arquivo não encontrado: {', '.join(missing)}")
+
+    def progress(report):
+        print(f"  {report.records} registros, {report.operations} operações novas "
+              f"({report.rate:,.0f}/s)", file=sys.stderr)
+
+    report = ingest(args.db_path, args.paths, args.batch_size, args.replay,
+                    progress=None if args.quiet else progress)
+    print(report.describe())
+    for line_number, reason in report.rejections:
+        print(f"  linha {line_number}: {reason}")
+    if report.rejected > len(report.rejections):
+        print(f"  ... e mais {report.rejected - len(report.rejections)} rejeitados")
+    return 1 if report.rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Instrumentação opcional dos próprios painéis com OpenTelemetry.
+
+Desligada por padrão. Com a variável ``SOMA_DASHBOARD_OTEL`` definida, cada
+carga de dados, bloco de gráfico e aba vira um span com duração, linhas
+lidas, bytes e cache hit/miss, e as mesmas medidas alimentam métricas
+(histograma de duração e contadores). Os exportadores são os de console do
+SDK, sem collector:
+
+    SOMA_DASHBOARD_OTEL=console             # spans e métricas no stdout
+    SOMA_DASHBOARD_OTEL=/tmp/painel.otel    # acrescenta no arquivo
+
+Além da exportação, um resumo por etapa fica em memória para o painel de
+debug da sidebar. ``opentelemetry-sdk`` é opcional: sem ele só o resumo é
+mantido.
+
+Uso nos painéis::
+
+    @instrumentation.traced('load_summary', cached=True)
+    @st.cache_data(ttl=5)
+    @instrumentation.computes
+    def load_summary(): ...
+
+    with tab1, instrumentation.span('tab.usuarios'):
+        ...
+
+Com ``cached=True`` a chamada conta como cache hit, a não ser que o
+``computes`` por baixo do ``st.cache_data`` veja o corpo da função executar.
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+
+ENV_VAR = 'SOMA_DASHBOARD_OTEL'
+METRIC_EXPORT_INTERVAL_MS = 30_000
+
+_current = ContextVar('soma_dashboard_span', default=None)
+
+
+class SpanRecord:
+    """Medidas de um span em andamento (também usadas no resumo)."""
+
+    __slots__ = ('name', 'rows', 'bytes', 'cache_hit', '_span')
+
+    def __init__(self, name, span=None):
+        self.name = name
+        self.rows = None
+        self.bytes = None
+        self.cache_hit = None
+        self._span = span
+
+    def set(self, rows=None, bytes=None, cache_hit=None):
+        if rows is not None:
+            self.rows = int(rows)
+        if bytes is not None:
+            self.bytes = int(bytes)
+        if cache_hit is not None:
+            self.cache_hit = bool(cache_hit)
+
+    def record_result(self, result):
+        """Extrai linhas/bytes do que as funções de carga retornam."""
+        if isinstance(result, tuple) and result:
+            result = result[0]
+        frame = getattr(result, 'rows', result)  # LogPage
+        if isinstance(frame, pd.DataFrame):
+            self.set(rows=len(frame), bytes=frame.memory_usage(index=True).sum())
+
+    def record_chart(self, future):
+        """Tamanho do PNG e se veio pronto do cache do ``ChartRenderer``."""
+        self.set(bytes=len(future.result()), cache_hit=getattr(future, 'cache_hit', False))
+
+
+class Instrumentation:
+    """Spans + métricas + resumo por etapa; tudo no-op quando desligada."""
+
+    def __init__(self, service_name, exporter=None):
+        self.service_name = service_name
+        self.exporter = exporter
+        self.enabled = exporter is not None
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._tracer = None
+        self._stream = None
+
+        if self.enabled:
+            self._setup_otel(exporter)
+
+    @classmethod
+    def from_env(cls, service_name):
+        return cls(service_name, os.environ.get(ENV_VAR) or None)
+
+    @property
+    def exporting(self):
+        return self._tracer is not None
+
+    def _setup_otel(self, exporter):
+        # SDK importado só com a instrumentação ligada: painéis sem SOMA_DASHBOARD_OTEL não pagam o import
+        try:
+            from opentelemetry.sdk.metrics import MeterProvider
+            from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        except ImportError:  # pragma: no cover - depende do ambiente
+            return
+
+        if exporter == 'console':
+            out = None
+        else:
+            self._stream = open(exporter, 'a', buffering=1)
+            out = self._stream
+        kwargs = {} if out is None else {'out': out}
+        resource = Resource.create({'service.name': self.service_name})
+
+        # Providers próprios (não globais): dois painéis no mesmo processo não brigam
+        self._tracer_provider = TracerProvider(resource=resource)
+        self._tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(**kwargs)))
+        self._tracer = self._tracer_provider.get_tracer(__name__)
+
+        reader = PeriodicExportingMetricReader(ConsoleMetricExporter(**kwargs),
+                                               export_interval_millis=METRIC_EXPORT_INTERVAL_MS)
+        self._meter_provider = MeterProvider(resource=resource, metric_readers=[reader])
+        meter = self._meter_provider.get_meter(__name__)
+        self._duration = meter.create_histogram('dashboard.stage.duration', unit='ms',
+                                                description="Duração de cada etapa do painel")
+        self._rows = meter.create_counter('dashboard.stage.rows', description="Linhas lidas por etapa")
+        self._bytes = meter.create_counter('dashboard.stage.bytes', unit='By', description="Bytes por etapa")
+        self._cache = meter.create_counter('dashboard.stage.cache', description="Cache hit/miss por etapa")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        if not self.enabled:
+            yield SpanRecord(name)
+            return
+
+        with self._start_span(name, attributes) as otel_span:
+            record = SpanRecord(name, otel_span)
+            token = _current.set(record)
+            started = time.perf_counter()
+            try:
+                yield record
+            finally:
+                duration_ms = (time.perf_counter() - started) * 1000
+                _current.reset(token)
+                self._finish(record, duration_ms)
+
+    def _start_span(self, name, attributes):
+        if self._tracer is None:
+            return _null_context()
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+    def _finish(self, record, duration_ms):
+        measures = {key: value for key, value in (
+            ('rows', record.rows), ('bytes', record.bytes), ('cache_hit', record.cache_hit),
+        ) if value is not None}
+
+        if self._tracer is not None:
+            attributes = {'stage': record.name}
+            record._span.set_attributes({f"dashboard.{key}": value for key, value in measures.items()})
+            self._duration.record(duration_ms, attributes)
+            if record.rows is not None:
+                self._rows.add(record.rows, attributes)
+            if record.bytes is not None:
+                self._bytes.add(record.bytes, attributes)
+            if record.cache_hit is not None:
+                self._cache.add(1, {**attributes, 'hit': record.cache_hit})
+
+        with self._lock:
+            stats = self._stats.setdefault(record.name, {
+                'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0,
+                'rows': None, 'bytes': None, 'hits': 0, 'misses': 0,
+            })
+            stats['calls'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['last_ms'] = duration_ms
+            if record.rows is not None:
+                stats['rows'] = record.rows
+            if record.bytes is not None:
+                stats['bytes'] = record.bytes
+            if record.cache_hit is True:
+                stats['hits'] += 1
+            elif record.cache_hit is False:
+                stats['misses'] += 1
+
+    def traced(self, name, cached=False):
+        """Decorator: um span por chamada, com linhas/bytes do retorno."""
+        def decorator(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name) as record:
+                    result = func(*args, **kwargs)
+                    if cached and record.cache_hit is None:
+                        record.set(cache_hit=True)
+                    record.record_result(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def computes(self, func):
+        """Marca o span corrente como cache miss quando o corpo executa."""
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            record = _current.get()
+            if record is not None:
+                record.set(cache_hit=False)
+            return func(*args, **kwargs)
+        return wrapper
+
+    def summary(self):
+        """Uma linha por etapa: chamadas, tempos, linhas/bytes da última e hits/misses."""
+        with self._lock:
+            rows = [{
+                'Etapa': name,
+                'Chamadas': stats['calls'],
+                'Última (ms)': round(stats['last_ms'], 1),
+                'Média (ms)': round(stats['total_ms'] / stats['calls'], 1),
+                'Máx (ms)': round(stats['max_ms'], 1),
+                'Linhas': stats['rows'],
+                'KB': None if stats['bytes'] is None else round(stats['bytes'] / 1024, 1),
+                'Hits': stats['hits'],
+                'Misses': stats['misses'],
+            } for name, stats in self._stats.items()]
+        return pd.DataFrame(rows).astype({'Linhas': 'Int64'}) if rows else pd.DataFrame(rows)
+
+
+@contextmanager
+def _null_context():
+    yield None
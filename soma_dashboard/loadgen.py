@@ -0,0 +1,447 @@
+"""Gerador de carga para o ``GET /soma/{a}/{b}`` da Soma API.
+
+Até aqui a única carga eram o ``teste-soma.http`` e ``curl`` manuais. Este
+módulo dispara requisições com asyncio sobre um pool de conexões HTTP/1.1
+keep-alive (uma por worker, ``--concurrency``), em ritmo fixo (``--rate``)
+ou o mais rápido possível, com ``user_id`` sorteado (Zipf ou uniforme, como
+o ``soma_dashboard.synthetic``) ou reproduzindo um arquivo JSONL no mesmo
+formato aceito pelo ``soma_dashboard.ingest``, com os intervalos originais.
+
+A latência do cliente vai para ``DDSketch`` (buckets logarítmicos com erro
+relativo de 1%, como um histograma HDR). Com ``--rate`` a latência é
+medida a partir do horário *planejado* de cada requisição: se o servidor
+trava, as requisições que deveriam ter saído nesse meio tempo contam a
+espera (correção de coordinated omission); o tempo só de resposta fica em
+``service``.
+
+Com ``--db`` os ``operationId`` devolvidos são procurados em
+``business_logs`` e o ``execution_time_ms`` gravado pela API é comparado
+com a latência vista pelo cliente — quanto do tempo é rede, HTTP e
+gravação no SQLite, e se alguma operação respondida não chegou ao banco.
+
+``--stub`` sobe no próprio processo um servidor que imita o
+``SomaController`` + ``LoggingService`` (mesma resposta, mesmas duas linhas
+por requisição no soma_logs.db), para gerar volume para os painéis sem a
+API Java::
+
+    python -m soma_dashboard.loadgen --requests 10000 --concurrency 32
+    python -m soma_dashboard.loadgen --duration 60 --rate 500 --db soma-api/target/soma_logs.db
+    python -m soma_dashboard.loadgen --stub /tmp/soma_logs.db --duration 30 --rate 200
+    python -m soma_dashboard.loadgen --replay historico.jsonl.gz --speed 60 --db /tmp/soma_logs.db
+"""
+import argparse
+import asyncio
+import json
+import math
+import re
+import sqlite3
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, quote, urlsplit
+
+import numpy as np
+
+from soma_dashboard import ingest
+from soma_dashboard.indexes import migrate
+from soma_dashboard.pool import enable_wal, read_connection
+from soma_dashboard.sketches import DDSketch
+from soma_dashboard.synthetic import INSERT_BUSINESS_LOG, INSERT_OPERATION, create_tables
+
+DEFAULT_URL = 'http://localhost:8080'
+DEFAULT_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 10
+
+# Quantis do relatório (HDR costuma mostrar a cauda até p99.9)
+REPORT_QUANTILES = {'p50': 0.50, 'p90': 0.90, 'p99': 0.99, 'p99.9': 0.999}
+
+# operation_id por consulta na conferência com o banco
+CROSS_CHECK_CHUNK = 500
+
+SOMA_PATH = re.compile(r'^/soma/(-?\d+)/(-?\d+)$')
+
+
+@dataclass
+class LoadRequest:
+    a: int
+    b: int
+    user_id: str
+    offset: float = None      # segundos desde o início (replay); None = conforme --rate ou livre
+
+
+# Origens das requisições
+
+def generated_requests(count=None, users=200, distribution='zipf', user_id=None, seed=42):
+    """Requisições sorteadas; ``count=None`` gera sem fim (use com ``--duration``)."""
+    rng = np.random.default_rng(seed)
+    names = [f"user{i}" for i in range(1, users + 1)]
+    if distribution == 'zipf':
+        # Mesmos pesos do soma_dashboard.synthetic: poucos usuários concentram a carga
+        weights = 1.0 / np.arange(1, users + 1) ** 1.1
+    else:
+        weights = np.ones(users)
+    weights /= weights.sum()
+
+    produced = 0
+    while count is None or produced < count:
+        n = 4096 if count is None else min(4096, count - produced)
+        a = rng.integers(0, 1000, n).tolist()
+        b = rng.integers(0, 1000, n).tolist()
+        picked = [user_id] * n if user_id else [names[i] for i in rng.choice(users, size=n, p=weights)]
+        for i in range(n):
+            yield LoadRequest(a[i], b[i], picked[i])
+        produced += n
+
+
+def replayed_requests(paths, speed=1.0, report=None):
+    """Requisições de um JSONL (formatos do ``soma_dashboard.ingest``), nos intervalos originais / ``speed``."""
+    report = report or ingest.IngestReport()
+    first = None
+    rows = ingest.to_rows(ingest.parse_records(ingest.read_lines(paths), report), report)
+    for row in rows:
+        timestamp = datetime.strptime(row[1], '%Y-%m-%d %H:%M:%S')
+        first = first or timestamp
+        offset = (timestamp - first).total_seconds() / speed if speed else None
+        yield LoadRequest(row[3], row[4], row[9], offset)
+
+
+# Cliente HTTP
+
+class HttpConnection:
+    """Uma conexão HTTP/1.1 keep-alive; reconecta quando o servidor fecha."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def get(self, path):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nAccept: application/json\r\n\r\n".encode()
+        )
+        status, body, close = await self._read_response()
+        if close:
+            await self.close()
+        return status, body
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("conexão fechada pelo servidor")
+        status = int(status_line.split(b' ', 2)[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == b'content-length':
+                length = int(value)
+            elif name == b'transfer-encoding':
+                chunked = b'chunked' in value
+            elif name == b'connection':
+                close = value == b'close'
+
+        if chunked:
+            body = b''
+            while size := int((await self._reader.readline()).split(b';')[0], 16):
+                body += (await self._reader.readexactly(size + 2))[:-2]
+            await self._reader.readline()
+        elif length is not None:
+            body = await self._reader.readexactly(length)
+        else:
+            body, close = await self._reader.read(), True
+        return status, body, close
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+
+
+# Execução
+
+@dataclass
+class LoadReport:
+    sent: int = 0
+    ok: int = 0
+    errors: dict = field(default_factory=dict)        # status HTTP ou exceção -> quantidade
+    seconds: float = 0.0
+    latency: DDSketch = field(default_factory=DDSketch)   # desde o horário planejado
+    service: DDSketch = field(default_factory=DDSketch)   # desde o envio
+    operations: list = field(default_factory=list)    # (operation_id, latência ms) para a conferência
+    _pending: list = field(default_factory=list, repr=False)
+
+    @property
+    def throughput(self):
+        return self.ok / self.seconds if self.seconds else 0.0
+
+    def record(self, latency_ms, service_ms):
+        self._pending.append((latency_ms, service_ms))
+        if len(self._pending) >= 4096:
+            self.flush()
+
+    def flush(self):
+        # add_many por bloco: o sketch é vetorizado, uma chamada por requisição custaria mais que o HTTP
+        if self._pending:
+            latency, service = zip(*self._pending)
+            self.latency.add_many(latency)
+            self.service.add_many(service)
+            self._pending.clear()
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+async def run_load(url, requests, concurrency=DEFAULT_CONCURRENCY, rate=None, duration=None,
+                   timeout=DEFAULT_TIMEOUT, keep_operations=False):
+    """Dispara ``requests`` contra ``url``; ritmo de ``rate``/s, dos offsets do replay ou livre."""
+    parts = urlsplit(url)
+    host, port = parts.hostname or 'localhost', parts.port or 80
+    base = parts.path.rstrip('/')
+    loop = asyncio.get_running_loop()
+    report = LoadReport()
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = loop.time()
+
+    async def produce():
+        for i, request in enumerate(requests):
+            offset = request.offset if request.offset is not None else (i / rate if rate else None)
+            if duration is not None and loop.time() - started >= duration:
+                break
+            if duration is not None and offset is not None and offset >= duration:
+                break
+            await queue.put((None if offset is None else started + offset, request))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker():
+        conn = HttpConnection(host, port)
+        try:
+            while (item := await queue.get()) is not None:
+                planned, request = item
+                if planned is not None and planned > loop.time():
+                    await asyncio.sleep(planned - loop.time())
+                path = f"{base}/soma/{request.a}/{request.b}?user_id={quote(request.user_id)}"
+                sent = loop.time()
+                report.sent += 1
+                try:
+                    status, body = await asyncio.wait_for(conn.get(path), timeout)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                    report.error(type(e).__name__)
+                    await conn.close()
+                    continue
+                finished = loop.time()
+                if status != 200:
+                    report.error(f"HTTP {status}")
+                    continue
+                report.ok += 1
+                latency_ms = (finished - (planned if planned is not None else sent)) * 1000
+                report.record(latency_ms, (finished - sent) * 1000)
+                if keep_operations:
+                    report.operations.append((json.loads(body)['operationId'], latency_ms))
+        finally:
+            await conn.close()
+
+    await asyncio.gather(produce(), *(worker() for _ in range(concurrency)))
+    report.seconds = loop.time() - started
+    report.flush()
+    return report
+
+
+# Conferência com o soma_logs.db
+
+@dataclass
+class CrossCheck:
+    found: int
+    missing: int
+    server: DDSketch        # execution_time_ms gravado pela API
+    overhead: DDSketch      # latência do cliente - execution_time_ms, por operação
+
+
+def cross_check(db_path, operations, wait=2.0):
+    """Procura as operações respondidas em ``business_logs`` (espera até ``wait`` s pelas que faltam)."""
+    # Idempotente; sem o índice de operation_id cada bloco seria um full scan
+    migrate(db_path)
+    pending = dict(operations)
+    server, overhead = DDSketch(), DDSketch()
+    deadline = time.monotonic() + wait
+    while True:
+        ids = list(pending)
+        for start in range(0, len(ids), CROSS_CHECK_CHUNK):
+            chunk = ids[start:start + CROSS_CHECK_CHUNK]
+            query = (
+                "SELECT operation_id, execution_time_ms FROM business_logs "
+                f"WHERE operation_id IN ({', '.join('?' * len(chunk))})"
+            )
+            with read_connection(db_path) as conn:
+                rows = conn.execute(query, chunk).fetchall()
+            if rows:
+                execution_times = [row[1] for row in rows]
+                server.add_many(execution_times)
+                overhead.add_many([max(pending.pop(op_id) - ms, 0.0) for (op_id, _), ms
+                                   in zip(rows, execution_times)])
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(0.2)
+    return CrossCheck(found=server.count, missing=len(pending), server=server, overhead=overhead)
+
+
+# Stub da Soma API
+
+class SomaStub:
+    """Imita o ``SomaController``: soma, grava as duas linhas e responde o ``SomaResponse``."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = sqlite3.connect(db_path)
+        create_tables(conn)
+        conn.close()
+        enable_wal(db_path)
+        # Autocommit: um commit por requisição, como o LoggingService
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.requests = 0
+
+    def handle(self, a, b, user_id, client_ip):
+        started = time.perf_counter()
+        operation_id = str(uuid.uuid4())
+        trace_id, span_id = uuid.uuid4().hex, uuid.uuid4().hex[:16]
+        result = a + b
+        execution_time = int((time.perf_counter() - started) * 1000)
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        # hour_of_day pelo relógio local, como o LocalDateTime.now() do LoggingService
+        hour = datetime.now().hour
+        input_values = f"{a} + {b}"
+        self.conn.execute(INSERT_OPERATION, (operation_id, timestamp, 'sum', a, b, result,
+                                             execution_time, trace_id, span_id))
+        self.conn.execute(INSERT_BUSINESS_LOG, (
+            operation_id, user_id, timestamp, hour, ingest.PERIOD_BY_HOUR[hour], 'sum', input_values,
+            result, execution_time, trace_id, client_ip, 'SUCCESS',
+            f"User {user_id} performed sum operation: {input_values} = {result}",
+        ))
+        self.requests += 1
+        return {'operationId': operation_id, 'inputA': a, 'inputB': b, 'result': result,
+                'executionTimeMs': execution_time, 'userId': user_id, 'traceId': trace_id}
+
+    async def serve(self, reader, writer):
+        client_ip = writer.get_extra_info('peername')[0]
+        try:
+            while request_line := await reader.readline():
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                url = urlsplit(request_line.split(b' ')[1].decode())
+                match = SOMA_PATH.match(url.path)
+                if match is None:
+                    status, body = '404 Not Found', {'message': 'Not Found'}
+                else:
+                    user_id = parse_qs(url.query).get('user_id', ['anonymous'])[0]
+                    status, body = '200 OK', self.handle(int(match[1]), int(match[2]), user_id, client_ip)
+                payload = json.dumps(body).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host, port):
+        return await asyncio.start_server(self.serve, host, port)
+
+    def close(self):
+        self.conn.close()
+
+
+# Relatório
+
+def _quantiles(sketch):
+    values = sketch.quantiles(list(REPORT_QUANTILES.values()))
+    cells = [f"{name} {value:8.2f}" for name, value in zip(REPORT_QUANTILES, values)]
+    return "  ".join(cells + [f"max {sketch.max if sketch.count else math.nan:8.2f}"])
+
+
+def format_report(report, check=None):
+    lines = [
+        f"{report.ok}/{report.sent} requisições ok em {report.seconds:.1f}s ({report.throughput:,.0f}/s)",
+    ]
+    if report.errors:
+        lines.append("erros: " + ", ".join(f"{kind}: {count}" for kind, count in sorted(report.errors.items())))
+    if report.ok:
+        lines.append(f"latência (ms)  {_quantiles(report.latency)}")
+        lines.append(f"resposta (ms)  {_quantiles(report.service)}")
+    if check is not None:
+        lines.append(f"soma_logs.db: {check.found} operações encontradas, {check.missing} ausentes")
+        if check.found:
+            lines.append(f"execution_time_ms  {_quantiles(check.server)}")
+            lines.append(f"cliente - API (ms) {_quantiles(check.overhead)}")
+    return "\n".join(lines)
+
+
+async def _main(args):
+    stub = server = None
+    if args.stub:
+        stub = SomaStub(args.stub)
+        parts = urlsplit(args.url)
+        server = await stub.start(parts.hostname or 'localhost', parts.port or 80)
+
+    if args.replay:
+        requests = replayed_requests(args.replay, speed=args.speed)
+    else:
+        count = args.requests if args.requests is not None or args.duration is not None else 1000
+        requests = generated_requests(count, args.users, args.distribution, args.user_id, args.seed)
+
+    db_path = args.db or args.stub
+    try:
+        report = await run_load(args.url, requests, args.concurrency, args.rate, args.duration,
+                                args.timeout, keep_operations=db_path is not None)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            stub.close()
+
+    check = cross_check(db_path, report.operations) if db_path and report.operations else None
+    print(format_report(report, check))
+    return 0 if not report.errors and (check is None or not check.missing) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gerador de carga para o /soma/{a}/{b} da Soma API")
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--requests', type=int, default=None,
+                        help="total de requisições (padrão: 1000, ou sem limite com --duration)")
+    parser.add_argument('--duration', type=float, default=None, help="para depois de N segundos")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help="conexões keep-alive simultâneas")
+    parser.add_argument('--rate', type=float, default=None,
+                        help="requisições por segundo (padrão: o mais rápido possível)")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--distribution', choices=['zipf', 'uniform'], default='zipf')
+    parser.add_argument('--user-id', default=None, help="usa sempre o mesmo user_id")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--replay', nargs='+', default=None,
+                        help="JSONL a reproduzir (formatos do soma_dashboard.ingest)")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="aceleração do replay (0 = sem pausas)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--db', default=None,
+                        help="soma_logs.db da API, para conferir as operações respondidas")
+    parser.add_argument('--stub', default=None, metavar='DB_PATH',
+                        help="sobe um stub da API em --url gravando neste banco")
+    args = parser.parse_args(argv)
+    return asyncio.run(_main(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
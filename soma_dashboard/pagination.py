@@ -0,0 +1,118 @@
+"""Paginação no servidor para os "Logs Detalhados".
+
+Em vez de filtrar o ``df_logs`` inteiro em memória, cada página é uma
+consulta indexada com os filtros de usuário/período/intervalo aplicados no
+SQL e paginação por keyset em ``(timestamp, id)``: a página 1 000 custa o
+mesmo que a primeira, porque o SQLite continua a varredura do índice a
+partir do cursor em vez de pular ``OFFSET`` linhas.
+"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from soma_dashboard.pool import read_connection
+from soma_dashboard.store import BUSINESS_LOG_COLUMNS
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# A mensagem só aparece no detalhe do log (ver soma_dashboard.details)
+PAGE_COLUMNS = [c for c in BUSINESS_LOG_COLUMNS if c != 'message']
+
+
+@dataclass(frozen=True)
+class LogPage:
+    rows: pd.DataFrame
+    next_cursor: tuple    # (timestamp, id) da última linha, ou None na última página
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _timestamp_param(value):
+    return pd.Timestamp(value).strftime(TIMESTAMP_FORMAT)
+
+
+def build_page_query(users=None, periods=None, since=None, until=None,
+                     cursor=None, page_size=50, columns=None):
+    """SQL + parâmetros de uma página (também usado pelo ``soma_dashboard.indexes``)."""
+    columns = list(columns or PAGE_COLUMNS)
+    filters = []
+    params = []
+
+    if users is not None:
+        filters.append(f"user_id IN ({', '.join('?' * len(users))})")
+        params.extend(users)
+    if periods is not None:
+        filters.append(f"day_period IN ({', '.join('?' * len(periods))})")
+        params.extend(periods)
+    if since is not None:
+        filters.append("timestamp >= ?")
+        params.append(_timestamp_param(since))
+    if until is not None:
+        filters.append("timestamp < ?")
+        params.append(_timestamp_param(until))
+    if cursor is not None:
+        # Forma expandida de (timestamp, id) < (?, ?): o primeiro termo usa o índice
+        cursor_timestamp, cursor_id = cursor
+        filters.append("timestamp <= ? AND (timestamp < ? OR id < ?)")
+        params.extend([cursor_timestamp, cursor_timestamp, cursor_id])
+
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    query = f"""
+    SELECT {', '.join(columns)}
+    FROM business_logs
+    {where}
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+    """
+    # Uma linha a mais só para saber se existe próxima página
+    params.append(page_size + 1)
+    return query, params
+
+
+def fetch_logs_page(db_path, users=None, periods=None, since=None, until=None,
+                    cursor=None, page_size=50, columns=None):
+    """Uma página de ``business_logs``, mais recentes primeiro.
+
+    ``users``/``periods`` = None não filtram; lista vazia não retorna nada
+    (mesmo comportamento do ``isin`` anterior). ``until`` posiciona a
+    navegação num ponto do histórico; ``cursor`` é o ``next_cursor`` da
+    página anterior.
+    """
+    if (users is not None and not users) or (periods is not None and not periods):
+        return LogPage(pd.DataFrame(columns=list(columns or PAGE_COLUMNS)), None)
+
+    query, params = build_page_query(users, periods, since, until, cursor, page_size, columns)
+    with read_connection(db_path) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (last['timestamp'], int(last['id']))
+
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format=TIMESTAMP_FORMAT)
+    return LogPage(df, next_cursor)
+
+
+def merge_pages(pages, page_size=50):
+    """Junta páginas da mesma consulta lidas de fontes diferentes (ex.: banco e arquivo).
+
+    Cada fonte devolveu até ``page_size`` linhas depois do mesmo cursor; as
+    que ainda não apareceram são mais antigas que as devolvidas, então a
+    última linha exibida serve de cursor para todas.
+    """
+    frames = [page.rows for page in pages if not page.rows.empty]
+    if not frames:
+        return LogPage(pages[0].rows, None)
+    df = pd.concat(frames, ignore_index=True).sort_values(
+        ['timestamp', 'id'], ascending=False, kind='stable', ignore_index=True)
+    rows = df.head(page_size)
+
+    next_cursor = None
+    if len(df) > page_size or any(page.has_next for page in pages):
+        last = rows.iloc[-1]
+        next_cursor = (last['timestamp'].strftime(TIMESTAMP_FORMAT), int(last['id']))
+    return LogPage(rows, next_cursor)
@@ -0,0 +1,114 @@
+"""Codificação dos resultados do ``DashboardBackend`` para o serviço HTTP.
+
+Os métodos do backend devolvem DataFrames, Series, timestamps e os
+dataclasses dos módulos (``BusinessSummary``, ``LogPage``...). Em JSON
+cada um vira um objeto marcado (``{"__frame__": ...}``) que o cliente
+reconstrói com os mesmos tipos: DataFrames vão no formato ``table`` do
+pandas, que guarda dtypes (datetime, categórico) e o índice.
+
+DataFrames soltos também podem ir como Arrow IPC (``ARROW_CONTENT_TYPE``),
+mais compacto e sem parse de texto — ``pyarrow`` é opcional dos dois
+lados, como nos snapshots.
+"""
+import dataclasses
+import io
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+
+from soma_dashboard.aggregates import BusinessSummary
+from soma_dashboard.pagination import LogPage
+from soma_dashboard.traces import Trace
+from soma_dashboard.windows import ExecutionWindow
+
+JSON_CONTENT_TYPE = 'application/json'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Dataclasses que atravessam o serviço (nome -> classe)
+PAYLOAD_TYPES = {cls.__name__: cls for cls in (BusinessSummary, ExecutionWindow, LogPage, Trace)}
+
+
+def arrow_available():
+    return pa is not None
+
+
+def encode(value):
+    """Converte ``value`` em estruturas aceitas pelo ``json``."""
+    if isinstance(value, pd.DataFrame):
+        return {'__frame__': json.loads(value.to_json(orient='table', date_format='iso', date_unit='us'))}
+    if isinstance(value, pd.Series):
+        name = value.name if value.name is not None else '__value__'
+        return {'__series__': encode(value.to_frame(name)), 'name': value.name}
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return None if pd.isna(value) else {'__timestamp__': pd.Timestamp(value).isoformat()}
+    if isinstance(value, pd.Timedelta):
+        return {'__timedelta__': value.total_seconds()}
+    if dataclasses.is_dataclass(value) and type(value).__name__ in PAYLOAD_TYPES:
+        fields = {field.name: encode(getattr(value, field.name)) for field in dataclasses.fields(value)}
+        return {'__dataclass__': type(value).__name__, 'fields': fields}
+    if isinstance(value, tuple):
+        return {'__tuple__': [encode(item) for item in value]}
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): encode(item) for key, item in value.items()}
+    if isinstance(value, np.generic):
+        return encode(value.item())
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def decode(value):
+    """Inverso de ``encode``."""
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '__frame__' in value:
+        return pd.read_json(io.StringIO(json.dumps(value['__frame__'])), orient='table')
+    if '__series__' in value:
+        frame = decode(value['__series__'])
+        series = frame.iloc[:, 0]
+        series.name = value['name']
+        return series
+    if '__timestamp__' in value:
+        return pd.Timestamp(value['__timestamp__'])
+    if '__timedelta__' in value:
+        return pd.Timedelta(seconds=value['__timedelta__'])
+    if '__dataclass__' in value:
+        cls = PAYLOAD_TYPES[value['__dataclass__']]
+        return cls(**{name: decode(item) for name, item in value['fields'].items()})
+    if '__tuple__' in value:
+        return tuple(decode(item) for item in value['__tuple__'])
+    return {key: decode(item) for key, item in value.items()}
+
+
+def dumps(value):
+    return json.dumps(encode(value), separators=(',', ':')).encode()
+
+
+def loads(body):
+    return decode(json.loads(body))
+
+
+def frame_to_arrow(frame):
+    """DataFrame -> bytes Arrow IPC (stream), com o índice preservado."""
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_to_frame(body):
+    return ipc.open_stream(pa.py_buffer(body)).read_pandas()
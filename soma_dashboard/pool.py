@@ -0,0 +1,179 @@
+"""Pool de conexões somente leitura para os leitores dos painéis.
+
+Antes cada carga abria e fechava um ``sqlite3.connect`` próprio: a cada
+chamada o SQLite relia o schema, descartava o cache de páginas e as
+consultas eram preparadas de novo. O ``ConnectionPool`` mantém algumas
+conexões abertas (URI ``mode=ro``) com pragmas de leitura:
+
+- ``query_only``: nenhuma escrita passa por uma conexão do pool;
+- ``mmap_size``: páginas lidas direto do mapeamento do arquivo;
+- ``cache_size``: cache de páginas que sobrevive entre chamadas;
+- ``cached_statements``: cada consulta é preparada uma vez por conexão.
+
+As conexões são ``GuardedConnection``: consultas que fariam full scan em
+tabelas acima de ``max_scan_rows`` são recusadas antes de rodar (ver
+``soma_dashboard.queryplan``).
+
+O pool nunca altera o banco, nem o journal. Com o journal padrão
+(rollback) um leitor segura um lock SHARED durante a consulta e o commit do
+``LoggingService`` espera; em WAL leitores e o escritor não se bloqueiam.
+A troca para WAL fica gravada no arquivo e muda também o journal da Soma
+API (com os arquivos ``-wal``/``-shm`` ao lado do banco), então é uma
+decisão de quem opera o banco: ``python -m soma_dashboard.indexes
+/caminho/soma_logs.db --wal`` (ver ``enable_wal``). As conexões devolvidas
+ao pool nunca ficam com transação aberta, para não segurar o checkpoint do
+WAL.
+
+Uso::
+
+    with read_connection(db_path) as conn:
+        df = pd.read_sql_query(query, conn)
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from soma_dashboard.queryplan import DEFAULT_MAX_SCAN_ROWS, GuardedConnection, QueryGuard
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_CACHE_SIZE_KB = 32 * 1024
+STATEMENT_CACHE_SIZE = 256
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def enable_wal(db_path, timeout=5):
+    """Passa o banco para WAL (persistente no arquivo); retorna o journal_mode final."""
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    try:
+        return conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class ConnectionPool:
+    """Até ``size`` conexões somente leitura compartilhadas entre threads."""
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE, mmap_size=DEFAULT_MMAP_SIZE,
+                 cache_size_kb=DEFAULT_CACHE_SIZE_KB, timeout=5,
+                 max_scan_rows=DEFAULT_MAX_SCAN_ROWS):
+        self.db_path = db_path
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.timeout = timeout
+        self.guard = None if max_scan_rows is None else QueryGuard(max_scan_rows)
+        self.journal_mode = None
+        self._uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._file_id = None
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self._uri, uri=True, timeout=self.timeout,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+                               factory=GuardedConnection)
+        conn.guard = self.guard
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        self.journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        return conn
+
+    def _current_file_id(self):
+        try:
+            stat = os.stat(self.db_path)
+        except FileNotFoundError:
+            # Mesmo erro que o connect em mode=ro daria
+            raise sqlite3.OperationalError(f"unable to open database file: {self.db_path}")
+        return stat.st_dev, stat.st_ino
+
+    def _discard_idle(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def _checkout(self):
+        # Banco recriado (outro inode): conexões antigas ainda apontam para o arquivo velho
+        file_id = self._current_file_id()
+        with self._file_lock:
+            if file_id != self._file_id:
+                self._discard_idle()
+                self._file_id = file_id
+                if self.guard is not None:
+                    self.guard.reset()
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=self.timeout)
+
+    def _checkin(self, conn, broken=False):
+        if not broken:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                broken = True
+        if broken:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        except BaseException:
+            # Caminho raro: descarta a conexão em vez de adivinhar se ficou utilizável
+            self._checkin(conn, broken=True)
+            raise
+        self._checkin(conn)
+
+    def close(self):
+        self._discard_idle()
+
+
+def get_pool(db_path, **options):
+    """Pool compartilhado do processo para ``db_path`` (criado na primeira chamada)."""
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, **options)
+        return pool
+
+
+@contextmanager
+def read_connection(db_path):
+    with get_pool(db_path).connection() as conn:
+        yield conn
@@ -0,0 +1,250 @@
+"""Tempo de inicialização e de cada rerun dos painéis, contra um orçamento.
+
+O Streamlit reexecuta o script inteiro a cada interação; o primeiro run
+num processo ainda paga os imports (pandas, matplotlib...), a criação do
+backend e a primeira carga dos stores. O ``StartupProfiler`` de cada painel
+marca as etapas de cada run (``run.mark('dados')``) e separa o cold start
+(primeiro run do painel no processo) dos reruns::
+
+    run = profiler.start('telemetry_dashboard')   # logo depois do import do streamlit
+    ...                                           # imports pesados
+    run.mark('imports')
+    ...
+    profiler.finish(run)
+
+Runs interrompidos por ``st.stop()`` não entram nas medidas. O relatório
+compara o cold start e o p95 dos reruns com os orçamentos da configuração
+(``soma_dashboard.app``).
+
+Pela linha de comando cada painel roda num processo novo (cold start de
+verdade, imports incluídos) pelo ``AppTest`` do Streamlit, seguido de
+alguns reruns; sai com 1 se algum passar do orçamento::
+
+    python -m soma_dashboard.profiler telemetry_dashboard.py business_logs_dashboard.py --reruns 5
+
+Este módulo não importa nada pesado: o painel o importa antes de todo o
+resto para medir os próprios imports.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+MAX_RUNS = 200
+
+
+class ProfiledRun:
+    """Um run do script: duração de cada etapa desde a marca anterior."""
+
+    def __init__(self, cold):
+        self.cold = cold
+        self.stages = {}
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.total_ms = None
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def to_dict(self):
+        return {'cold': self.cold, 'stages': self.stages, 'total_ms': self.total_ms}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class StartupProfiler:
+    """Runs recentes de um painel; o primeiro do processo é o cold start."""
+
+    def __init__(self, name, max_runs=MAX_RUNS):
+        self.name = name
+        self.cold_start = None
+        self.reruns = deque(maxlen=max_runs)
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            cold = self._started == 0
+            self._started += 1
+        return ProfiledRun(cold)
+
+    def finish(self, run, stage='página'):
+        run.mark(stage)
+        run.total_ms = (run._last - run.started) * 1000
+        with self._lock:
+            if run.cold and self.cold_start is None:
+                self.cold_start = run
+            elif not run.cold:
+                self.reruns.append(run)
+
+    def summary(self, cold_budget_ms=None, rerun_budget_ms=None):
+        """``{'cold_ms', 'rerun_p50_ms', 'rerun_p95_ms', 'reruns', 'cold_ok', 'rerun_ok'}``."""
+        with self._lock:
+            cold = self.cold_start.total_ms if self.cold_start is not None else None
+            totals = [run.total_ms for run in self.reruns]
+        p95 = _percentile(totals, 0.95)
+        return {
+            'cold_ms': cold,
+            'rerun_p50_ms': _percentile(totals, 0.5),
+            'rerun_p95_ms': p95,
+            'reruns': len(totals),
+            'cold_ok': None if cold is None or cold_budget_ms is None else cold <= cold_budget_ms,
+            'rerun_ok': None if p95 is None or rerun_budget_ms is None else p95 <= rerun_budget_ms,
+        }
+
+    def stages(self):
+        """Uma linha por etapa: cold start, p50 e máximo dos reruns."""
+        import pandas as pd
+
+        with self._lock:
+            cold = dict(self.cold_start.stages) if self.cold_start is not None else {}
+            reruns = [run.stages for run in self.reruns]
+        names = list(cold) + [name for stages in reruns for name in stages if name not in cold]
+        rows = []
+        for name in dict.fromkeys(names):
+            values = [stages[name] for stages in reruns if name in stages]
+            rows.append({
+                'Etapa': name,
+                'Cold start (ms)': round(cold[name], 1) if name in cold else None,
+                'Rerun p50 (ms)': round(_percentile(values, 0.5), 1) if values else None,
+                'Rerun máx (ms)': round(max(values), 1) if values else None,
+            })
+        return pd.DataFrame(rows)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'cold_start': self.cold_start.to_dict() if self.cold_start is not None else None,
+                'reruns': [run.to_dict() for run in self.reruns],
+            }
+
+
+_profilers = {}
+_profilers_lock = threading.Lock()
+
+
+def get(name):
+    """Profiler do painel ``name`` (um por processo, sobrevive aos reruns)."""
+    with _profilers_lock:
+        profiler = _profilers.get(name)
+        if profiler is None:
+            profiler = _profilers[name] = StartupProfiler(name)
+        return profiler
+
+
+def start(name):
+    return get(name).start()
+
+
+def finish(name, run):
+    get(name).finish(run)
+
+
+# Linha de comando: cada painel num processo novo
+
+def _profile_script(script, reruns, timeout):
+    """Roda no processo filho: cold start + ``reruns`` pelo AppTest; retorna o profiler em dict."""
+    from streamlit.testing.v1 import AppTest
+
+    # Com ``python -m`` este arquivo roda como __main__; o painel registra no módulo importado
+    from soma_dashboard import profiler
+
+    name = os.path.splitext(os.path.basename(script))[0]
+    started = time.perf_counter()
+    # O AppTest resolve caminhos relativos a partir deste arquivo, não do diretório atual
+    app = AppTest.from_file(os.path.abspath(script), default_timeout=timeout)
+    app.run()
+    wall_ms = (time.perf_counter() - started) * 1000
+    for _ in range(reruns):
+        app.run()
+    errors = [str(element.value) for element in list(app.exception) + list(app.error)]
+    return dict(profiler.get(name).to_dict(), wall_cold_ms=wall_ms, errors=errors)
+
+
+def _measure(script, reruns, timeout):
+    command = [sys.executable, '-m', 'soma_dashboard.profiler', '--child', script,
+               '--reruns', str(reruns), '--timeout', str(timeout)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else
+                           f"{script}: processo saiu com {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold start e reruns dos painéis contra o orçamento")
+    parser.add_argument('scripts', nargs='+', help="scripts do Streamlit (ex.: telemetry_dashboard.py)")
+    parser.add_argument('--reruns', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=120, help="segundos por run do script")
+    parser.add_argument('--cold-budget-ms', type=float, default=None, help="padrão: da configuração")
+    parser.add_argument('--rerun-budget-ms', type=float, default=None, help="padrão: da configuração")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_profile_script(args.scripts[0], args.reruns, args.timeout)))
+        return 0
+
+    import pandas as pd
+
+    from soma_dashboard.app import DashboardConfig
+    config = DashboardConfig.load()
+    for error in config.errors:
+        print(f"configuração: {error}", file=sys.stderr)
+    cold_budget = args.cold_budget_ms or config.cold_start_budget_ms
+    rerun_budget = args.rerun_budget_ms or config.rerun_budget_ms
+
+    over_budget = []
+    for script in args.scripts:
+        try:
+            measured = _measure(script, args.reruns, args.timeout)
+        except (RuntimeError, ValueError) as e:
+            print(f"{script}: erro: {e}", file=sys.stderr)
+            over_budget.append(script)
+            continue
+
+        profiler = StartupProfiler(measured['name'])
+        if measured['cold_start'] is None:
+            print(f"{script}: o script não chegou ao profiler.finish "
+                  f"({'; '.join(measured['errors']) or 'st.stop() antes do fim'})", file=sys.stderr)
+            over_budget.append(script)
+            continue
+        for data in [measured['cold_start']] + measured['reruns']:
+            run = ProfiledRun(data['cold'])
+            run.stages, run.total_ms = data['stages'], data['total_ms']
+            if run.cold:
+                profiler.cold_start = run
+            else:
+                profiler.reruns.append(run)
+
+        summary = profiler.summary(cold_budget, rerun_budget)
+        print(f"{script}")
+        print(f"  cold start: {summary['cold_ms']:.0f} ms (orçamento {cold_budget:.0f} ms) "
+              f"{'ok' if summary['cold_ok'] else 'ACIMA'}; com o AppTest: {measured['wall_cold_ms']:.0f} ms")
+        if summary['reruns']:
+            print(f"  reruns: p50 {summary['rerun_p50_ms']:.0f} ms, p95 {summary['rerun_p95_ms']:.0f} ms "
+                  f"(orçamento {rerun_budget:.0f} ms) {'ok' if summary['rerun_ok'] else 'ACIMA'}")
+        for _, row in profiler.stages().iterrows():
+            rerun = '' if pd.isna(row['Rerun p50 (ms)']) else f", rerun p50 {row['Rerun p50 (ms)']:.1f} ms"
+            cold = '-' if pd.isna(row['Cold start (ms)']) else f"{row['Cold start (ms)']:.1f} ms"
+            print(f"    {row['Etapa']:<12} cold {cold}{rerun}")
+        if summary['cold_ok'] is False or summary['rerun_ok'] is False:
+            over_budget.append(script)
+
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Leitura do ``EXPLAIN QUERY PLAN`` e bloqueio de full scans em tabelas grandes.
+
+Uma consulta sem índice adequado funciona com os dados de teste e vira
+segundos de varredura quando ``business_logs`` passa de milhões de linhas.
+O ``QueryGuard`` olha o plano de cada consulta de leitura antes de
+executá-la e recusa (``FullScanError``) as que leriam por inteiro uma
+tabela maior que ``max_scan_rows``. Conta como full scan:
+
+- ``SCAN tabela`` sem índice;
+- ``SCAN tabela USING INDEX`` (índice que não cobre a consulta) sem
+  ``LIMIT`` — com ``LIMIT`` a varredura ordenada para cedo, como na
+  paginação.
+
+``SCAN ... USING COVERING INDEX`` é permitido: lê só o índice, que é o
+caminho previsto para as agregações (ver ``soma_dashboard.indexes``).
+
+O plano de cada texto SQL e o tamanho de cada tabela (``MAX(rowid)``) ficam
+em cache por ``ttl`` segundos, então o custo extra é um ``EXPLAIN`` por
+consulta distinta e não por execução.
+"""
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_MAX_SCAN_ROWS = 100_000
+
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: USING (COVERING )?INDEX \w+)?')
+_TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+_SQL_KEYWORDS = {'WHERE', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'ON', 'GROUP', 'ORDER', 'LIMIT', 'USING', 'NATURAL'}
+
+
+class FullScanError(RuntimeError):
+    """Consulta recusada: leria uma tabela grande inteira."""
+
+    def __init__(self, table, rows, max_scan_rows, plan):
+        self.table = table
+        self.rows = rows
+        self.max_scan_rows = max_scan_rows
+        self.plan = plan
+        super().__init__(
+            f"Consulta recusada: full scan em {table} (~{rows} linhas, limite {max_scan_rows}). "
+            f"Plano: {' | '.join(plan)}"
+        )
+
+
+def explain(conn, sql, params=()):
+    """Linhas de detalhe do ``EXPLAIN QUERY PLAN`` (sem passar pelo guard)."""
+    cursor = sqlite3.Cursor(conn)
+    return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def table_aliases(sql):
+    """``{alias ou nome: tabela}`` das tabelas citadas em FROM/JOIN."""
+    aliases = {}
+    for table, alias in _TABLE_REFERENCE.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in _SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(sql, plan):
+    """Tabelas que o plano leria por inteiro (ver docstring do módulo)."""
+    aliases = table_aliases(sql)
+    has_limit = _LIMIT.search(sql) is not None
+    tables = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        # Subconsultas, CTEs e "SCAN CONSTANT ROW" não são tabelas citadas na consulta
+        if match is None or match.group(1) not in aliases:
+            continue
+        uses_index = ' USING ' in detail
+        if uses_index and (match.group(2) or has_limit):
+            continue
+        tables.append(aliases[match.group(1)])
+    return tables
+
+
+def is_read_query(sql):
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+class QueryGuard:
+    """Recusa consultas que fariam full scan em tabelas com mais de ``max_scan_rows``."""
+
+    def __init__(self, max_scan_rows=DEFAULT_MAX_SCAN_ROWS, ttl=60):
+        self.max_scan_rows = max_scan_rows
+        self.ttl = ttl
+        self._plans = {}
+        self._rows = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        # Índices novos mudam os planos e as tabelas crescem: recalcula tudo de tempos em tempos
+        now = time.monotonic()
+        if now >= self._expires_at:
+            self._plans.clear()
+            self._rows.clear()
+            self._expires_at = now + self.ttl
+
+    def reset(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+    def table_rows(self, conn, table):
+        with self._lock:
+            rows = self._rows.get(table)
+        if rows is None:
+            rows = sqlite3.Cursor(conn).execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+            with self._lock:
+                self._rows[table] = rows
+        return rows
+
+    def check(self, conn, sql, params=()):
+        if not is_read_query(sql):
+            return
+        with self._lock:
+            self._expire()
+            cached = self._plans.get(sql)
+        if cached is None:
+            plan = explain(conn, sql, params)
+            cached = (plan, full_scans(sql, plan))
+            with self._lock:
+                self._plans[sql] = cached
+
+        plan, tables = cached
+        for table in tables:
+            rows = self.table_rows(conn, table)
+            if rows > self.max_scan_rows:
+                raise FullScanError(table, rows, self.max_scan_rows, plan)
+
+
+class GuardedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        guard = getattr(self.connection, 'guard', None)
+        if guard is not None:
+            guard.check(self.connection, sql, parameters)
+        return super().execute(sql, parameters)
+
+
+class GuardedConnection(sqlite3.Connection):
+    """``sqlite3.Connection`` cujas consultas passam pelo ``guard`` (se houver).
+
+    O ``pd.read_sql_query`` cria cursores via ``cursor()``; o atalho
+    ``execute`` do C não passa por ele, por isso também é redefinido.
+    """
+
+    guard = None
+
+    def cursor(self, factory=GuardedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
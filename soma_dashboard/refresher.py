@@ -0,0 +1,100 @@
+"""Atualização única e compartilhada dos dados entre todas as sessões.
+
+Com ``st.cache_data`` cada sessão recebe uma cópia (pickle) do DataFrame e
+cada expiração do TTL dispara uma consulta por sessão que chega ao mesmo
+tempo. O ``DataRefresher`` vive num ``st.cache_resource``: uma thread em
+segundo plano consulta o soma_logs.db a cada ``interval`` segundos,
+publica um DataFrame novo só quando chegaram linhas, e todas as sessões
+leem o mesmo objeto. Chamadas simultâneas a ``refresh`` esperam a consulta
+que já está em andamento em vez de disparar outra.
+
+Os frames publicados são compartilhados: as páginas devem tratá-los como
+somente leitura (com Copy-on-Write do pandas, qualquer alteração numa
+sessão gera uma cópia local e não afeta as demais).
+"""
+import threading
+import time
+
+
+class DataRefresher:
+    """Mantém o último frame de cada ``LogStore`` e o atualiza em segundo plano."""
+
+    def __init__(self, stores, interval=5.0, snapshots=None):
+        self.stores = dict(stores)
+        self.interval = interval
+        self.snapshots = snapshots
+        self.version = 0
+        self._frames = {}
+        self._errors = {}
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, name, store):
+        """Passa a atualizar ``store`` também (entra na próxima consulta)."""
+        with self._refresh_lock:
+            self.stores[name] = store
+            # Força a próxima chamada a consultar, mesmo dentro do intervalo
+            self._refreshed_at = 0.0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='soma-dashboard-refresher', daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        """Consulta os stores; quem chega durante uma consulta reaproveita o resultado."""
+        requested_at = time.monotonic()
+        with self._refresh_lock:
+            if self._refreshed_at >= requested_at:
+                return
+
+            changed = False
+            for name, store in self.stores.items():
+                try:
+                    if store.refresh() or name not in self._frames:
+                        self._frames[name] = store.frame()
+                        changed = True
+                    self._errors.pop(name, None)
+                except Exception as e:
+                    self._errors[name] = e
+                    continue
+
+                if self.snapshots is not None:
+                    try:
+                        self.snapshots.maybe_save(store)
+                    except Exception:
+                        # Snapshot é só otimização de cold start; falhar não afeta os dados
+                        pass
+
+            if changed:
+                self.version += 1
+            self._refreshed_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if time.monotonic() - self._refreshed_at > self.interval:
+            # Thread parada ou atrasada: atualiza aqui (coalescido com as outras sessões)
+            self.refresh()
+
+    def get(self, name):
+        """Retorna ``(frame, erro)`` do store ``name`` sem copiar o frame."""
+        self._ensure_fresh()
+        return self._frames.get(name), self._errors.get(name)
+
+    def poll(self):
+        """Versão atual dos dados; só muda quando algum store recebeu linhas novas."""
+        self._ensure_fresh()
+        return self.version
@@ -0,0 +1,278 @@
+"""Retenção do soma_logs.db: arquiva, apaga em lotes e devolve o espaço.
+
+Nada apagava linhas do banco, então os INSERTs da Soma API e cada
+consulta dos painéis ficavam mais lentos com a idade. ``apply_retention``
+tira de ``business_logs`` e ``operations`` as linhas com ``timestamp``
+anterior ao corte:
+
+1. avança os rollups e só arquiva linhas que já estão neles — o histórico
+   por minuto/hora (``soma_dashboard.rollups``) continua completo;
+2. lê as linhas mais antigas em lotes (pelo índice de ``timestamp``),
+   grava cada lote como partição do dia em ``archive/`` (ver
+   ``soma_dashboard.archive``) e só então apaga o lote numa transação
+   curta, com uma pausa entre lotes para os commits do ``LoggingService``;
+3. roda ``PRAGMA incremental_vacuum`` em passos pequenos para devolver as
+   páginas livres ao sistema de arquivos.
+
+A linha de maior chave de cada tabela nunca é apagada: ``operations`` usa
+``rowid`` sem AUTOINCREMENT, e sem ela o SQLite poderia reutilizar rowids
+abaixo dos watermarks dos stores e dos rollups.
+
+Uso (por exemplo, diariamente pelo cron)::
+
+    python -m soma_dashboard.retention /caminho/soma_logs.db --keep-days 30
+    python -m soma_dashboard.retention /caminho/soma_logs.db --keep-days 30 --dry-run
+
+O vacuum incremental exige ``auto_vacuum = INCREMENTAL``, que num banco
+existente só vale depois de um ``VACUUM`` completo (trava o banco enquanto
+reescreve o arquivo): ``--enable-incremental-vacuum`` faz essa conversão
+uma vez, fora do horário de pico. Painéis abertos continuam com as linhas
+arquivadas em memória até reiniciarem; os snapshots dos stores são
+descartados e recarregados do banco.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from soma_dashboard.archive import default_archive_dir, write_part
+from soma_dashboard.indexes import migrate
+from soma_dashboard.rollups import ROLLUP_SOURCES, RollupEngine
+from soma_dashboard.schema import TIMESTAMP_FORMAT
+
+DEFAULT_KEEP_DAYS = 30
+DEFAULT_BATCH_SIZE = 5_000
+DEFAULT_PAUSE = 0.05
+DEFAULT_VACUUM_PAGES = 1_000
+
+# business_logs primeiro: referencia operations pelo operation_id
+TABLE_ORDER = ['business_logs', 'operations']
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass
+class RetentionReport:
+    table: str
+    cutoff: pd.Timestamp
+    archived: int = 0
+    batches: int = 0
+    parts: list = field(default_factory=list)
+    pending: int = 0         # antigas mantidas: fora dos rollups ou a última linha da tabela
+
+
+@dataclass
+class VacuumReport:
+    auto_vacuum: int
+    freed_pages: int = 0
+    free_pages: int = 0      # páginas livres que sobraram no arquivo
+    page_size: int = 0
+
+    @property
+    def freed_bytes(self):
+        return self.freed_pages * self.page_size
+
+
+def cutoff_for(keep_days, now=None):
+    """Início do dia (UTC) ``keep_days`` dias atrás: partições sempre de dias inteiros."""
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None) if now is None else pd.Timestamp(now)
+    return (now - pd.Timedelta(days=keep_days)).floor('D')
+
+
+def _connect(db_path, timeout):
+    return sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+
+
+def _watermarks(conn):
+    try:
+        return dict(conn.execute("SELECT source, last_id FROM rollup_watermarks").fetchall())
+    except sqlite3.OperationalError:
+        # Rollups nunca rodaram (só acontece no --dry-run): nada pode sair ainda
+        return {}
+
+
+def _archive_limit(conn, table, key, watermarks):
+    """Maior chave que pode sair do banco: já nos rollups e abaixo da última linha."""
+    max_key = conn.execute(f"SELECT MAX({key}) FROM {table}").fetchone()[0] or 0
+    watermark = watermarks.get(table, 0)
+    if watermark > max_key:
+        # Watermark de uma tabela recriada (o RollupEngine ainda não refez o rollup)
+        return 0
+    return min(watermark, max_key - 1)
+
+
+def archive_table(conn, table, cutoff, archive_dir, batch_size=DEFAULT_BATCH_SIZE,
+                  pause=DEFAULT_PAUSE, dry_run=False, progress=None):
+    """Arquiva e apaga as linhas de ``table`` anteriores a ``cutoff``; retorna o ``RetentionReport``."""
+    key = ROLLUP_SOURCES[table]['key']
+    report = RetentionReport(table, cutoff)
+    limit = _archive_limit(conn, table, key, _watermarks(conn))
+    cutoff_param = cutoff.strftime(TIMESTAMP_FORMAT)
+
+    report.pending = conn.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE timestamp < ? AND {key} > ?", (cutoff_param, limit)
+    ).fetchone()[0]
+    if dry_run:
+        report.archived = conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE timestamp < ? AND {key} <= ?", (cutoff_param, limit)
+        ).fetchone()[0]
+        return report
+
+    # Sempre as mais antigas que restam: depois do DELETE o próximo lote começa onde este parou
+    batch_query = f"""
+    SELECT {key} AS archive_key, *
+    FROM {table}
+    WHERE timestamp < ? AND {key} <= ?
+    ORDER BY timestamp
+    LIMIT ?
+    """
+    while True:
+        batch = pd.read_sql_query(batch_query, conn, params=(cutoff_param, limit, batch_size))
+        if batch.empty:
+            return report
+
+        days = pd.to_datetime(batch['timestamp'], format='ISO8601').dt.strftime('%Y-%m-%d')
+        for day, rows in batch.groupby(days, sort=True):
+            keys = rows.pop('archive_key')
+            report.parts.append(write_part(archive_dir, table, day, int(keys.min()), int(keys.max()), rows))
+
+        keys = [(int(value),) for value in batch['archive_key']]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(f"DELETE FROM {table} WHERE {key} = ?", keys)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        report.archived += len(batch)
+        report.batches += 1
+        if progress is not None:
+            progress(report)
+        # Folga para o LoggingService pegar o lock de escrita entre os lotes
+        time.sleep(pause)
+
+
+def incremental_vacuum(conn, pages_per_step=DEFAULT_VACUUM_PAGES, pause=DEFAULT_PAUSE, enable=False):
+    """Devolve as páginas livres em passos de ``pages_per_step``; retorna o ``VacuumReport``."""
+    auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if auto_vacuum != AUTO_VACUUM_INCREMENTAL and enable:
+        # Conversão única: o VACUUM completo reescreve o arquivo e já devolve todo o espaço
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        report = VacuumReport(auto_vacuum, freed_pages=before)
+    else:
+        report = VacuumReport(auto_vacuum)
+
+    report.page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    if auto_vacuum == AUTO_VACUUM_INCREMENTAL:
+        while True:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            # Cada passo é uma transação própria; fetchall executa o pragma até o fim
+            conn.execute(f"PRAGMA incremental_vacuum({min(free, pages_per_step)})").fetchall()
+            freed = free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if freed <= 0:
+                break
+            report.freed_pages += freed
+            time.sleep(pause)
+        # Em WAL as páginas só saem do arquivo no checkpoint (PASSIVE: não espera escritores)
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+
+    report.free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return report
+
+
+def apply_retention(db_path, cutoff, archive_dir=None, tables=TABLE_ORDER, batch_size=DEFAULT_BATCH_SIZE,
+                    pause=DEFAULT_PAUSE, vacuum=True, vacuum_pages=DEFAULT_VACUUM_PAGES,
+                    enable_incremental_vacuum=False, dry_run=False, timeout=30, progress=None):
+    """Arquiva e apaga o que é anterior a ``cutoff``; retorna ``({tabela: RetentionReport}, VacuumReport)``."""
+    archive_dir = archive_dir or default_archive_dir(db_path)
+    cutoff = pd.Timestamp(cutoff)
+
+    # Índices de timestamp para os lotes e rollups em dia antes de qualquer DELETE
+    if not dry_run:
+        migrate(db_path, timeout=timeout)
+        RollupEngine(db_path).advance()
+
+    conn = _connect(db_path, timeout)
+    try:
+        reports = {}
+        for table in tables:
+            if table not in ROLLUP_SOURCES:
+                raise ValueError(f"Tabela desconhecida: {table}")
+            reports[table] = archive_table(conn, table, cutoff, archive_dir, batch_size=batch_size,
+                                           pause=pause, dry_run=dry_run, progress=progress)
+
+        vacuum_report = None
+        if vacuum and not dry_run:
+            vacuum_report = incremental_vacuum(conn, vacuum_pages, pause, enable=enable_incremental_vacuum)
+            conn.execute("PRAGMA optimize")
+        return reports, vacuum_report
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arquiva e apaga as linhas antigas do soma_logs.db")
+    parser.add_argument('db_path')
+    window = parser.add_mutually_exclusive_group()
+    window.add_argument('--keep-days', type=float, default=DEFAULT_KEEP_DAYS,
+                        help="dias mantidos no banco (o corte é o início do dia, UTC)")
+    window.add_argument('--before', default=None, help="corte explícito (UTC), ex.: 2026-09-01")
+    parser.add_argument('--archive-dir', default=None, help="padrão: archive ao lado do banco")
+    parser.add_argument('--tables', nargs='+', default=TABLE_ORDER, choices=TABLE_ORDER)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=DEFAULT_PAUSE, help="segundos entre lotes")
+    parser.add_argument('--vacuum-pages', type=int, default=DEFAULT_VACUUM_PAGES,
+                        help="páginas devolvidas por passo do incremental_vacuum")
+    parser.add_argument('--no-vacuum', action='store_true')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help="converte o banco para auto_vacuum=INCREMENTAL (VACUUM completo, uma vez)")
+    parser.add_argument('--dry-run', action='store_true', help="só conta o que seria arquivado")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    cutoff = pd.Timestamp(args.before) if args.before else cutoff_for(args.keep_days)
+
+    def progress(report):
+        if not args.quiet:
+            print(f"  {report.table}: {report.archived} linhas arquivadas ({report.batches} lotes)", flush=True)
+
+    try:
+        reports, vacuum_report = apply_retention(
+            args.db_path, cutoff, archive_dir=args.archive_dir, tables=args.tables,
+            batch_size=args.batch_size, pause=args.pause, vacuum=not args.no_vacuum,
+            vacuum_pages=args.vacuum_pages, enable_incremental_vacuum=args.enable_incremental_vacuum,
+            dry_run=args.dry_run, progress=progress,
+        )
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+    action = "seriam arquivadas" if args.dry_run else "arquivadas"
+    print(f"Corte: {cutoff} (UTC)")
+    for report in reports.values():
+        line = f"{report.table}: {report.archived} linhas {action}"
+        if report.parts:
+            line += f" em {len(report.parts)} arquivo(s)"
+        if report.pending:
+            line += f"; {report.pending} antigas mantidas (fora dos rollups ou última linha da tabela)"
+        print(line)
+    if vacuum_report is not None:
+        if vacuum_report.auto_vacuum == AUTO_VACUUM_INCREMENTAL:
+            print(f"Vacuum: {vacuum_report.freed_pages} páginas devolvidas "
+                  f"({vacuum_report.freed_bytes / 1024**2:.1f} MB)")
+        else:
+            print(f"Vacuum: {vacuum_report.free_pages} páginas livres no arquivo; auto_vacuum não é "
+                  f"INCREMENTAL (use --enable-incremental-vacuum uma vez)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
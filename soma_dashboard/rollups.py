@@ -0,0 +1,310 @@
+"""Tabelas de resumo (rollups) por minuto e por hora no soma_logs.db.
+
+O ``RollupEngine`` avança a partir de um watermark no ``id``/``rowid`` de
+cada tabela de origem e faz upsert das contagens, somas, mínimos e máximos
+de cada bucket em tabelas laterais. Gráficos de dias ou semanas passam a ler
+algumas centenas de linhas de rollup em vez de milhões de linhas cruas.
+
+Uso standalone (mantém os rollups em dia sem nenhum painel aberto)::
+
+    python -m soma_dashboard.rollups /caminho/soma_logs.db --interval 5
+"""
+import argparse
+import sqlite3
+import time
+
+import pandas as pd
+
+from soma_dashboard.pool import read_connection
+
+# Formato do início de cada bucket (mesmo formato texto do CURRENT_TIMESTAMP)
+GRANULARITIES = {
+    'minute': '%Y-%m-%d %H:%M:00',
+    'hour': '%Y-%m-%d %H:00:00',
+}
+
+# Tabela de origem -> como agregá-la
+ROLLUP_SOURCES = {
+    'operations': {
+        'key': 'rowid',
+        'rollup_table': 'operations_rollup',
+        'dimensions': (),
+        'result_column': 'result',
+    },
+    'business_logs': {
+        'key': 'id',
+        'rollup_table': 'business_logs_rollup',
+        'dimensions': ('user_id', 'day_period'),
+        'result_column': 'result_value',
+    },
+}
+
+METRIC_COLUMNS = [
+    'operations',
+    'execution_time_sum',
+    'execution_time_min',
+    'execution_time_max',
+    'result_sum',
+    'result_min',
+    'result_max',
+]
+
+# Janela lida quando ``since`` não é informado, contada a partir do bucket mais
+# recente (não do relógio): a leitura não cresce com o histórico acumulado
+DEFAULT_WINDOWS = {
+    'minute': pd.Timedelta(days=1),
+    'hour': pd.Timedelta(days=90),
+}
+
+WATERMARK_TABLE = """
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    source TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+)
+"""
+
+
+def _create_rollup_table(spec):
+    dimensions = ''.join(f"{d} TEXT NOT NULL,\n        " for d in spec['dimensions'])
+    primary_key = ', '.join(('granularity', 'bucket') + spec['dimensions'])
+    return f"""
+    CREATE TABLE IF NOT EXISTS {spec['rollup_table']} (
+        granularity TEXT NOT NULL,
+        bucket DATETIME NOT NULL,
+        {dimensions}operations INTEGER NOT NULL,
+        execution_time_sum INTEGER,
+        execution_time_min INTEGER,
+        execution_time_max INTEGER,
+        result_sum INTEGER,
+        result_min INTEGER,
+        result_max INTEGER,
+        PRIMARY KEY ({primary_key})
+    )
+    """
+
+
+def _upsert_query(source, spec, bucket_format):
+    dimensions = spec['dimensions']
+    result = spec['result_column']
+
+    select_dimensions = ''.join(f"COALESCE({d}, ''), " for d in dimensions)
+    insert_dimensions = ''.join(f"{d}, " for d in dimensions)
+    group_by = ', '.join(('bucket',) + tuple(f"COALESCE({d}, '')" for d in dimensions))
+    conflict = ', '.join(('granularity', 'bucket') + dimensions)
+
+    return f"""
+    INSERT INTO {spec['rollup_table']} (
+        granularity, bucket, {insert_dimensions}{', '.join(METRIC_COLUMNS)}
+    )
+    SELECT
+        ?,
+        strftime('{bucket_format}', timestamp) as bucket,
+        {select_dimensions}COUNT(*),
+        SUM(execution_time_ms),
+        MIN(execution_time_ms),
+        MAX(execution_time_ms),
+        SUM({result}),
+        MIN({result}),
+        MAX({result})
+    FROM {source}
+    WHERE {spec['key']} > ? AND {spec['key']} <= ?
+    GROUP BY {group_by}
+    ON CONFLICT ({conflict}) DO UPDATE SET
+        operations = operations + excluded.operations,
+        execution_time_sum = execution_time_sum + excluded.execution_time_sum,
+        execution_time_min = MIN(execution_time_min, excluded.execution_time_min),
+        execution_time_max = MAX(execution_time_max, excluded.execution_time_max),
+        result_sum = result_sum + excluded.result_sum,
+        result_min = MIN(result_min, excluded.result_min),
+        result_max = MAX(result_max, excluded.result_max)
+    """
+
+
+class RollupEngine:
+    """Mantém os rollups de ``operations`` e ``business_logs`` em dia.
+
+    Cada lote roda na sua própria transação curta (``batch_size`` ids por
+    vez), para não segurar o lock de escrita que o ``LoggingService`` usa.
+    Uma origem cujo ``MAX(key)`` fica abaixo do watermark foi recriada: o
+    rollup dela é apagado e refeito do zero.
+    """
+
+    def __init__(self, db_path, sources=None, batch_size=50_000):
+        self.db_path = db_path
+        self.sources = dict(sources or ROLLUP_SOURCES)
+        self.batch_size = batch_size
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+
+    def ensure_schema(self, conn):
+        # A cada rodada: um banco recriado volta sem as tabelas (IF NOT EXISTS não escreve nada)
+        conn.execute(WATERMARK_TABLE)
+        for spec in self.sources.values():
+            conn.execute(_create_rollup_table(spec))
+
+    def advance(self):
+        """Processa as linhas novas de todas as origens; retorna {origem: linhas}."""
+        processed = {}
+        conn = self._connect()
+        try:
+            self.ensure_schema(conn)
+            for source, spec in self.sources.items():
+                processed[source] = self._advance_source(conn, source, spec)
+        finally:
+            conn.close()
+        return processed
+
+    def _advance_source(self, conn, source, spec):
+        total = 0
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT last_id FROM rollup_watermarks WHERE source = ?", (source,)
+                ).fetchone()
+                last_id = row[0] if row else 0
+                max_id = conn.execute(
+                    f"SELECT MAX({spec['key']}) FROM {source}"
+                ).fetchone()[0] or 0
+
+                if max_id < last_id:
+                    # Origem recriada ou truncada: os buckets antigos não correspondem mais a ela
+                    conn.execute(f"DELETE FROM {spec['rollup_table']}")
+                    conn.execute("DELETE FROM rollup_watermarks WHERE source = ?", (source,))
+                    last_id = 0
+
+                if max_id <= last_id:
+                    conn.execute("COMMIT")
+                    return total
+
+                upper = min(max_id, last_id + self.batch_size)
+                rows = conn.execute(
+                    f"SELECT COUNT(*) FROM {source} WHERE {spec['key']} > ? AND {spec['key']} <= ?",
+                    (last_id, upper),
+                ).fetchone()[0]
+
+                for granularity, bucket_format in GRANULARITIES.items():
+                    conn.execute(
+                        _upsert_query(source, spec, bucket_format),
+                        (granularity, last_id, upper),
+                    )
+
+                conn.execute(
+                    "INSERT INTO rollup_watermarks (source, last_id) VALUES (?, ?) "
+                    "ON CONFLICT (source) DO UPDATE SET last_id = excluded.last_id",
+                    (source, upper),
+                )
+                conn.execute("COMMIT")
+                total += rows
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+
+def build_rollup_query(source, granularity='hour', since=None, until=None, by=(), window=None):
+    """SQL + parâmetros da leitura de um rollup (ver ``load_rollup``).
+
+    Sem ``since``, ``window`` limita a leitura aos buckets até essa
+    distância do mais recente (busca pela chave primária do rollup).
+    """
+    spec = ROLLUP_SOURCES[source]
+    by = tuple(by)
+    unknown = set(by) - set(spec['dimensions'])
+    if unknown:
+        raise ValueError(f"Dimensões inválidas para {source}: {sorted(unknown)}")
+
+    filters = ["granularity = ?"]
+    params = [granularity]
+    if since is not None:
+        filters.append("bucket >= ?")
+        params.append(pd.Timestamp(since).strftime('%Y-%m-%d %H:%M:%S'))
+    elif window is not None:
+        filters.append(f"bucket >= (SELECT datetime(MAX(bucket), ?) FROM {spec['rollup_table']} "
+                       f"WHERE granularity = ?)")
+        params.extend([f"-{int(pd.Timedelta(window).total_seconds())} seconds", granularity])
+    if until is not None:
+        filters.append("bucket < ?")
+        params.append(pd.Timestamp(until).strftime('%Y-%m-%d %H:%M:%S'))
+
+    group_by = ', '.join(('bucket',) + by)
+    query = f"""
+    SELECT
+        {group_by},
+        SUM(operations) as operations,
+        SUM(execution_time_sum) as execution_time_sum,
+        MIN(execution_time_min) as execution_time_min,
+        MAX(execution_time_max) as execution_time_max,
+        SUM(result_sum) as result_sum,
+        MIN(result_min) as result_min,
+        MAX(result_max) as result_max
+    FROM {spec['rollup_table']}
+    WHERE {' AND '.join(filters)}
+    GROUP BY {group_by}
+    ORDER BY bucket
+    """
+    return query, params
+
+
+def load_rollup(db_path, source, granularity='hour', since=None, until=None, by=(), full_history=False):
+    """Lê os buckets de uma origem, somando as dimensões que não estão em ``by``.
+
+    Sem ``since``, lê só a janela ``DEFAULT_WINDOWS[granularity]`` até o
+    bucket mais recente; ``full_history=True`` lê o histórico inteiro.
+
+    Retorna um DataFrame com ``bucket`` (datetime), as colunas de ``by`` e as
+    métricas, incluindo ``execution_time_avg`` e ``result_avg``.
+    """
+    window = None if full_history else DEFAULT_WINDOWS.get(granularity)
+    query, params = build_rollup_query(source, granularity, since, until, by, window)
+    with read_connection(db_path) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+
+    df['bucket'] = pd.to_datetime(df['bucket'], format='%Y-%m-%d %H:%M:%S')
+    df['execution_time_avg'] = df['execution_time_sum'] / df['operations']
+    df['result_avg'] = df['result_sum'] / df['operations']
+    return df
+
+
+def merge_rollups(frames, by=()):
+    """Junta os buckets de ``load_rollup`` de vários bancos (réplicas).
+
+    Somas e contagens somam, mínimos e máximos se combinam e as médias são
+    recalculadas sobre o total — o mesmo que um rollup único teria gravado.
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if len(frames) <= 1:
+        return frames[0] if frames else pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    keys = ['bucket', *by]
+    aggregations = {}
+    for column in df.columns:
+        if column in keys or column.endswith('_avg'):
+            continue
+        aggregations[column] = 'min' if column.endswith('_min') else 'max' if column.endswith('_max') else 'sum'
+    merged = df.groupby(keys, as_index=False, sort=True).agg(aggregations)
+    merged['execution_time_avg'] = merged['execution_time_sum'] / merged['operations']
+    merged['result_avg'] = merged['result_sum'] / merged['operations']
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantém os rollups do soma_logs.db")
+    parser.add_argument('db_path')
+    parser.add_argument('--interval', type=float, default=0,
+                        help="segundos entre rodadas (0 = roda uma vez)")
+    parser.add_argument('--batch-size', type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    engine = RollupEngine(args.db_path, batch_size=args.batch_size)
+    while True:
+        processed = engine.advance()
+        print(f"{time.strftime('%H:%M:%S')} rollups: {processed}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
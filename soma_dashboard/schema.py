@@ -0,0 +1,114 @@
+"""Esquema tipado das tabelas carregadas pelos painéis.
+
+``pd.read_sql_query`` devolve ``object`` para todo texto e ``int64`` para
+todo número, e a memória por linha fica dominada por objetos ``str`` do
+Python. Cada ``TableSchema`` diz quais colunas ler do SQLite e como
+convertê-las uma única vez, na chegada do delta: colunas de baixa
+cardinalidade viram categóricas, números são reduzidos, ``timestamp`` é
+lido com formato fixo e ``input_a``/``input_b`` saem de ``input_values``.
+``message`` não é carregada — só o detalhe do log a busca.
+"""
+import pandas as pd
+
+from soma_dashboard.store import BUSINESS_LOG_COLUMNS, OPERATION_COLUMNS
+
+# Formato do CURRENT_TIMESTAMP do SQLite
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_timestamps(values):
+    try:
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+    except (ValueError, TypeError):
+        # Linhas gravadas fora do padrão (ex.: com frações de segundo)
+        return pd.to_datetime(values, format='ISO8601')
+
+
+def split_input_values(values):
+    """``"10 + 5"`` -> (10, 5), vetorizado sobre a coluna inteira."""
+    parts = values.str.split(' + ', n=1, expand=True, regex=False)
+    return (pd.to_numeric(parts[0], errors='coerce'),
+            pd.to_numeric(parts[1], errors='coerce'))
+
+
+class TableSchema:
+    """Colunas lidas do SQLite (``source_columns``) -> frame tipado (``dtypes``).
+
+    ``dtypes`` aceita ``'category'``, ``'datetime'``, ``'string'`` (texto de
+    alta cardinalidade, mantido como ``object``) ou um dtype numérico do
+    numpy; inteiros com NULL caem para ``float64``.
+    """
+
+    def __init__(self, source_columns, dtypes, derive=None):
+        self.source_columns = list(source_columns)
+        self.dtypes = dict(dtypes)
+        self.derive = derive
+
+    @property
+    def columns(self):
+        return list(self.dtypes)
+
+    @property
+    def categorical_columns(self):
+        return [name for name, kind in self.dtypes.items() if kind == 'category']
+
+    def transform(self, raw):
+        """Converte um delta cru do ``read_sql_query`` para o esquema tipado."""
+        df = raw if self.derive is None else self.derive(raw)
+        typed = {}
+        for name, kind in self.dtypes.items():
+            values = df[name]
+            if kind == 'datetime':
+                typed[name] = parse_timestamps(values)
+            elif kind == 'category':
+                typed[name] = values.astype('category')
+            elif kind == 'string':
+                typed[name] = values.astype(object)
+            elif values.isna().any():
+                typed[name] = values.astype('float64')
+            else:
+                typed[name] = values.astype(kind)
+        return pd.DataFrame(typed)
+
+
+def _derive_inputs(df):
+    df = df.copy()
+    df['input_a'], df['input_b'] = split_input_values(df['input_values'].astype(str))
+    return df
+
+
+OPERATION_SCHEMA = TableSchema(
+    source_columns=OPERATION_COLUMNS,
+    dtypes={
+        'id': 'string',
+        'timestamp': 'datetime',
+        'operation_type': 'category',
+        'input_a': 'int32',
+        'input_b': 'int32',
+        'result': 'int32',
+        'execution_time_ms': 'int32',
+        'trace_id': 'string',
+        'span_id': 'string',
+    },
+)
+
+BUSINESS_LOG_SCHEMA = TableSchema(
+    source_columns=[c for c in BUSINESS_LOG_COLUMNS if c != 'message'],
+    dtypes={
+        'id': 'int64',
+        'operation_id': 'string',
+        'user_id': 'category',
+        'timestamp': 'datetime',
+        'hour_of_day': 'int8',
+        'day_period': 'category',
+        'operation_type': 'category',
+        'input_a': 'int32',
+        'input_b': 'int32',
+        'result_value': 'int32',
+        'execution_time_ms': 'int32',
+        'trace_id': 'string',
+        'ip_address': 'category',
+        'status': 'category',
+    },
+    derive=_derive_inputs,
+)
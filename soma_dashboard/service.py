@@ -0,0 +1,259 @@
+"""Serviço HTTP local com os dados dos painéis.
+
+Roda um ``DashboardBackend`` num processo próprio, dono do leitor do
+soma_logs.db, dos caches e dos rollups; os painéis (com
+``SOMA_DASHBOARD_SERVICE=http://host:porta``), scripts e alertas consomem
+os mesmos endpoints. Quantos viewers do Streamlit houver, o trabalho com o
+banco acontece uma vez só, aqui.
+
+Cada rota é um método do backend; os parâmetros vão na query string e a
+resposta é JSON (``soma_dashboard.payloads``) ou, para DataFrames, Arrow
+IPC quando o cliente aceita ``application/vnd.apache.arrow.stream``::
+
+    python -m soma_dashboard.service /caminho/soma_logs.db --port 8765
+    python -m soma_dashboard.service '/dados/replica-*/soma_logs.db'   # réplicas federadas
+    curl 'http://127.0.0.1:8765/recent?table=operations&limit=5'
+    curl 'http://127.0.0.1:8765/summary'
+
+As leituras são GET; ações que mudam estado (``/refresh``) só aceitam
+POST, para que crawler, prefetch ou health check não disparem refresh::
+
+    curl -X POST 'http://127.0.0.1:8765/refresh'
+
+Erros voltam como ``{"error": ..., "message": ...}``: 404 para banco ou
+rota inexistente, 405 para método errado, 400 para parâmetro inválido,
+500 para o resto.
+"""
+import argparse
+import json
+import sys
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from soma_dashboard import payloads
+from soma_dashboard.backend import create_backend
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+def _timestamp(value):
+    return pd.Timestamp(value)
+
+
+def _timedelta(value):
+    return pd.Timedelta(seconds=float(value))
+
+
+def _bool(value):
+    return value.lower() in ('1', 'true', 'yes', 'sim')
+
+
+def _json(value):
+    return payloads.decode(json.loads(value))
+
+
+# Conversores dos parâmetros: tipo -> (texto -> valor, valor -> texto)
+PARAM_TYPES = {
+    'str': (str, str),
+    'int': (int, str),
+    'bool': (_bool, lambda value: 'true' if value else 'false'),
+    'list': (None, None),    # parâmetro repetido: ?users=a&users=b
+    'timestamp': (_timestamp, lambda value: pd.Timestamp(value).isoformat()),
+    'timedelta': (_timedelta, lambda value: str(pd.Timedelta(value).total_seconds())),
+    'json': (_json, lambda value: json.dumps(payloads.encode(value))),
+}
+
+# caminho -> (método do backend, {parâmetro: tipo}, obrigatórios)
+ROUTES = {
+    '/poll': ('poll', {}, ()),
+    '/refresh': ('refresh', {}, ()),
+    '/recent': ('recent', {'table': 'str', 'limit': 'int', 'users': 'list', 'periods': 'list'}, ('table',)),
+    '/row-count': ('row_count', {'table': 'str'}, ('table',)),
+    '/replicas': ('replicas', {}, ()),
+    '/operation-stats': ('operation_stats', {'exact': 'bool'}, ()),
+    '/distinct': ('distinct_count', {'table': 'str', 'column': 'str', 'since': 'timestamp', 'until': 'timestamp',
+                                     'exact': 'bool'}, ('table', 'column')),
+    '/latency': ('latency', {'table': 'str'}, ('table',)),
+    '/latency/users': ('user_percentiles', {}, ()),
+    '/latency/slowest': ('top_slowest', {'table': 'str'}, ()),
+    '/latency/over-time': ('percentiles_over_time', {'table': 'str', 'freq': 'str'}, ()),
+    '/memory': ('memory', {'table': 'str'}, ('table',)),
+    '/summary': ('summary', {}, ()),
+    '/history': ('history', {'source': 'str', 'granularity': 'str'}, ('source',)),
+    '/window': ('execution_window', {'since': 'timestamp', 'until': 'timestamp', 'max_points': 'int'},
+                ('since', 'until')),
+    '/logs/page': ('logs_page', {'users': 'list', 'periods': 'list', 'since': 'timestamp',
+                                 'until': 'timestamp', 'cursor': 'json', 'page_size': 'int'}, ()),
+    '/logs/detail': ('log_detail', {'log_id': 'str'}, ('log_id',)),
+    '/traces': ('trace', {'key': 'str'}, ('key',)),
+    '/traces/recent': ('recent_traces', {'n': 'int'}, ()),
+    '/traces/counts': ('trace_counts', {}, ()),
+    '/anomalies': ('anomalies', {'window': 'timedelta'}, ()),
+}
+
+# Rotas que mudam estado: só por POST
+ACTIONS = {'/refresh'}
+
+
+def parse_params(query, spec, required=()):
+    """Query string -> kwargs do método, conforme ``spec``."""
+    raw = parse_qs(query, keep_blank_values=True)
+    unknown = set(raw) - set(spec)
+    if unknown:
+        raise ValueError(f"Parâmetro(s) desconhecido(s): {', '.join(sorted(unknown))}")
+    missing = [name for name in required if name not in raw]
+    if missing:
+        raise ValueError(f"Parâmetro(s) obrigatório(s): {', '.join(missing)}")
+
+    params = {}
+    for name, values in raw.items():
+        kind = spec[name]
+        if kind == 'list':
+            params[name] = [value for value in values if value != '']
+        else:
+            params[name] = PARAM_TYPES[kind][0](values[-1])
+    return params
+
+
+def encode_params(spec, params):
+    """kwargs -> pares da query string (inverso de ``parse_params``); None é omitido."""
+    pairs = []
+    for name, value in params.items():
+        if value is None:
+            continue
+        kind = spec[name]
+        if kind == 'list':
+            # Lista vazia ainda é um filtro (nenhum valor): vai como parâmetro em branco
+            pairs += [(name, str(item)) for item in value] or [(name, '')]
+        else:
+            pairs.append((name, PARAM_TYPES[kind][1](value)))
+    return pairs
+
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'SomaDashboardService/1.0'
+    # Cabeçalho e corpo saem em writes separados: sem isso o keep-alive espera o ACK atrasado (~40 ms)
+    disable_nagle_algorithm = True
+
+    @property
+    def backend(self):
+        return self.server.backend
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            replicas = self.backend.replicas()
+            self._send_json(HTTPStatus.OK, {'status': 'ok', 'db_path': self.backend.db_path,
+                                            'db_exists': all(replicas.values()), 'replicas': replicas})
+            return
+        if url.path in ACTIONS:
+            self._send_method_not_allowed('POST', url.path)
+            return
+        self._dispatch(url)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path in ROUTES and url.path not in ACTIONS:
+            self._send_method_not_allowed('GET', url.path)
+            return
+        self._dispatch(url)
+
+    def _dispatch(self, url):
+        route = ROUTES.get(url.path)
+        if route is None:
+            self._send_error(HTTPStatus.NOT_FOUND, 'NotFound', f"Rota desconhecida: {url.path}")
+            return
+
+        method, spec, required = route
+        try:
+            params = parse_params(url.query, spec, required)
+            result = getattr(self.backend, method)(**params)
+        except FileNotFoundError as e:
+            self._send_error(HTTPStatus.NOT_FOUND, type(e).__name__, str(e))
+            return
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, type(e).__name__, str(e))
+            return
+        except Exception as e:
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, type(e).__name__, str(e))
+            return
+
+        accepts_arrow = payloads.ARROW_CONTENT_TYPE in self.headers.get('Accept', '')
+        if isinstance(result, pd.DataFrame) and accepts_arrow and payloads.arrow_available():
+            self._send(HTTPStatus.OK, payloads.ARROW_CONTENT_TYPE, payloads.frame_to_arrow(result))
+        else:
+            self._send(HTTPStatus.OK, payloads.JSON_CONTENT_TYPE, payloads.dumps(result))
+
+    def _send(self, status, content_type, body, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, value):
+        self._send(status, payloads.JSON_CONTENT_TYPE, payloads.dumps(value))
+
+    def _send_error(self, status, error, message, headers=()):
+        self._send(status, payloads.JSON_CONTENT_TYPE, payloads.dumps({'error': error, 'message': message}), headers)
+
+    def _send_method_not_allowed(self, allowed, path):
+        self._send_error(HTTPStatus.METHOD_NOT_ALLOWED, 'MethodNotAllowed',
+                         f"{path} só aceita {allowed}", headers=[('Allow', allowed)])
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class DashboardService(ThreadingHTTPServer):
+    """``ThreadingHTTPServer`` com o backend compartilhado entre as requisições."""
+
+    daemon_threads = True
+
+    def __init__(self, backend, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+        self.backend = backend
+        self.verbose = verbose
+        super().__init__((host, port), DashboardRequestHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP com os dados dos painéis da Soma API")
+    parser.add_argument('db_paths', nargs='+', metavar='db_path',
+                        help="soma_logs.db ou glob; mais de um banco = leitura federada das réplicas")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--snapshot-dir', default=None,
+                        help="diretório dos snapshots Arrow dos stores (padrão: dashboard_snapshots ao lado do banco; "
+                             "com várias réplicas, uma subpasta por réplica)")
+    parser.add_argument('--refresh-interval', type=float, default=5)
+    parser.add_argument('--verbose', action='store_true', help="loga cada requisição")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(args.db_paths, args.snapshot_dir, refresh_interval=args.refresh_interval)
+    service = DashboardService(backend, args.host, args.port, verbose=args.verbose)
+    print(f"Servindo {', '.join(backend.replicas())} em {service.url}")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+        backend.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,486 @@
+"""Sketches de quantis para ``execution_time_ms`` e de contagem de distintos.
+
+``DDSketch`` guarda contagens em buckets logarítmicos com erro relativo
+garantido: p50/p95/p99 saem de algumas dezenas de contadores em vez de
+ordenar a coluna inteira, e dois sketches se juntam somando contadores —
+por isso dá para ter um sketch por bucket de tempo e por usuário e
+combiná-los em qualquer janela.
+
+``HyperLogLog`` faz o mesmo para "quantos valores distintos": ``2**precision``
+registradores de um byte, erro típico ``1.04 / sqrt(2**precision)`` (~1,6%
+com o padrão), e a junção de dois sketches é o máximo de cada registrador.
+
+``LatencyTracker`` e ``DistinctTracker`` mantêm esses sketches atualizados
+a partir dos deltas entregues pelo ``LogStore``.
+"""
+import base64
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+# Percentis exibidos nos painéis
+PERCENTILES = {
+    'p50': 0.50,
+    'p90': 0.90,
+    'p95': 0.95,
+    'p99': 0.99,
+}
+
+# 4096 registradores (4 KB) por sketch de distintos
+DEFAULT_PRECISION = 12
+
+
+class DDSketch:
+    """Sketch de quantis com erro relativo ``relative_accuracy`` (valores >= 0)."""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.add_many([value])
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.sum_sq += float(np.square(values).sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        # Tempos de 0 ms (comuns na Soma API) ficam num contador à parte
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if len(positive) == 0:
+            return
+
+        keys, counts = np.unique(
+            np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+            return_counts=True,
+        )
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Não é possível juntar sketches com precisões diferentes")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def copy(self):
+        return DDSketch(self.relative_accuracy).merge(self)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else math.nan
+
+    @property
+    def std(self):
+        # Desvio padrão amostral (mesmo ddof=1 do pandas)
+        if self.count < 2:
+            return math.nan
+        variance = (self.sum_sq - self.sum * self.sum / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def _bin_value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantiles(self, qs):
+        """Estimativa de vários quantis numa única passada pelos buckets."""
+        if self.count == 0:
+            return [math.nan for _ in qs]
+
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        results = [math.nan] * len(qs)
+        keys = iter(sorted(self.bins))
+        running = self.zero_count
+        value = 0.0
+
+        for i in order:
+            rank = qs[i] * (self.count - 1)
+            while running <= rank:
+                key = next(keys, None)
+                if key is None:
+                    value = self.max
+                    break
+                running += self.bins[key]
+                value = self._bin_value(key)
+            results[i] = min(max(value, self.min), self.max)
+        return results
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def percentiles(self):
+        return dict(zip(PERCENTILES, self.quantiles(list(PERCENTILES.values()))))
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(k): v for k, v in self.bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'sum_sq': self.sum_sq,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(k): v for k, v in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        sketch.sum_sq = data['sum_sq']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+def _fold_buckets(fine, coarse, cutoff, coarse_bucket):
+    """Junta os sketches de ``fine`` anteriores a ``cutoff`` no bucket grosso da sua hora."""
+    for bucket in [bucket for bucket in fine if bucket < cutoff]:
+        key = pd.Timestamp(bucket).floor(coarse_bucket)
+        sketch = fine.pop(bucket)
+        if key in coarse:
+            coarse[key].merge(sketch)
+        else:
+            coarse[key] = sketch
+
+
+class LatencyTracker:
+    """Sketches de latência por bucket de tempo e por usuário.
+
+    Registre ``update`` como listener de um ``LogStore``: cada delta é
+    agregado em lote (um ``add_many`` por grupo). ``top_k`` mantém as
+    operações mais lentas sem precisar de ``nlargest`` no histórico todo.
+
+    Os buckets de ``bucket`` mais antigos que ``fine_horizon`` são
+    juntados em buckets de ``coarse_bucket``, e um delta que recomeça na
+    posição 0 (store recriado) zera os sketches.
+    """
+
+    def __init__(self, value_column='execution_time_ms', user_column=None,
+                 bucket='1min', relative_accuracy=0.01, top_k=5,
+                 coarse_bucket='1h', fine_horizon=pd.Timedelta(hours=24)):
+        self.value_column = value_column
+        self.user_column = user_column
+        self.bucket = bucket
+        self.relative_accuracy = relative_accuracy
+        self.top_k = top_k
+        self.coarse_bucket = coarse_bucket
+        self.fine_horizon = fine_horizon
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.total = DDSketch(self.relative_accuracy)
+        self.by_user = {}
+        self.by_bucket = {}
+        self.by_coarse_bucket = {}
+        self.slowest = None
+        self.latest = None
+        self.rows_seen = 0
+
+    @classmethod
+    def merged(cls, trackers):
+        """Novo tracker com os sketches de todos (ex.: um por réplica), para leitura."""
+        trackers = list(trackers)
+        first = trackers[0]
+        merged = cls(first.value_column, first.user_column, first.bucket,
+                     first.relative_accuracy, first.top_k, first.coarse_bucket, first.fine_horizon)
+        slowest = []
+        for tracker in trackers:
+            with tracker._lock:
+                merged.total.merge(tracker.total)
+                for target, source in ((merged.by_user, tracker.by_user),
+                                       (merged.by_bucket, tracker.by_bucket),
+                                       (merged.by_coarse_bucket, tracker.by_coarse_bucket)):
+                    for key, sketch in source.items():
+                        if key in target:
+                            target[key].merge(sketch)
+                        else:
+                            target[key] = sketch.copy()
+                if tracker.slowest is not None:
+                    slowest.append(tracker.slowest)
+                if tracker.latest is not None and (merged.latest is None or tracker.latest > merged.latest):
+                    merged.latest = tracker.latest
+                merged.rows_seen += tracker.rows_seen
+        if slowest and merged.top_k:
+            merged.slowest = pd.concat(slowest).nlargest(merged.top_k, merged.value_column)
+        return merged
+
+    def update(self, delta):
+        if delta.empty:
+            return
+        values = delta[self.value_column]
+        buckets = delta['timestamp'].dt.floor(self.bucket)
+
+        with self._lock:
+            if delta.index[0] == 0 and self.rows_seen:
+                # Store recomeçou (banco recriado)
+                self.reset()
+            self.rows_seen += len(delta)
+            self.total.add_many(values.to_numpy())
+
+            for bucket, group in values.groupby(buckets):
+                self.by_bucket.setdefault(bucket, DDSketch(self.relative_accuracy)).add_many(group.to_numpy())
+
+            if self.user_column:
+                for user, group in values.groupby(delta[self.user_column], observed=True):
+                    self.by_user.setdefault(user, DDSketch(self.relative_accuracy)).add_many(group.to_numpy())
+
+            if self.top_k:
+                candidates = delta.nlargest(self.top_k, self.value_column)
+                if self.slowest is not None:
+                    candidates = pd.concat([self.slowest, candidates])
+                self.slowest = candidates.nlargest(self.top_k, self.value_column)
+
+            latest = delta['timestamp'].max()
+            if self.latest is None or latest > self.latest:
+                self.latest = latest
+            cutoff = (self.latest - self.fine_horizon).floor(self.coarse_bucket)
+            _fold_buckets(self.by_bucket, self.by_coarse_bucket, cutoff, self.coarse_bucket)
+
+    def percentiles(self, user=None):
+        with self._lock:
+            sketch = self.total if user is None else self.by_user.get(user)
+            if sketch is None:
+                return {name: math.nan for name in PERCENTILES}
+            return sketch.percentiles()
+
+    def user_percentiles(self):
+        """DataFrame usuário x p50/p90/p95/p99."""
+        with self._lock:
+            rows = {user: sketch.percentiles() for user, sketch in self.by_user.items()}
+        return pd.DataFrame.from_dict(rows, orient='index', columns=list(PERCENTILES))
+
+    def over_time(self, freq='h', since=None):
+        """Percentis por janela ``freq``, juntando os sketches de cada bucket.
+
+        Janelas menores que ``coarse_bucket`` só existem no ``fine_horizon``
+        mais recente.
+        """
+        with self._lock:
+            sources = [self.by_bucket]
+            if to_offset(freq).nanos >= to_offset(self.coarse_bucket).nanos:
+                sources.append(self.by_coarse_bucket)
+            merged = {}
+            for bucket, sketch in ((bucket, sketch) for source in sources for bucket, sketch in source.items()):
+                if since is not None and bucket < since:
+                    continue
+                window = bucket.floor(freq)
+                if window in merged:
+                    merged[window].merge(sketch)
+                else:
+                    merged[window] = sketch.copy()
+
+        rows = {window: dict(sketch.percentiles(), operations=sketch.count)
+                for window, sketch in merged.items()}
+        df = pd.DataFrame.from_dict(rows, orient='index', columns=list(PERCENTILES) + ['operations'])
+        return df.sort_index()
+
+    def top_slowest(self):
+        with self._lock:
+            return self.slowest.copy() if self.slowest is not None else pd.DataFrame()
+
+
+def hash_values(values):
+    """Hash de 64 bits de cada valor não nulo (o mesmo em todos os processos)."""
+    values = pd.Series(values)
+    values = values[values.notna()]
+    return pd.util.hash_pandas_object(values.astype(object), index=False).to_numpy()
+
+
+class HyperLogLog:
+    """Contagem aproximada de valores distintos em memória fixa."""
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision deve estar entre 4 e 16")
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add(self, value):
+        self.add_many([value])
+
+    def add_many(self, values):
+        self.add_hashes(hash_values(values))
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        # Primeiros bits escolhem o registrador; o resto guarda a posição do primeiro bit 1
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = hashes << np.uint64(self.precision)
+        max_rank = 64 - self.precision + 1
+        with np.errstate(divide='ignore'):
+            rank = 64 - np.floor(np.log2(rest.astype(float)))
+        rank = np.where(rest == 0, max_rank, np.clip(rank, 1, max_rank)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Não é possível juntar sketches com precisões diferentes")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        return HyperLogLog(self.precision).merge(self)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Poucos valores: contagem linear pelos registradores vazios (quase exata)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_dict(self):
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(self.registers.tobytes()).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['precision'])
+        sketch.registers = np.frombuffer(base64.b64decode(data['registers']), dtype=np.uint8).copy()
+        return sketch
+
+
+class DistinctTracker:
+    """``HyperLogLog`` por coluna e por bucket de tempo.
+
+    Buckets de ``bucket`` (1 min) para os dados recentes; os mais antigos
+    que ``fine_horizon`` (contado a partir do último timestamp visto) são
+    juntados em buckets de ``coarse_bucket`` (1 h). A memória cresce com as
+    horas de histórico, não com as linhas nem com os valores distintos.
+    Um delta que recomeça na posição 0 (store recriado) zera os sketches.
+    """
+
+    def __init__(self, columns, bucket='1min', coarse_bucket='1h',
+                 fine_horizon=pd.Timedelta(hours=2), precision=DEFAULT_PRECISION):
+        self.columns = tuple(columns)
+        self.bucket = bucket
+        self.coarse_bucket = coarse_bucket
+        self.fine_horizon = fine_horizon
+        self.precision = precision
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.total = {column: HyperLogLog(self.precision) for column in self.columns}
+        self.fine = {column: {} for column in self.columns}
+        self.coarse = {column: {} for column in self.columns}
+        self.latest = None
+        self.rows_seen = 0
+
+    @classmethod
+    def merged(cls, trackers):
+        """Novo tracker com os sketches de todos (ex.: um por réplica), para leitura."""
+        trackers = list(trackers)
+        first = trackers[0]
+        merged = cls(first.columns, first.bucket, first.coarse_bucket, first.fine_horizon, first.precision)
+        for tracker in trackers:
+            with tracker._lock:
+                for column in merged.columns:
+                    merged.total[column].merge(tracker.total[column])
+                    for target, source in ((merged.fine, tracker.fine), (merged.coarse, tracker.coarse)):
+                        for key, sketch in source[column].items():
+                            if key in target[column]:
+                                target[column][key].merge(sketch)
+                            else:
+                                target[column][key] = sketch.copy()
+                if tracker.latest is not None and (merged.latest is None or tracker.latest > merged.latest):
+                    merged.latest = tracker.latest
+                merged.rows_seen += tracker.rows_seen
+        return merged
+
+    def update(self, delta):
+        if delta.empty:
+            return
+        timestamps = delta['timestamp']
+
+        with self._lock:
+            if delta.index[0] == 0 and self.rows_seen:
+                # Store recomeçou (banco recriado): registradores antigos inflariam as contagens
+                self.reset()
+            self.rows_seen += len(delta)
+            for column in self.columns:
+                values = delta[column]
+                valid = values.notna().to_numpy()
+                hashes = hash_values(values)
+                self.total[column].add_hashes(hashes)
+                # Um add_hashes por bucket, com os hashes já calculados
+                buckets = timestamps[valid].dt.floor(self.bucket).to_numpy()
+                for bucket, positions in pd.Series(hashes).groupby(buckets).indices.items():
+                    sketch = self.fine[column].get(bucket)
+                    if sketch is None:
+                        sketch = self.fine[column][bucket] = HyperLogLog(self.precision)
+                    sketch.add_hashes(hashes[positions])
+
+            latest = timestamps.max()
+            if self.latest is None or latest > self.latest:
+                self.latest = latest
+            self._fold()
+
+    def _fold(self):
+        # Buckets finos fora do horizonte viram parte do bucket grosso da sua hora
+        cutoff = (self.latest - self.fine_horizon).floor(self.coarse_bucket)
+        for column in self.columns:
+            _fold_buckets(self.fine[column], self.coarse[column], cutoff, self.coarse_bucket)
+
+    def sketch(self, column, since=None, until=None):
+        """``HyperLogLog`` de ``column`` em ``[since, until)``.
+
+        A janela é arredondada para fora até os buckets que ela toca: 1 min
+        nos dados recentes, 1 h nos mais antigos.
+        """
+        if column not in self.total:
+            raise ValueError(f"Coluna sem contagem de distintos: {column}")
+        with self._lock:
+            if since is None and until is None:
+                return self.total[column].copy()
+            merged = HyperLogLog(self.precision)
+            for buckets, width in ((self.fine[column], pd.Timedelta(self.bucket)),
+                                   (self.coarse[column], pd.Timedelta(self.coarse_bucket))):
+                for bucket, sketch in buckets.items():
+                    if (since is None or bucket + width > since) and (until is None or bucket < until):
+                        merged.merge(sketch)
+            return merged
+
+    def count(self, column, since=None, until=None):
+        return self.sketch(column, since, until).count()
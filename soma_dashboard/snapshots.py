@@ -0,0 +1,158 @@
+"""Snapshots colunares (Arrow IPC) dos stores para um cold start rápido.
+
+Quando o servidor do Streamlit reinicia, reler ``operations`` e
+``business_logs`` inteiros pelo ``pd.read_sql_query`` e reconverter os
+timestamps custa proporcional ao histórico todo. O ``SnapshotManager``
+grava periodicamente o conteúdo de cada ``LogStore`` num arquivo Arrow
+tipado (as colunas categóricas do ``TableSchema`` — ``user_id``,
+``day_period``, ``status``... — como dicionário, ``timestamp`` como
+datetime nativo) junto com o
+watermark; na inicialização o arquivo é lido de uma vez, sem parse de
+texto nem conversão de tipos, e o store só busca no SQLite as linhas
+depois do watermark. As colunas são copiadas para os buffers do store
+(não ficam mapeadas do arquivo).
+
+A validação do snapshot contra o banco também não depende do tamanho do
+histórico: só buscas pela chave primária (``_matches_database``).
+
+``pyarrow`` é opcional: sem ele os snapshots ficam desativados e o store
+carrega tudo do SQLite como antes.
+"""
+import json
+import os
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+
+from soma_dashboard.pool import read_connection
+
+METADATA_KEY = b'soma_dashboard'
+SNAPSHOT_VERSION = 3
+
+# Colunas que identificam uma linha nas duas tabelas (``id`` é a chave primária)
+IDENTITY_COLUMNS = ['id', 'trace_id']
+
+
+class SnapshotManager:
+    """Grava e restaura snapshots dos stores em ``directory``.
+
+    Um snapshot novo só é gravado quando chegaram ``min_new_rows`` linhas
+    desde o último, ou quando passou ``min_interval`` segundos com alguma
+    linha nova — a gravação roda na thread do ``DataRefresher``.
+    """
+
+    def __init__(self, directory, min_new_rows=10_000, min_interval=300):
+        self.directory = directory
+        self.min_new_rows = min_new_rows
+        self.min_interval = min_interval
+        self._saved = {}  # tabela -> (last_id, linhas, instante)
+
+    @property
+    def available(self):
+        return pa is not None
+
+    def path_for(self, store):
+        return os.path.join(self.directory, f"{store.table}.arrow")
+
+    def restore(self, store):
+        """Carrega o snapshot no store; retorna quantas linhas vieram do arquivo."""
+        path = self.path_for(store)
+        if not self.available or not os.path.exists(path):
+            return 0
+
+        try:
+            with pa.memory_map(path, 'r') as source:
+                table = ipc.open_file(source).read_all()
+                metadata = json.loads(table.schema.metadata[METADATA_KEY])
+
+                if (metadata.get('version') != SNAPSHOT_VERSION
+                        or metadata.get('columns') != store.columns
+                        or metadata.get('key') != store.key
+                        or not self._matches_database(store, metadata)):
+                    return 0
+
+                frame = table.to_pandas()
+        except Exception:
+            # Snapshot corrompido, de outra versão ou banco inacessível: recarrega do SQLite
+            return 0
+
+        store.restore(frame, metadata['last_id'])
+        self._saved[store.table] = (metadata['last_id'], len(frame), time.monotonic())
+        return len(frame)
+
+    def _matches_database(self, store, metadata):
+        # Três buscas pela chave primária, qualquer que seja o tamanho da tabela
+        columns = ', '.join(IDENTITY_COLUMNS)
+        with read_connection(store.db_path) as conn:
+            max_id = conn.execute(f"SELECT MAX({store.key}) FROM {store.table}").fetchone()[0] or 0
+            if max_id < metadata['last_id']:
+                # Banco recriado (ids voltaram para trás)
+                return False
+            # Banco recriado que já passou do watermark: outra linha na mesma chave
+            last = conn.execute(
+                f"SELECT {columns} FROM {store.table} WHERE {store.key} = ?", (metadata['last_id'],)
+            ).fetchone()
+            # O soma_dashboard.retention arquiva a partir do timestamp mais antigo: se a linha
+            # mais antiga do snapshot saiu do banco, o snapshot ainda teria as arquivadas
+            oldest = conn.execute(
+                f"SELECT {columns} FROM {store.table} WHERE id = ?", (metadata['oldest'][0],)
+            ).fetchone()
+        return (last is not None and list(last) == metadata['last']
+                and oldest is not None and list(oldest) == metadata['oldest'])
+
+    def maybe_save(self, store):
+        if not self.available:
+            return False
+        saved_id, saved_rows, saved_at = self._saved.get(store.table, (0, 0, 0.0))
+        if store.last_id == saved_id:
+            return False
+        new_rows = len(store) - saved_rows
+        if new_rows < self.min_new_rows and time.monotonic() - saved_at < self.min_interval:
+            return False
+        return self.save(store)
+
+    def save(self, store):
+        if not self.available:
+            return False
+        frame, last_id = store.export()
+        if frame.empty:
+            return False
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        metadata = {
+            'version': SNAPSHOT_VERSION,
+            'table': store.table,
+            'key': store.key,
+            'columns': store.columns,
+            'last_id': last_id,
+            'last': _identity(frame, len(frame) - 1),
+            'oldest': _identity(frame, int(frame['timestamp'].argmin())),
+        }
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            METADATA_KEY: json.dumps(metadata).encode(),
+        })
+
+        # Grava num temporário e troca atomicamente: leitores nunca veem arquivo pela metade
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(store)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+        self._saved[store.table] = (last_id, len(frame), time.monotonic())
+        return True
+
+
+def _identity(frame, position):
+    # Valores de ``IDENTITY_COLUMNS`` como o sqlite3 os devolve (JSON: tipos nativos, nulo = None)
+    row = frame[IDENTITY_COLUMNS].iloc[position]
+    return [None if pd.isna(value) else value.item() if hasattr(value, 'item') else value for value in row]
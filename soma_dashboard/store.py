@@ -0,0 +1,290 @@
+"""Armazenamento incremental das tabelas do soma_logs.db.
+
+A Soma API só acrescenta linhas, então em vez de reler a tabela inteira a
+cada atualização o ``LogStore`` guarda o último ``id`` visto (watermark),
+busca apenas ``WHERE id > ?`` e anexa o delta em buffers colunares
+pré-alocados que vivem no processo do Streamlit. Cada delta é convertido
+uma única vez pelo ``TableSchema`` da tabela (ver ``soma_dashboard.schema``);
+colunas categóricas ficam guardadas como códigos inteiros.
+"""
+import logging
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from soma_dashboard.pool import read_connection
+
+logger = logging.getLogger(__name__)
+
+# Colunas lidas de cada tabela (mesma ordem usada pelos painéis)
+OPERATION_COLUMNS = [
+    'id',
+    'timestamp',
+    'operation_type',
+    'input_a',
+    'input_b',
+    'result',
+    'execution_time_ms',
+    'trace_id',
+    'span_id',
+]
+
+BUSINESS_LOG_COLUMNS = [
+    'id',
+    'operation_id',
+    'user_id',
+    'timestamp',
+    'hour_of_day',
+    'day_period',
+    'operation_type',
+    'input_values',
+    'result_value',
+    'execution_time_ms',
+    'trace_id',
+    'ip_address',
+    'status',
+    'message',
+]
+
+
+class LogStore:
+    """Cópia em memória de uma tabela append-only, atualizada por deltas.
+
+    ``key`` é a coluna monotônica usada como watermark: ``id`` em
+    ``business_logs`` (AUTOINCREMENT) e ``rowid`` em ``operations``, cujo
+    ``id`` é um UUID em texto.
+
+    Listeners registrados com ``add_listener`` recebem cada delta (em ordem
+    de inserção) logo após ele ser anexado, para manter estruturas derivadas
+    — sketches, índices — sem reler a tabela. O índice do delta são as
+    posições das linhas no store, que ``take`` aceita de volta; um delta
+    começando em 0 depois de outros indica que o store recomeçou.
+
+    Um listener que falha não impede os demais de receber o delta: o erro
+    vai para o log e, no refresh seguinte, ele recebe o store inteiro a
+    partir da posição 0 (recomeça do zero em vez de ficar sem as linhas).
+    """
+
+    def __init__(self, db_path, table, schema, key='rowid', initial_capacity=1024):
+        self.db_path = db_path
+        self.table = table
+        self.schema = schema
+        self.columns = schema.columns
+        self.key = key
+        self.initial_capacity = initial_capacity
+        self._categorical = set(schema.categorical_columns)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._stale_listeners = []
+        self._reset()
+
+    def _reset(self):
+        self._buffers = {}
+        self._categories = {name: [] for name in self._categorical}
+        self._category_codes = {name: {} for name in self._categorical}
+        self._capacity = 0
+        self._size = 0
+        self.last_id = 0
+
+    def __len__(self):
+        return self._size
+
+    def delta_query(self):
+        """Linhas depois do watermark (parâmetro: ``last_id``)."""
+        return f"""
+        SELECT
+            {self.key} AS _key,
+            {', '.join(self.schema.source_columns)}
+        FROM {self.table}
+        WHERE {self.key} > ?
+        ORDER BY {self.key}
+        """
+
+    def refresh(self):
+        """Busca as linhas novas desde o watermark e retorna quantas chegaram."""
+        with self._lock:
+            self._replay_stale()
+            with read_connection(self.db_path) as conn:
+                max_id = conn.execute(
+                    f"SELECT MAX({self.key}) FROM {self.table}"
+                ).fetchone()[0] or 0
+
+                # Banco recriado ou truncado: recomeça do zero
+                if max_id < self.last_id:
+                    self._reset()
+                    # O próximo delta já começa em 0: quem estava pendente recomeça por ele
+                    self._stale_listeners.clear()
+
+                if max_id == self.last_id:
+                    return 0
+
+                delta = pd.read_sql_query(self.delta_query(), conn, params=(self.last_id,))
+
+            if delta.empty:
+                return 0
+
+            start = self._size
+            self._append(self.schema.transform(delta))
+            self.last_id = int(delta['_key'].iloc[-1])
+
+            if self._listeners:
+                new_rows = self._slice(start, self._size)
+                for listener in self._listeners:
+                    if listener not in self._stale_listeners:
+                        self._notify(listener, new_rows)
+            return len(delta)
+
+    def _notify(self, listener, rows):
+        try:
+            listener(rows)
+        except Exception:
+            logger.exception("Listener %r falhou no delta de %s (posições %d-%d); será refeito do zero",
+                             listener, self.table, rows.index[0], rows.index[-1] + 1)
+            if listener not in self._stale_listeners:
+                self._stale_listeners.append(listener)
+            return False
+        return True
+
+    def _replay_stale(self):
+        # Listeners que perderam um delta recebem tudo de novo desde a posição 0 (sinal de recomeço)
+        for listener in list(self._stale_listeners):
+            if not self._size or self._notify(listener, self._slice(0, self._size)):
+                self._stale_listeners.remove(listener)
+
+    def add_listener(self, listener, replay=True):
+        """Registra ``listener(delta_df)``; com ``replay`` recebe já o que foi carregado."""
+        with self._lock:
+            self._listeners.append(listener)
+            if replay and self._size:
+                self._notify(listener, self._slice(0, self._size))
+
+    def export(self):
+        """``(frame em ordem de inserção, last_id)`` consistentes entre si."""
+        with self._lock:
+            return self._slice(0, self._size), self.last_id
+
+    def restore(self, frame, last_id):
+        """Recarrega o store a partir de um snapshot; o próximo refresh busca só ``id > last_id``.
+
+        Deve ser chamado antes de registrar listeners (eles recebem o
+        conteúdo restaurado no replay do ``add_listener``).
+        """
+        with self._lock:
+            self._reset()
+            if len(frame):
+                self._append(frame)
+            self.last_id = last_id
+
+    def _append(self, typed):
+        n = len(typed)
+        needed = self._size + n
+
+        if needed > self._capacity:
+            self._grow(max(needed, self._capacity * 2, self.initial_capacity))
+
+        for name in self.columns:
+            if name in self._categorical:
+                values = self._encode(name, typed[name])
+            else:
+                values = typed[name].to_numpy()
+
+            buffer = self._buffers.get(name)
+            if buffer is None:
+                buffer = np.empty(self._capacity, dtype=values.dtype)
+            elif not np.can_cast(values.dtype, buffer.dtype, casting='same_kind'):
+                # Ex.: coluna inteira que recebeu NULL vira float/object
+                buffer = buffer.astype(np.result_type(buffer.dtype, values.dtype))
+            buffer[self._size:needed] = values
+            self._buffers[name] = buffer
+
+        self._size = needed
+
+    def _encode(self, name, series):
+        # Traduz os códigos locais do delta para os códigos globais da coluna
+        local = series.astype('category').cat
+        lookup = self._category_codes[name]
+        categories = self._categories[name]
+
+        mapping = np.empty(len(local.categories), dtype=np.int32)
+        for i, value in enumerate(local.categories):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(categories)
+                categories.append(value)
+            mapping[i] = code
+
+        codes = local.codes.to_numpy()
+        if len(mapping) == 0:
+            return np.full(len(codes), -1, dtype=np.int32)
+        return np.where(codes >= 0, mapping[codes], -1).astype(np.int32)
+
+    def _column(self, name, values):
+        if name in self._categorical:
+            return pd.Categorical.from_codes(values, categories=self._categories[name])
+        if values.dtype == object:
+            # dtype explícito: sem isso o pandas 3 converte (e copia) para ``str``
+            return pd.Series(values, dtype=object, copy=False)
+        return values
+
+    def _grow(self, capacity):
+        for name, buffer in self._buffers.items():
+            grown = np.empty(capacity, dtype=buffer.dtype)
+            grown[:self._size] = buffer[:self._size]
+            self._buffers[name] = grown
+        self._capacity = capacity
+
+    def _slice(self, start, stop):
+        # Linhas [start, stop) em ordem de inserção, indexadas pela posição no store
+        frame = pd.DataFrame(
+            {name: self._column(name, self._buffers[name][start:stop]) for name in self.columns},
+            copy=False,
+        )
+        # Índice atribuído depois: as colunas object vêm como Series e seriam realinhadas
+        frame.index = pd.RangeIndex(start, stop)
+        return frame
+
+    def take(self, positions):
+        """Linhas nas posições dadas (índice dos deltas), na ordem pedida."""
+        with self._lock:
+            positions = np.asarray(positions, dtype=np.intp)
+            # Posições de antes de um recomeço do store podem ter ficado para trás
+            positions = positions[(positions >= 0) & (positions < self._size)]
+            frame = pd.DataFrame(
+                {name: self._column(name, self._buffers[name][positions]) for name in self.columns}
+            )
+        frame.index = pd.Index(positions)
+        return frame
+
+    def frame(self):
+        """DataFrame com as linhas carregadas, mais recentes primeiro.
+
+        As linhas chegam em ordem de ``key``, que acompanha a ordem de
+        inserção; invertê-las equivale ao ``ORDER BY timestamp DESC`` que
+        os painéis usavam.
+        """
+        with self._lock:
+            if self._size == 0:
+                return pd.DataFrame(columns=self.columns)
+            data = {
+                name: self._column(name, self._buffers[name][:self._size][::-1])
+                for name in self.columns
+            }
+        return pd.DataFrame(data, copy=False)
+
+    def memory_usage(self):
+        """Bytes ocupados pelas linhas carregadas (buffers + objetos ``str``)."""
+        with self._lock:
+            total = 0
+            for buffer in self._buffers.values():
+                loaded = buffer[:self._size]
+                total += loaded.nbytes
+                if loaded.dtype == object:
+                    total += sum(map(sys.getsizeof, loaded))
+            for categories in self._categories.values():
+                total += sum(map(sys.getsizeof, categories))
+            return total
+
+    def memory_per_row(self):
+        return self.memory_usage() / self._size if self._size else 0.0
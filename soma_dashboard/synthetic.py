@@ -0,0 +1,205 @@
+"""Gerador de um soma_logs.db sintético para benchmarks e testes de carga.
+
+Cria ``operations`` e ``business_logs`` com o mesmo DDL do
+``LoggingService.createTables`` e preenche as duas tabelas como a Soma API
+faria: uma linha em cada por requisição, ligadas por ``operation_id`` e
+``trace_id``, em ordem cronológica. A atividade é realista o bastante para
+exercitar os painéis: muitos usuários com atividade concentrada em poucos
+(distribuição de Zipf), curva diária com pico à tarde passando por todos os
+``day_period`` e tempos de execução quase sempre de 0–2 ms com cauda longa.
+
+Uso::
+
+    python -m soma_dashboard.synthetic /tmp/soma_logs.db --rows 1000000
+"""
+import argparse
+import os
+import sqlite3
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Mesmo DDL do LoggingService.createTables
+CREATE_OPERATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS operations (
+        id TEXT PRIMARY KEY,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        operation_type TEXT,
+        input_a INTEGER,
+        input_b INTEGER,
+        result INTEGER,
+        execution_time_ms BIGINT,
+        trace_id TEXT,
+        span_id TEXT
+    )
+"""
+
+CREATE_BUSINESS_LOGS_TABLE = """
+    CREATE TABLE IF NOT EXISTS business_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        operation_id TEXT,
+        user_id TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        hour_of_day INTEGER,
+        day_period TEXT,
+        operation_type TEXT,
+        input_values TEXT,
+        result_value INTEGER,
+        execution_time_ms BIGINT,
+        trace_id TEXT,
+        ip_address TEXT,
+        status TEXT,
+        message TEXT,
+        FOREIGN KEY (operation_id) REFERENCES operations(id)
+    )
+"""
+
+INSERT_OPERATION = """
+    INSERT INTO operations
+    (id, timestamp, operation_type, input_a, input_b, result, execution_time_ms, trace_id, span_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_BUSINESS_LOG = """
+    INSERT INTO business_logs
+    (operation_id, user_id, timestamp, hour_of_day, day_period, operation_type,
+     input_values, result_value, execution_time_ms, trace_id, ip_address, status, message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Peso relativo de cada hora do dia: madrugada quase vazia, pico à tarde
+HOURLY_WEIGHTS = np.array([
+    1, 1, 1, 1, 1, 2,          # 0h–5h   NIGHT
+    4, 8, 12, 14, 15, 16,      # 6h–11h  MORNING
+    14, 16, 18, 18, 16, 14,    # 12h–17h AFTERNOON
+    10, 8, 6, 4,               # 18h–21h EVENING
+    2, 1,                      # 22h–23h NIGHT
+], dtype=float)
+
+
+def day_period(hours):
+    """Mesma regra do ``LoggingService.getDayPeriod``, vetorizada."""
+    hours = np.asarray(hours)
+    return np.select(
+        [(hours >= 6) & (hours < 12), (hours >= 12) & (hours < 18), (hours >= 18) & (hours < 22)],
+        ['MORNING', 'AFTERNOON', 'EVENING'],
+        default='NIGHT',
+    )
+
+
+def _hex_ids(rng, n, nbytes):
+    raw = rng.bytes(n * nbytes).hex()
+    width = nbytes * 2
+    return [raw[i:i + width] for i in range(0, n * width, width)]
+
+
+def _timestamps(rng, rows, days, end):
+    # Últimos ``days`` dias completos: dia uniforme, hora pela curva diária,
+    # segundos uniformes dentro da hora
+    start = end.normalize() - pd.Timedelta(days=days)
+    day = rng.integers(0, days, rows)
+    hour = rng.choice(24, size=rows, p=HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum())
+    second = rng.integers(0, 3600, rows)
+    offsets = np.sort(day * 86_400 + hour * 3_600 + second)
+    return start.to_datetime64().astype('datetime64[s]') + offsets.astype('timedelta64[s]')
+
+
+def generate_rows(rows, users=200, days=30, seed=42, end=None, chunk_size=50_000):
+    """Gera as linhas em blocos: ``(operations, business_logs)`` por bloco."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.now().floor('s'))
+    timestamps = _timestamps(rng, rows, days, end)
+
+    # Zipf: poucos usuários concentram a maior parte das operações
+    user_ids = np.array([f"user{i}" for i in range(1, users + 1)], dtype=object)
+    user_weights = 1.0 / np.arange(1, users + 1) ** 1.1
+    user_weights /= user_weights.sum()
+    user_ips = np.array([f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(1, users + 1)],
+                        dtype=object)
+
+    for start in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - start)
+        ts = timestamps[start:start + n]
+        ts_text = np.char.replace(np.datetime_as_string(ts, unit='s'), 'T', ' ').tolist()
+        hours = (ts.astype('datetime64[h]') - ts.astype('datetime64[D]')).astype(int)
+        periods = day_period(hours).tolist()
+
+        user_idx = rng.choice(users, size=n, p=user_weights)
+        a = rng.integers(0, 1000, n)
+        b = rng.integers(0, 1000, n)
+        result = a + b
+        # Quase tudo 0–2 ms (System.currentTimeMillis), com ~1% de operações lentas
+        execution_time = rng.geometric(0.6, n) - 1
+        slow = rng.random(n) < 0.01
+        execution_time[slow] += rng.integers(10, 500, slow.sum())
+
+        operation_ids = [str(uuid.UUID(hex=h, version=4)) for h in _hex_ids(rng, n, 16)]
+        trace_ids = _hex_ids(rng, n, 16)
+        span_ids = _hex_ids(rng, n, 8)
+
+        a, b, result, execution_time = a.tolist(), b.tolist(), result.tolist(), execution_time.tolist()
+        users_chunk = user_ids[user_idx].tolist()
+        ips_chunk = user_ips[user_idx].tolist()
+        hours = hours.tolist()
+
+        operations = [
+            (operation_ids[i], ts_text[i], 'sum', a[i], b[i], result[i],
+             execution_time[i], trace_ids[i], span_ids[i])
+            for i in range(n)
+        ]
+        business_logs = []
+        for i in range(n):
+            input_values = f"{a[i]} + {b[i]}"
+            business_logs.append((
+                operation_ids[i], users_chunk[i], ts_text[i], hours[i], periods[i], 'sum',
+                input_values, result[i], execution_time[i], trace_ids[i], ips_chunk[i], 'SUCCESS',
+                f"User {users_chunk[i]} performed sum operation: {input_values} = {result[i]}",
+            ))
+        yield operations, business_logs
+
+
+def create_tables(conn):
+    conn.execute(CREATE_OPERATIONS_TABLE)
+    conn.execute(CREATE_BUSINESS_LOGS_TABLE)
+
+
+def generate_database(db_path, rows, users=200, days=30, seed=42, end=None, chunk_size=50_000):
+    """Cria (ou completa) ``db_path`` com ``rows`` operações sintéticas."""
+    conn = sqlite3.connect(db_path)
+    try:
+        # Banco descartável: sem fsync por bloco
+        conn.execute("PRAGMA synchronous = OFF")
+        create_tables(conn)
+        conn.commit()
+        for operations, business_logs in generate_rows(rows, users, days, seed, end, chunk_size):
+            with conn:
+                conn.executemany(INSERT_OPERATION, operations)
+                conn.executemany(INSERT_BUSINESS_LOG, business_logs)
+    finally:
+        conn.close()
+    return db_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um soma_logs.db sintético")
+    parser.add_argument('db_path')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--overwrite', action='store_true',
+                        help="apaga o arquivo antes de gerar")
+    args = parser.parse_args(argv)
+
+    if args.overwrite and os.path.exists(args.db_path):
+        os.remove(args.db_path)
+
+    started = time.perf_counter()
+    generate_database(args.db_path, args.rows, args.users, args.days, args.seed)
+    print(f"{args.rows} operações geradas em {args.db_path} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Índice em memória ``trace_id -> linhas`` sobre os stores dos painéis.
+
+``operations`` e ``business_logs`` compartilham o ``trace_id`` de cada
+requisição, mas juntá-las em pandas a cada rerun custa um merge das duas
+tabelas inteiras. O ``TraceIndex`` se registra como listener dos dois
+``LogStore`` e, a cada delta, anota em dicionários a posição de cada linha
+no buffer do store (as linhas nunca mudam de posição: as tabelas só
+crescem). Buscar um trace — pelo ``trace_id`` ou pelo id da operação — é
+uma consulta O(1) nos dicionários seguida de ``LogStore.take`` nas
+posições encontradas, sem SQL e sem tocar nas demais linhas.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+
+import pandas as pd
+
+RECENT_TRACES = 200
+
+
+@dataclass(frozen=True)
+class Trace:
+    trace_id: str
+    operations: pd.DataFrame
+    business_logs: pd.DataFrame
+
+
+def _add(index, key, position):
+    # Quase todo trace tem uma linha por tabela: guarda o int e só vira lista se repetir
+    current = index.get(key)
+    if current is None:
+        index[key] = position
+    elif isinstance(current, list):
+        current.append(position)
+    else:
+        index[key] = [current, position]
+
+
+class TraceIndex:
+    """``trace_id`` e id da operação -> posições das linhas em cada store.
+
+    ``stores`` mapeia nome -> ``LogStore`` e ``id_columns`` diz, para cada
+    store, qual coluna guarda o id da operação (``id`` em ``operations``,
+    ``operation_id`` em ``business_logs``).
+    """
+
+    def __init__(self, stores, id_columns, recent=RECENT_TRACES):
+        self.stores = dict(stores)
+        self.id_columns = dict(id_columns)
+        self._positions = {name: {} for name in self.stores}
+        self._sizes = {name: 0 for name in self.stores}
+        self._traces_by_id = {}
+        self._recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        for name, store in self.stores.items():
+            store.add_listener(partial(self._update, name))
+
+    def _update(self, name, delta):
+        if delta.empty:
+            return
+        # O índice do delta são as posições no buffer do store (ver LogStore._slice)
+        start = delta.index[0]
+        positions = delta.index.tolist()
+        traces = delta['trace_id'].tolist()
+        ids = delta[self.id_columns[name]].tolist()
+
+        with self._lock:
+            if start < self._sizes[name]:
+                # Store recomeçou (banco recriado): as posições antigas não valem mais
+                self._positions[name].clear()
+            index = self._positions[name]
+            for trace_id, row_id, position in zip(traces, ids, positions):
+                if trace_id is None or trace_id != trace_id:
+                    continue
+                _add(index, trace_id, position)
+                if row_id is not None:
+                    self._traces_by_id[row_id] = trace_id
+            self._sizes[name] = start + len(delta)
+            self._recent.extend(trace for trace in traces[-self._recent.maxlen:] if trace is not None)
+
+    def resolve(self, key):
+        """``trace_id`` para um trace ou id de operação; None se não existir."""
+        key = key.strip()
+        with self._lock:
+            if any(key in index for index in self._positions.values()):
+                return key
+            return self._traces_by_id.get(key)
+
+    def find(self, key):
+        """Linhas do trace (por trace_id ou id de operação) em cada store, ou None."""
+        trace_id = self.resolve(key)
+        if trace_id is None:
+            return None
+        with self._lock:
+            found = {}
+            for name, index in self._positions.items():
+                positions = index.get(trace_id, [])
+                found[name] = list(positions) if isinstance(positions, list) else [positions]
+        if not any(found.values()):
+            # Id de uma linha que já não está nos stores (banco recriado)
+            return None
+        frames = {name: self.stores[name].take(positions) for name, positions in found.items()}
+        return Trace(trace_id, frames.get('operations'), frames.get('business_logs'))
+
+    def recent(self, n=20):
+        """Últimos ``n`` trace_ids distintos, mais recentes primeiro."""
+        with self._lock:
+            seen = []
+            for trace_id in reversed(self._recent):
+                if trace_id not in seen:
+                    seen.append(trace_id)
+                    if len(seen) == n:
+                        break
+            return seen
+
+    def counts(self):
+        """Traces distintos indexados em cada store."""
+        with self._lock:
+            return {name: len(index) for name, index in self._positions.items()}
@@ -0,0 +1,191 @@
+"""Tempo de execução por janela de tempo, com no máximo ``max_points`` pontos.
+
+Em vez das últimas N operações plotadas contra o índice da linha, o
+gráfico "Tempo de Execução" mostra uma janela de tempo (últimos 5 min,
+1 h, 24 h ou um intervalo livre). Janelas com poucas operações voltam
+ponto a ponto; as maiores são agregadas no SQLite em buckets de tamanho
+fixo com média, mínimo e máximo — o máximo de cada bucket mantém os picos
+visíveis mesmo com um dia inteiro em algumas centenas de pontos.
+
+Os buckets são alinhados a múltiplos do seu tamanho desde a época, então a
+mesma janela relida alguns segundos depois gera os mesmos pontos (e o
+mesmo PNG no cache do ``ChartRenderer``) enquanto não chegam operações.
+A consulta usa ``idx_operations_timestamp`` (ver ``soma_dashboard.indexes``).
+"""
+import math
+from dataclasses import dataclass
+
+import pandas as pd
+
+from soma_dashboard.pool import read_connection
+from soma_dashboard.schema import TIMESTAMP_FORMAT
+
+DEFAULT_MAX_POINTS = 300
+
+# Tamanhos de bucket "redondos" (segundos): rótulos legíveis e alinhamento estável
+BUCKET_STEPS = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400]
+
+COUNT_QUERY = """
+SELECT COUNT(*)
+FROM operations
+WHERE timestamp >= ? AND timestamp < ?
+"""
+
+POINTS_QUERY = """
+SELECT timestamp, execution_time_ms
+FROM operations
+WHERE timestamp >= ? AND timestamp < ?
+ORDER BY timestamp
+"""
+
+BUCKETS_QUERY = """
+SELECT
+    (CAST(strftime('%s', timestamp) AS INTEGER) / ?) * ? AS bucket_epoch,
+    COUNT(*) as operations,
+    AVG(execution_time_ms) as avg_ms,
+    MIN(execution_time_ms) as min_ms,
+    MAX(execution_time_ms) as max_ms
+FROM operations
+WHERE timestamp >= ? AND timestamp < ?
+GROUP BY bucket_epoch
+ORDER BY bucket_epoch
+"""
+
+
+@dataclass(frozen=True)
+class ExecutionWindow:
+    points: pd.DataFrame     # timestamp, operations, avg_ms, min_ms, max_ms
+    since: pd.Timestamp
+    until: pd.Timestamp
+    bucket_seconds: int      # 0 = pontos individuais
+    total_operations: int
+
+    @property
+    def empty(self):
+        return self.points.empty
+
+    @property
+    def bucketed(self):
+        return self.bucket_seconds > 0
+
+    @property
+    def label(self):
+        if not self.bucketed:
+            return 'cada operação'
+        for unit, size in (('h', 3600), ('min', 60)):
+            if self.bucket_seconds % size == 0:
+                return f'buckets de {self.bucket_seconds // size} {unit}'
+        return f'buckets de {self.bucket_seconds} s'
+
+
+def bucket_size(since, until, max_points=DEFAULT_MAX_POINTS):
+    """Menor bucket de ``BUCKET_STEPS`` (em segundos) que cabe a janela em ``max_points``."""
+    seconds = max((pd.Timestamp(until) - pd.Timestamp(since)).total_seconds(), 1)
+    # Um bucket de folga: o início arredondado para baixo pode abrir um bucket a mais
+    needed = math.ceil(seconds / max(max_points - 1, 1))
+    for step in BUCKET_STEPS:
+        if step >= needed:
+            return step
+    return math.ceil(needed / BUCKET_STEPS[-1]) * BUCKET_STEPS[-1]
+
+
+def load_execution_window(db_path, since, until, max_points=DEFAULT_MAX_POINTS):
+    """Tempos de execução entre ``since`` e ``until`` (UTC, como o CURRENT_TIMESTAMP)."""
+    since, until = pd.Timestamp(since), pd.Timestamp(until)
+    bucket_seconds = bucket_size(since, until, max_points)
+    # Início alinhado ao bucket: a janela deslizante não redesenha buckets já fechados
+    since = since.floor(f"{bucket_seconds}s")
+    window = (since.strftime(TIMESTAMP_FORMAT), until.strftime(TIMESTAMP_FORMAT))
+
+    with read_connection(db_path) as conn:
+        total = conn.execute(COUNT_QUERY, window).fetchone()[0]
+        if total <= max_points:
+            raw = pd.read_sql_query(POINTS_QUERY, conn, params=window)
+            bucket_seconds = 0
+        else:
+            raw = pd.read_sql_query(BUCKETS_QUERY, conn, params=(bucket_seconds, bucket_seconds, *window))
+
+    if bucket_seconds:
+        points = pd.DataFrame({
+            'timestamp': pd.to_datetime(raw['bucket_epoch'], unit='s'),
+            'operations': raw['operations'],
+            'avg_ms': raw['avg_ms'],
+            'min_ms': raw['min_ms'],
+            'max_ms': raw['max_ms'],
+        })
+    else:
+        points = pd.DataFrame({
+            'timestamp': pd.to_datetime(raw['timestamp'], format=TIMESTAMP_FORMAT),
+            'operations': 1,
+            'avg_ms': raw['execution_time_ms'].astype(float),
+            'min_ms': raw['execution_time_ms'],
+            'max_ms': raw['execution_time_ms'],
+        })
+    return ExecutionWindow(points, since, until, bucket_seconds, int(total))
+
+
+def frame_window(frame, since, until, max_points=DEFAULT_MAX_POINTS):
+    """O mesmo que ``load_execution_window`` sobre um DataFrame (ex.: partições arquivadas).
+
+    ``frame`` tem ``timestamp`` (datetime) e ``execution_time_ms``; os buckets
+    saem alinhados como os do SQLite, então ``merge_windows`` junta as duas.
+    """
+    since, until = pd.Timestamp(since), pd.Timestamp(until)
+    bucket_seconds = bucket_size(since, until, max_points)
+    since = since.floor(f"{bucket_seconds}s")
+    frame = frame[(frame['timestamp'] >= since) & (frame['timestamp'] < until)]
+    total = len(frame)
+
+    if total <= max_points:
+        frame = frame.sort_values('timestamp', kind='stable')
+        points = pd.DataFrame({
+            'timestamp': frame['timestamp'].to_numpy(),
+            'operations': 1,
+            'avg_ms': frame['execution_time_ms'].astype(float).to_numpy(),
+            'min_ms': frame['execution_time_ms'].to_numpy(),
+            'max_ms': frame['execution_time_ms'].to_numpy(),
+        })
+        return ExecutionWindow(points, since, until, 0, total)
+
+    points = frame.groupby(frame['timestamp'].dt.floor(f"{bucket_seconds}s"), sort=True)['execution_time_ms'].agg(
+        operations='count', avg_ms='mean', min_ms='min', max_ms='max')
+    points = points.rename_axis('timestamp').reset_index()
+    return ExecutionWindow(points, since, until, bucket_seconds, total)
+
+
+def merge_windows(windows, max_points=DEFAULT_MAX_POINTS):
+    """Junta a mesma janela lida em vários bancos (réplicas).
+
+    Todas usam o mesmo ``bucket_size`` (depende só da janela); se o total
+    couber em ``max_points`` os pontos individuais são intercalados, senão
+    pontos e buckets são reagrupados nos buckets comuns, com a média
+    ponderada pelas operações.
+    """
+    windows = list(windows)
+    if len(windows) == 1:
+        return windows[0]
+
+    since, until = windows[0].since, windows[0].until
+    total = sum(window.total_operations for window in windows)
+    non_empty = [window.points for window in windows if not window.empty]
+    if not non_empty:
+        return ExecutionWindow(windows[0].points, since, until, 0, total)
+    points = pd.concat(non_empty, ignore_index=True)
+
+    if total <= max_points and not any(window.bucketed for window in windows):
+        points = points.sort_values('timestamp', kind='stable', ignore_index=True)
+        return ExecutionWindow(points, since, until, 0, total)
+
+    bucket_seconds = bucket_size(since, until, max_points)
+    points = points.assign(
+        timestamp=points['timestamp'].dt.floor(f"{bucket_seconds}s"),
+        execution_time_total=points['avg_ms'] * points['operations'],
+    )
+    merged = points.groupby('timestamp', as_index=False, sort=True).agg(
+        operations=('operations', 'sum'),
+        execution_time_total=('execution_time_total', 'sum'),
+        min_ms=('min_ms', 'min'),
+        max_ms=('max_ms', 'max'),
+    )
+    merged.insert(2, 'avg_ms', merged.pop('execution_time_total') / merged['operations'])
+    return ExecutionWindow(merged, since, until, bucket_seconds, total)
@@ -1,11 +1,19 @@
 import streamlit as st
-import sqlite3
+
+from soma_dashboard import profiler
+
+# Tempo de carga deste run; no primeiro run do processo inclui os imports abaixo
+run = profiler.start('telemetry_dashboard')
+
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
-import time
-import os
+
+from soma_dashboard import charts
+from soma_dashboard.app import (config, config_status, get_backend, get_chart_renderer, get_instrumentation,
+                                instrumentation_panel, profiler_panel, replicas_status)
+from soma_dashboard.autorefresh import auto_refresh_watcher
+
+run.mark('imports')
 
 # Configuração da página
 st.set_page_config(
@@ -14,161 +22,218 @@ st.set_page_config(
     layout="wide"
 )
 
-# Caminho do banco de dados
-DB_PATH = '/workspaces/opentelemetryexample/soma-api/target/soma_logs.db'
+# Banco, intervalo de atualização e limites vêm de soma_dashboard.app.DashboardConfig (env/arquivo)
+instrumentation = get_instrumentation('soma-telemetry-dashboard')
 
-# Função para carregar dados
-@st.cache_data(ttl=5)
-def load_data():
+# Função para carregar as operações mais recentes e as estatísticas da tabela
+@instrumentation.traced('load_data')
+def load_data(limit, exact_distinct):
     try:
-        if not os.path.exists(DB_PATH):
-            return pd.DataFrame(), f"Banco não encontrado: {DB_PATH}"
-            
-        conn = sqlite3.connect(DB_PATH)
-        
-        query = """
-        SELECT 
-            id,
-            timestamp,
-            operation_type,
-            input_a,
-            input_b,
-            result,
-            execution_time_ms,
-            trace_id,
-            span_id
-        FROM operations 
-        ORDER BY timestamp DESC
-        """
-        
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        backend = get_backend()
+        df = backend.recent('operations', limit)
+        stats = backend.operation_stats(exact=exact_distinct)
         
         if not df.empty:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            return df, "OK"
+            return df, stats, "OK"
         else:
-            return pd.DataFrame(), "Tabela vazia"
+            return pd.DataFrame(), stats, "Tabela vazia"
         
+    except FileNotFoundError as e:
+        return pd.DataFrame(), None, str(e)
+    except Exception as e:
+        return pd.DataFrame(), None, f"Erro: {str(e)}"
+
+# Percentis e extremos de latência (sketch incremental mantido pelo backend)
+@instrumentation.traced('load_latency')
+def load_latency():
+    return get_backend().latency('operations')
+
+# Função para carregar o histórico a partir dos rollups (avança o watermark antes)
+@instrumentation.traced('load_history', cached=True)
+@st.cache_data(ttl=config.refresh_interval)
+@instrumentation.computes
+def load_history(source, granularity):
+    try:
+        return get_backend().history(source, granularity), "OK"
     except Exception as e:
         return pd.DataFrame(), f"Erro: {str(e)}"
 
+# Tempo de execução na janela escolhida (no máximo soma_dashboard.windows.DEFAULT_MAX_POINTS pontos)
+@instrumentation.traced('load_execution_window', cached=True)
+@st.cache_data(ttl=config.refresh_interval)
+@instrumentation.computes
+def load_execution_window(since, until):
+    try:
+        return get_backend().execution_window(since, until), "OK"
+    except Exception as e:
+        return None, f"Erro: {str(e)}"
+
+# Memória ocupada pelos dados carregados (para dimensionar o host do Streamlit)
+@st.cache_data(ttl=60)
+def load_memory_usage():
+    return get_backend().memory('operations')
+
 # Título
 st.title("📊 Painel de Telemetria - Soma API")
 st.markdown("---")
 
 # Sidebar
 st.sidebar.header("⚙️ Controles")
-auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (5s)", value=False)
-limit_records = st.sidebar.slider("📊 Registros", 5, 50, 20)
-
+auto_refresh = st.sidebar.checkbox(f"🔄 Auto-refresh ({config.refresh_interval:g}s)", value=False)
+max_records = config.records_limit(50)
+limit_records = st.sidebar.slider("📊 Registros", min(5, max_records), max_records, min(20, max_records))
+# Distintos via HyperLogLog (memória fixa por bucket); exato = nunique nas linhas carregadas
+exact_distinct = st.sidebar.checkbox("🎯 Contagem exata de distintos", value=False,
+                                     help="Desligado: estimativa HyperLogLog (erro típico ~1,6%)")
+
+# Janela do gráfico de tempo de execução (timestamps do banco são UTC)
+WINDOW_OPTIONS = {
+    "Últimos 5 min": pd.Timedelta(minutes=5),
+    "Última hora": pd.Timedelta(hours=1),
+    "Últimas 24h": pd.Timedelta(hours=24),
+    "Personalizado": None,
+}
+window_choice = st.sidebar.selectbox("⏱️ Janela do tempo de execução", list(WINDOW_OPTIONS), index=1)
+if WINDOW_OPTIONS[window_choice] is not None:
+    # Arredondado para 5s: reruns próximos reaproveitam o cache da consulta
+    window_until = pd.Timestamp.now(tz='UTC').tz_localize(None).ceil('5s')
+    window_since = window_until - WINDOW_OPTIONS[window_choice]
+else:
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    start_date = st.sidebar.date_input("Início (UTC)", value=(now - pd.Timedelta(hours=1)).date())
+    start_time = st.sidebar.time_input("Hora de início", value=(now - pd.Timedelta(hours=1)).time().replace(second=0, microsecond=0))
+    end_date = st.sidebar.date_input("Fim (UTC)", value=now.date())
+    end_time = st.sidebar.time_input("Hora de fim", value=now.time().replace(second=0, microsecond=0))
+    window_since = pd.Timestamp.combine(start_date, start_time)
+    window_until = pd.Timestamp.combine(end_date, end_time)
+    if window_until <= window_since:
+        st.sidebar.warning("⚠️ O fim da janela deve ser depois do início")
+        window_until = window_since + pd.Timedelta(minutes=1)
+
+# Auto-refresh: reexecuta a página só quando chegam linhas novas
 if auto_refresh:
-    time.sleep(5)
-    st.rerun()
+    with st.sidebar:
+        auto_refresh_watcher(get_backend(), interval=config.refresh_interval)
 
 # Carregar dados
-df, status = load_data()
+df_filtered, stats, status = load_data(limit_records, exact_distinct)
+renderer = get_chart_renderer()
 
 # Status do banco
 if status != "OK":
     st.error(f"❌ {status}")
     st.stop()
 
-if df.empty:
+if df_filtered.empty:
     st.warning("⚠️ Nenhum dado encontrado!")
     st.stop()
 
-# Filtrar dados
-df_filtered = df.head(limit_records)
+latency_stats = load_latency()
+run.mark('dados')
 
 # Métricas básicas
 st.subheader("📈 Métricas")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.metric("Total Operações", len(df))
+    st.metric("Total Operações", stats['total'])
 
 with col2:
-    avg_time = df['execution_time_ms'].mean()
+    avg_time = stats['avg_execution_time']
     st.metric("Tempo Médio (ms)", f"{avg_time:.1f}")
 
 with col3:
-    st.metric("Maior Resultado", df['result'].max())
+    st.metric("Maior Resultado", stats['result_max'])
 
 with col4:
-    st.metric("Traces Únicos", df['trace_id'].nunique())
+    st.metric("Traces Únicos", stats['unique_traces'],
+              help=None if exact_distinct else "Estimativa HyperLogLog")
+
+# Percentis de latência (sketch incremental, sem ordenar o histórico)
+latency = latency_stats['percentiles']
+latency_cols = st.columns(len(latency))
+for col, (name, value) in zip(latency_cols, latency.items()):
+    with col:
+        st.metric(f"Latência {name} (ms)", f"{value:.1f}")
 
 st.markdown("---")
 
-# Gráficos simples com matplotlib
+# Gráficos simples com matplotlib (renderizados em paralelo ou servidos do cache)
+top_slow = get_backend().top_slowest('operations')
+
+# Criar labels para as operações
+labels = charts.operation_labels(top_slow)
+
+execution_window, window_status = load_execution_window(window_since, window_until)
+execution_chart = None
+if execution_window is not None and not execution_window.empty:
+    execution_chart = renderer.submit(charts.execution_time, execution_window.points, execution_window.label)
+results_chart = renderer.submit(charts.results_histogram, df_filtered['result'].values)
+slowest_chart = renderer.submit(charts.slowest_operations, labels, top_slow['execution_time_ms'].values)
+
 col_left, col_right = st.columns(2)
 
 with col_left:
     st.subheader("⏱️ Tempo de Execução")
     
-    # Gráfico de linha simples
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Usar índice numérico em vez de timestamp para evitar problemas
-    x_data = range(len(df_filtered))
-    y_data = df_filtered['execution_time_ms'].values
-    
-    ax.plot(x_data, y_data, marker='o', linewidth=2, markersize=6)
-    ax.set_xlabel('Operação (mais recente → mais antiga)')
-    ax.set_ylabel('Tempo (ms)')
-    ax.set_title('Tempo de Execução por Operação')
-    ax.grid(True, alpha=0.3)
-    
-    # Adicionar valores nos pontos
-    for i, v in enumerate(y_data):
-        ax.annotate(f'{v}ms', (i, v), textcoords="offset points", xytext=(0,10), ha='center')
-    
-    st.pyplot(fig)
-    plt.close()
+    # Média e faixa mín–máx por bucket: os picos continuam visíveis em janelas longas
+    if window_status != "OK":
+        st.error(f"❌ {window_status}")
+    elif execution_chart is None:
+        st.info(f"Nenhuma operação entre {window_since} e {window_until} (UTC)")
+    else:
+        with instrumentation.span('chart.execution_time') as span:
+            span.record_chart(execution_chart)
+            st.image(execution_chart.result(), use_container_width=True)
+        window_traces = get_backend().distinct_count('operations', 'trace_id', window_since, window_until,
+                                                     exact=exact_distinct)
+        st.caption(f"{execution_window.total_operations} operações ({window_traces} traces únicos) de "
+                   f"{execution_window.since} a {execution_window.until} (UTC), {execution_window.label}")
 
 with col_right:
     st.subheader("📈 Distribuição dos Resultados")
     
     # Histograma simples
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    results = df_filtered['result'].values
-    ax.hist(results, bins=min(10, len(set(results))), alpha=0.7, color='skyblue', edgecolor='black')
-    ax.set_xlabel('Resultado da Soma')
-    ax.set_ylabel('Frequência')
-    ax.set_title('Distribuição dos Resultados')
-    ax.grid(True, alpha=0.3)
-    
-    st.pyplot(fig)
-    plt.close()
+    with instrumentation.span('chart.results_histogram') as span:
+        span.record_chart(results_chart)
+        st.image(results_chart.result(), use_container_width=True)
 
 # Gráfico de barras - Operações mais lentas
 st.subheader("🐌 Top 5 Operações Mais Lentas")
-
-top_slow = df.nlargest(5, 'execution_time_ms')
-
-fig, ax = plt.subplots(figsize=(12, 6))
-
-# Criar labels para as operações
-labels = [f"{row['input_a']}+{row['input_b']}={row['result']}" for _, row in top_slow.iterrows()]
-times = top_slow['execution_time_ms'].values
-
-bars = ax.bar(range(len(labels)), times, color='lightcoral', alpha=0.8)
-ax.set_xlabel('Operações')
-ax.set_ylabel('Tempo (ms)')
-ax.set_title('Top 5 Operações Mais Lentas')
-ax.set_xticks(range(len(labels)))
-ax.set_xticklabels(labels, rotation=45)
-
-# Adicionar valores nas barras
-for bar, time_val in zip(bars, times):
-    height = bar.get_height()
-    ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-            f'{time_val}ms', ha='center', va='bottom')
-
-plt.tight_layout()
-st.pyplot(fig)
-plt.close()
+with instrumentation.span('chart.slowest_operations') as span:
+    span.record_chart(slowest_chart)
+    st.image(slowest_chart.result(), use_container_width=True)
+
+run.mark('gráficos')
+
+# Histórico longo lido dos rollups (poucas linhas mesmo com semanas de dados)
+st.subheader("📆 Histórico de Operações")
+granularity_label = st.radio("Agrupar por:", ["Hora", "Minuto"], horizontal=True)
+granularity = 'hour' if granularity_label == "Hora" else 'minute'
+df_history, history_status = load_history('operations', granularity)
+df_percentiles = get_backend().percentiles_over_time('operations', 'h' if granularity == 'hour' else 'min')
+
+if not df_history.empty:
+    history_chart = renderer.submit(charts.history, df_history, granularity_label)
+if not df_percentiles.empty:
+    percentiles_chart = renderer.submit(charts.percentiles_over_time, df_percentiles, granularity_label)
+
+if history_status != "OK":
+    st.error(f"❌ {history_status}")
+elif df_history.empty:
+    st.info("Histórico ainda não disponível")
+else:
+    with instrumentation.span('chart.history') as span:
+        span.record_chart(history_chart)
+        st.image(history_chart.result(), use_container_width=True)
+
+# Percentis ao longo do tempo (merge dos sketches por minuto)
+st.subheader("📈 Percentis de Latência ao Longo do Tempo")
+
+if not df_percentiles.empty:
+    with instrumentation.span('chart.percentiles_over_time') as span:
+        span.record_chart(percentiles_chart)
+        st.image(percentiles_chart.result(), use_container_width=True)
 
 # Tabela de dados
 st.subheader("📋 Dados Recentes")
@@ -193,41 +258,51 @@ col_stats1, col_stats2, col_stats3 = st.columns(3)
 
 with col_stats1:
     st.write("**Tempo de Execução:**")
-    st.write(f"• Mínimo: {df['execution_time_ms'].min()} ms")
-    st.write(f"• Máximo: {df['execution_time_ms'].max()} ms")
-    st.write(f"• Mediana: {df['execution_time_ms'].median()} ms")
-    st.write(f"• Desvio Padrão: {df['execution_time_ms'].std():.2f} ms")
+    st.write(f"• Mínimo: {latency_stats['min']:.0f} ms")
+    st.write(f"• Máximo: {latency_stats['max']:.0f} ms")
+    st.write(f"• Mediana (p50): {latency['p50']:.1f} ms")
+    st.write(f"• p95 / p99: {latency['p95']:.1f} / {latency['p99']:.1f} ms")
+    st.write(f"• Desvio Padrão: {latency_stats['std']:.2f} ms")
 
 with col_stats2:
     st.write("**Resultados:**")
-    st.write(f"• Menor: {df['result'].min()}")
-    st.write(f"• Maior: {df['result'].max()}")
-    st.write(f"• Média: {df['result'].mean():.1f}")
-    st.write(f"• Mediana: {df['result'].median()}")
+    st.write(f"• Menor: {stats['result_min']}")
+    st.write(f"• Maior: {stats['result_max']}")
+    st.write(f"• Média: {stats['result_mean']:.1f}")
+    st.write(f"• Mediana: {stats['result_median']}")
 
 with col_stats3:
     st.write("**Operações:**")
-    st.write(f"• Total: {len(df)}")
-    st.write(f"• Traces únicos: {df['trace_id'].nunique()}")
+    st.write(f"• Total: {stats['total']}")
+    st.write(f"• Traces únicos: {stats['unique_traces']}")
     
-    if len(df) > 0:
-        first_op = df['timestamp'].min()
-        last_op = df['timestamp'].max()
+    if stats['total'] > 0:
+        first_op = stats['first_operation']
+        last_op = stats['last_operation']
         st.write(f"• Primeira: {first_op.strftime('%H:%M:%S')}")
         st.write(f"• Última: {last_op.strftime('%H:%M:%S')}")
 
 # Informações de debug na sidebar
 st.sidebar.markdown("---")
 st.sidebar.subheader("🔍 Debug")
-st.sidebar.write(f"**Registros carregados:** {len(df)}")
-st.sidebar.write(f"**Banco existe:** {os.path.exists(DB_PATH)}")
+st.sidebar.write(f"**Registros carregados:** {stats['total']}")
+replicas_status(get_backend(), show_single=True)
+config_status()
+memory_total, memory_per_row = load_memory_usage()
+st.sidebar.write(f"**Memória:** {memory_total / 1024**2:.1f} MB ({memory_per_row:.0f} bytes/operação)")
 st.sidebar.write(f"**Última atualização:** {datetime.now().strftime('%H:%M:%S')}")
 
+instrumentation_panel(instrumentation)
+
 # Botão de refresh manual
 if st.sidebar.button("🔄 Atualizar Agora"):
     st.cache_data.clear()
+    get_backend().refresh()
     st.rerun()
 
 # Rodapé
 st.markdown("---")
 st.info(f"📊 Painel atualizado em: {datetime.now().strftime('%H:%M:%S')}")
+
+# Cold start e reruns deste painel contra o orçamento da configuração
+profiler_panel('telemetry_dashboard', run)
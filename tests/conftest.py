@@ -0,0 +1,32 @@
+"""Bancos sintéticos pequenos para os testes do soma_dashboard."""
+import sqlite3
+
+import pytest
+
+from soma_dashboard.synthetic import CREATE_BUSINESS_LOGS_TABLE, INSERT_BUSINESS_LOG, generate_database
+
+END = '2026-10-01 12:00:00'
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """soma_logs.db com 2000 operações de 20 usuários em 3 dias."""
+    return generate_database(str(tmp_path / 'soma_logs.db'), 2000, users=20, days=3, end=END)
+
+
+def recreate_business_logs(db_path, rows):
+    """Recria ``business_logs`` (ids recomeçam em 1) com as linhas dadas."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("DROP TABLE business_logs")
+        conn.execute(CREATE_BUSINESS_LOGS_TABLE)
+        conn.executemany(INSERT_BUSINESS_LOG, rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def business_log(user_id, timestamp, execution_time_ms=1, trace_id='t0'):
+    """Uma linha de ``INSERT_BUSINESS_LOG``."""
+    return ('op-' + trace_id, user_id, timestamp, int(timestamp[11:13]), 'MORNING', 'sum',
+            '1 + 1', 2, execution_time_ms, trace_id, '10.0.0.1', 'SUCCESS', 'ok')
@@ -0,0 +1,90 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from conftest import business_log
+from soma_dashboard.anomalies import AnomalyMonitor, EwmaDetector
+from soma_dashboard.schema import BUSINESS_LOG_SCHEMA
+from soma_dashboard.store import LogStore
+from soma_dashboard.synthetic import INSERT_BUSINESS_LOG
+
+
+def logs_delta(start, users, times):
+    return pd.DataFrame({
+        'id': np.arange(start, start + len(users)) + 1,
+        'timestamp': pd.date_range('2026-10-01 10:00', periods=len(users), freq='s') + pd.Timedelta(seconds=start),
+        'user_id': pd.Categorical(users),
+        'hour_of_day': 10,
+        'execution_time_ms': np.asarray(times, dtype=float),
+        'trace_id': [f't{start + i}' for i in range(len(users))],
+    }, index=pd.RangeIndex(start, start + len(users)))
+
+
+def test_batches_match_row_by_row_recurrence():
+    rng = np.random.default_rng(3)
+    users = rng.choice(['a', 'b', 'c'], 300).tolist()
+    times = rng.integers(0, 20, 300)
+
+    batched = EwmaDetector('user_id', alpha=0.1)
+    scores = pd.concat([batched.score(logs_delta(i, users[i:i + 70], times[i:i + 70]))
+                        for i in range(0, 300, 70)])
+    single = EwmaDetector('user_id', alpha=0.1)
+    for i in range(300):
+        single.score(logs_delta(i, users[i:i + 1], times[i:i + 1]))
+
+    pd.testing.assert_frame_equal(batched.baselines().sort_values('key', ignore_index=True),
+                                  single.baselines().sort_values('key', ignore_index=True))
+    assert not scores['flagged'].any()
+
+
+def test_spike_is_flagged_after_warmup():
+    detector = EwmaDetector('user_id', warmup=30)
+    normal = detector.score(logs_delta(0, ['a'] * 40, [1, 2] * 20))
+    spike = detector.score(logs_delta(40, ['a', 'b'], [500, 500]))
+
+    assert not normal['flagged'].any()
+    # 'b' ainda não passou do warmup
+    assert spike['flagged'].tolist() == [True, False]
+
+
+def test_null_keys_are_skipped():
+    detector = EwmaDetector('user_id', warmup=1)
+    scores = detector.score(logs_delta(0, ['a', None, 'a', None], [1, 1000, 1, 1000]))
+
+    assert scores['flagged'].dtype == bool
+    assert scores['flagged'].tolist() == [False, False, False, False]
+    assert scores['z'].isna().tolist() == [True, True, False, True]
+    assert detector.baselines()['key'].tolist() == ['a']
+    # Delta só com chaves nulas
+    assert not detector.score(logs_delta(4, [None], [5]))['flagged'].any()
+
+
+def test_null_user_id_row_does_not_break_the_store(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(INSERT_BUSINESS_LOG, business_log(None, '2026-10-01 12:00:01', execution_time_ms=10_000))
+    conn.commit()
+    conn.close()
+
+    store = LogStore(db_path, 'business_logs', BUSINESS_LOG_SCHEMA, key='id')
+    monitor = AnomalyMonitor([EwmaDetector('user_id'), EwmaDetector('hour_of_day')])
+    store.add_listener(monitor.update)
+
+    assert store.refresh() == 2001
+    assert monitor.rows_seen == 2001
+    # A linha sem usuário ainda é comparada com a hora do dia, só não com um usuário
+    flagged = monitor.flagged().iloc[0]
+    assert pd.isna(flagged['user_id']) and pd.isna(flagged['z_user_id'])
+    assert flagged['z_hour_of_day'] > 3.5
+
+
+def test_monitor_resets_when_store_restarts():
+    monitor = AnomalyMonitor([EwmaDetector('user_id', warmup=5)])
+    monitor.update(logs_delta(0, ['a'] * 10, [1] * 10))
+    monitor.update(logs_delta(10, ['a'], [900]))
+    assert monitor.total_flagged == 1
+
+    monitor.update(logs_delta(0, ['b'] * 3, [1] * 3))
+    assert monitor.total_flagged == 0
+    assert monitor.rows_seen == 3
+    assert monitor.baselines('user_id')['key'].tolist() == ['b']
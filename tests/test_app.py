@@ -0,0 +1,42 @@
+import pytest
+
+from soma_dashboard.app import CONFIG_ENV, DashboardConfig
+
+
+def write_config(tmp_path, text):
+    path = tmp_path / 'dashboard.toml'
+    path.write_text(f"[dashboard]\n{text}\n")
+    return {CONFIG_ENV: str(path)}
+
+
+def test_file_values_are_overridden_by_environment(tmp_path):
+    environ = write_config(tmp_path, 'refresh_interval = 10\nmax_records = 40')
+    config = DashboardConfig.load(dict(environ, SOMA_DASHBOARD_MAX_RECORDS='30'))
+
+    assert config.refresh_interval == 10.0
+    assert config.max_records == 30
+    assert config.records_limit(50) == 30
+    assert config.errors == ()
+
+
+@pytest.mark.parametrize('text', ['max_records = "muitos"', 'max_records = [1, 2]', 'max_records = true'])
+def test_invalid_value_falls_back_to_default_and_names_the_key(tmp_path, text):
+    config = DashboardConfig.load(write_config(tmp_path, f'{text}\nrefresh_interval = 2'))
+
+    assert config.max_records == DashboardConfig.max_records
+    assert config.refresh_interval == 2.0
+    assert len(config.errors) == 1 and 'max_records' in config.errors[0]
+
+
+def test_unknown_option_and_unreadable_file_are_reported(tmp_path):
+    config = DashboardConfig.load(write_config(tmp_path, 'refresh = 3'))
+    assert 'refresh' in config.errors[0]
+
+    config = DashboardConfig.load({CONFIG_ENV: str(tmp_path / 'inexistente.toml')})
+    assert config == DashboardConfig()
+    assert CONFIG_ENV in config.errors[0]
+
+
+def test_strict_load_raises(tmp_path):
+    with pytest.raises(ValueError, match='page_size'):
+        DashboardConfig.load({'SOMA_DASHBOARD_PAGE_SIZE': 'x'}, strict=True)
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from soma_dashboard import backend as backend_module
+from soma_dashboard.backend import DashboardBackend
+from soma_dashboard.indexes import MIGRATIONS, migrate
+
+
+@pytest.fixture
+def backend(db_path, tmp_path):
+    backend = DashboardBackend(db_path, snapshot_dir=str(tmp_path / 'snapshots'))
+    yield backend
+    backend.close()
+
+
+def test_logs_page_cache_keeps_no_filter_and_empty_selection_apart(backend):
+    assert len(backend.logs_page(users=None, page_size=10).rows) == 10
+    assert backend.logs_page(users=[], page_size=10).rows.empty
+    assert len(backend.logs_page(users=None, page_size=10).rows) == 10
+
+    assert backend.logs_page(periods=[], page_size=10).rows.empty
+    assert len(backend.logs_page(periods=None, page_size=10).rows) == 10
+
+
+def test_failed_index_migration_is_retried(backend, monkeypatch, caplog):
+    calls = []
+
+    def locked_once(db_path):
+        calls.append(db_path)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return migrate(db_path)
+
+    monkeypatch.setattr(backend_module, 'migrate', locked_once)
+    assert backend.setup_indexes() == []
+    assert 'database is locked' in caplog.text
+
+    assert backend.setup_indexes() == [version for version, _, _ in MIGRATIONS]
+    # Migração aplicada fica em cache
+    assert backend.setup_indexes() == [version for version, _, _ in MIGRATIONS]
+    assert len(calls) == 2
@@ -0,0 +1,13 @@
+import pytest
+
+from soma_dashboard.benchmark import DASHBOARDS, main
+
+
+@pytest.mark.parametrize('dashboard', DASHBOARDS)
+def test_benchmark_runs_every_stage(dashboard, tmp_path, capsys):
+    # Base mínima: o que importa é cada etapa chamar as funções com a assinatura atual
+    assert main(['--rows', '300', '--repeat', '1', '--dashboard', dashboard,
+                 '--workdir', str(tmp_path)]) == 0
+
+    report = capsys.readouterr().out
+    assert dashboard in report and 'rendering' in report
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from conftest import business_log, recreate_business_logs
+from soma_dashboard.pagination import fetch_logs_page, merge_pages
+
+
+def walk(db_path, page_size, **filters):
+    """Todas as páginas em sequência; retorna (ids na ordem exibida, páginas lidas)."""
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = fetch_logs_page(db_path, cursor=cursor, page_size=page_size, **filters)
+        ids += page.rows['id'].tolist()
+        pages += 1
+        if not page.has_next:
+            return ids, pages
+        cursor = page.next_cursor
+
+
+def expected_ids(db_path, where='1 = 1', params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            f"SELECT id FROM business_logs WHERE {where} ORDER BY timestamp DESC, id DESC", params)]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('page_size', [1, 7, 50, 2000, 5000])
+def test_walk_returns_every_row_once_in_order(db_path, page_size):
+    ids, pages = walk(db_path, page_size)
+
+    assert ids == expected_ids(db_path)
+    # Total múltiplo do tamanho da página: sem página final vazia
+    assert pages == -(-2000 // page_size)
+
+
+def test_ties_on_timestamp_split_across_pages(db_path):
+    # 25 linhas no mesmo segundo: o desempate por id não pode pular nem repetir linhas
+    recreate_business_logs(db_path, [business_log(f'user{i % 3}', '2026-10-01 10:00:00', trace_id=f't{i}')
+                                     for i in range(25)]
+                           + [business_log('user1', '2026-10-01 09:59:59', trace_id='antes')])
+    ids, pages = walk(db_path, 10)
+
+    assert ids == list(range(25, 0, -1)) + [26]
+    assert pages == 3
+
+
+def test_filters_and_window_bounds(db_path):
+    since, until = pd.Timestamp('2026-09-30 00:00:00'), pd.Timestamp('2026-09-30 12:00:00')
+    ids, _ = walk(db_path, 33, users=['user1', 'user2'], periods=['MORNING', 'AFTERNOON'],
+                  since=since, until=until)
+
+    assert ids == expected_ids(
+        db_path,
+        "user_id IN ('user1', 'user2') AND day_period IN ('MORNING', 'AFTERNOON') "
+        "AND timestamp >= ? AND timestamp < ?",
+        (str(since), str(until)),
+    )
+    assert ids
+
+
+def test_empty_selection_returns_nothing_and_none_does_not_filter(db_path):
+    assert fetch_logs_page(db_path, users=[]).rows.empty
+    assert not fetch_logs_page(db_path, periods=[]).has_next
+    assert len(fetch_logs_page(db_path, users=None, periods=None).rows) == 50
+
+
+def test_merge_pages_interleaves_sources_and_keeps_the_cursor(db_path):
+    all_ids = expected_ids(db_path)
+    # Duas "fontes" com as mesmas linhas em partes alternadas (como banco e arquivo)
+    even = fetch_logs_page(db_path, users=[f'user{i}' for i in range(0, 21, 2)], page_size=20)
+    odd = fetch_logs_page(db_path, users=[f'user{i}' for i in range(1, 21, 2)], page_size=20)
+    merged = merge_pages([even, odd], page_size=20)
+
+    assert merged.rows['id'].tolist() == all_ids[:20]
+    assert merged.has_next
+    last = merged.rows.iloc[-1]
+    assert merged.next_cursor == (last['timestamp'].strftime('%Y-%m-%d %H:%M:%S'), int(last['id']))
+    assert not merge_pages([fetch_logs_page(db_path, users=[])] * 2).has_next
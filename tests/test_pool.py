@@ -0,0 +1,34 @@
+import os
+import sqlite3
+
+from soma_dashboard import indexes
+from soma_dashboard.pool import ConnectionPool
+
+
+def journal_mode(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_pool_never_changes_the_journal(db_path):
+    pool = ConnectionPool(db_path)
+    try:
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM business_logs").fetchone()[0] == 2000
+    finally:
+        pool.close()
+
+    assert journal_mode(db_path) == 'delete'
+    assert not os.path.exists(db_path + '-wal')
+
+
+def test_indexes_cli_switches_to_wal_only_when_asked(db_path, capsys):
+    assert indexes.main([db_path]) == 0
+    assert journal_mode(db_path) == 'delete'
+
+    assert indexes.main([db_path, '--wal']) == 0
+    assert journal_mode(db_path) == 'wal'
+    assert 'Journal: wal' in capsys.readouterr().out
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from soma_dashboard.backend import DashboardBackend
+from soma_dashboard.client import ServiceClient, ServiceError
+from soma_dashboard.service import DashboardService
+
+
+@pytest.fixture
+def client(db_path, tmp_path):
+    backend = DashboardBackend(db_path, snapshot_dir=str(tmp_path / 'snapshots'))
+    service = DashboardService(backend, port=0)
+    thread = threading.Thread(target=service.serve_forever, daemon=True)
+    thread.start()
+    yield ServiceClient(service.url)
+    service.shutdown()
+    service.server_close()
+    backend.close()
+
+
+def test_refresh_only_accepts_post(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(DashboardBackend, 'refresh', lambda self: calls.append(1) or 0)
+
+    status, _, _ = client._request('GET', '/refresh')
+    assert status == 405
+    assert calls == []
+
+    assert client.refresh() == 0
+    assert calls == [1]
+
+
+def test_read_routes_only_accept_get(client):
+    assert client.row_count('operations') == 2000
+    with pytest.raises(ServiceError) as error:
+        client._call('row_count', http_method='POST', table='operations')
+    assert error.value.status == 405
+
+    status, _, _ = client._request('POST', '/nao-existe')
+    assert status == 404
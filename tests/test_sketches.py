@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from soma_dashboard.sketches import PERCENTILES, DDSketch, DistinctTracker, HyperLogLog, LatencyTracker
+
+
+def latency_delta(start, timestamps, values):
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(timestamps),
+        'execution_time_ms': values,
+    }, index=pd.RangeIndex(start, start + len(values)))
+
+
+def test_ddsketch_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(1).lognormal(3, 1, 50_000)
+    sketch = DDSketch(0.01)
+    sketch.add_many(values)
+
+    for q in PERCENTILES.values():
+        exact = np.quantile(values, q, method='lower')
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(values.mean())
+    assert sketch.std == pytest.approx(values.std(ddof=1))
+
+
+def test_ddsketch_merge_equals_single_sketch():
+    rng = np.random.default_rng(2)
+    a, b = rng.geometric(0.3, 10_000) - 1, rng.integers(100, 500, 1_000)
+    merged = DDSketch().merge(DDSketch()).merge(_sketch(a)).merge(_sketch(b))
+    single = _sketch(np.concatenate([a, b]))
+
+    assert merged.bins == single.bins
+    assert merged.zero_count == single.zero_count
+    assert merged.percentiles() == single.percentiles()
+    assert DDSketch.from_dict(merged.to_dict()).percentiles() == merged.percentiles()
+    with pytest.raises(ValueError):
+        merged.merge(DDSketch(0.05))
+
+
+def _sketch(values):
+    sketch = DDSketch()
+    sketch.add_many(values)
+    return sketch
+
+
+def test_latency_tracker_resets_when_store_restarts():
+    tracker = LatencyTracker()
+    tracker.update(latency_delta(0, ['2026-10-01 10:00:00'] * 3, [1, 2, 900]))
+    tracker.update(latency_delta(3, ['2026-10-01 10:01:00'], [5]))
+    assert tracker.total.count == 4
+
+    # Delta começando em 0 depois de outros: banco recriado
+    tracker.update(latency_delta(0, ['2026-10-02 08:00:00'] * 2, [3, 4]))
+    assert tracker.total.count == 2
+    assert tracker.top_slowest()['execution_time_ms'].tolist() == [4, 3]
+    assert list(tracker.over_time('min').index) == [pd.Timestamp('2026-10-02 08:00:00')]
+
+
+def test_latency_tracker_folds_old_minutes_into_hours():
+    tracker = LatencyTracker(fine_horizon=pd.Timedelta(hours=2))
+    minutes = pd.date_range('2026-10-01 00:00', '2026-10-01 05:59', freq='min')
+    for i, minute in enumerate(minutes):
+        tracker.update(latency_delta(i, [minute], [i % 7]))
+
+    assert min(tracker.by_bucket) >= pd.Timestamp('2026-10-01 03:00')
+    assert set(tracker.by_coarse_bucket) == set(pd.date_range('2026-10-01 00:00', periods=3, freq='h'))
+    # Hora cheia continua com todas as operações, venham de buckets finos ou grossos
+    hourly = tracker.over_time('h')
+    assert hourly['operations'].tolist() == [60] * 6
+    assert tracker.over_time('min').index.min() >= pd.Timestamp('2026-10-01 03:00')
+    assert LatencyTracker.merged([tracker, tracker]).over_time('h')['operations'].tolist() == [120] * 6
+
+
+def distinct_delta(start, timestamps, users):
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(timestamps),
+        'user_id': users,
+    }, index=pd.RangeIndex(start, start + len(users)))
+
+
+@pytest.mark.parametrize('n', [10, 1_000, 200_000])
+def test_hyperloglog_count_within_expected_error(n):
+    sketch = HyperLogLog()
+    sketch.add_many([f'trace-{i}' for i in range(n)])
+    # Repetições e nulos não mudam a contagem
+    sketch.add_many([f'trace-{i}' for i in range(0, n, 3)] + [None, np.nan])
+
+    assert sketch.count() == pytest.approx(n, rel=3 * sketch.relative_error, abs=1)
+
+
+def test_hyperloglog_merge_is_the_union():
+    a, b = HyperLogLog(), HyperLogLog()
+    a.add_many([f'u{i}' for i in range(0, 60_000)])
+    b.add_many([f'u{i}' for i in range(40_000, 100_000)])
+    union = HyperLogLog()
+    union.add_many([f'u{i}' for i in range(0, 100_000)])
+
+    merged = a.copy().merge(b)
+    assert np.array_equal(merged.registers, union.registers)
+    assert np.array_equal(HyperLogLog.from_dict(merged.to_dict()).registers, merged.registers)
+    with pytest.raises(ValueError):
+        merged.merge(HyperLogLog(10))
+
+
+def test_distinct_tracker_counts_windows_across_fine_and_coarse_buckets():
+    tracker = DistinctTracker(['user_id'], fine_horizon=pd.Timedelta(hours=2))
+    minutes = pd.date_range('2026-10-01 00:00', '2026-10-01 05:59', freq='min')
+    for i, minute in enumerate(minutes):
+        # Um usuário novo por hora, repetido a cada minuto dela
+        tracker.update(distinct_delta(i, [minute], [f'user{minute.hour}']))
+
+    assert tracker.count('user_id') == 6
+    assert tracker.count('user_id', since=pd.Timestamp('2026-10-01 04:30')) == 2
+    assert tracker.count('user_id', until=pd.Timestamp('2026-10-01 02:00')) == 2
+    assert min(tracker.fine['user_id']) >= pd.Timestamp('2026-10-01 03:00')
+    with pytest.raises(ValueError):
+        tracker.count('trace_id')
+
+
+def test_distinct_tracker_resets_when_store_restarts():
+    tracker = DistinctTracker(['user_id'])
+    tracker.update(distinct_delta(0, ['2026-10-01 10:00:00'] * 3, ['a', 'b', 'c']))
+    tracker.update(distinct_delta(3, ['2026-10-01 10:01:00'], ['d']))
+    assert tracker.count('user_id') == 4
+
+    # Banco recriado: só os usuários do banco novo contam
+    tracker.update(distinct_delta(0, ['2026-10-02 08:00:00'] * 2, ['x', 'a']))
+    assert tracker.count('user_id') == 2
+    assert tracker.count('user_id', until=pd.Timestamp('2026-10-02')) == 0
+    assert DistinctTracker.merged([tracker, tracker]).count('user_id') == 2
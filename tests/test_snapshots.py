@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from conftest import business_log, recreate_business_logs
+from soma_dashboard.schema import BUSINESS_LOG_SCHEMA, OPERATION_SCHEMA
+from soma_dashboard.snapshots import SnapshotManager
+from soma_dashboard.store import LogStore
+from soma_dashboard.synthetic import INSERT_BUSINESS_LOG
+
+pytest.importorskip('pyarrow')
+
+
+def stores(db_path):
+    return [LogStore(db_path, 'business_logs', BUSINESS_LOG_SCHEMA, key='id'),
+            LogStore(db_path, 'operations', OPERATION_SCHEMA, key='rowid')]
+
+
+@pytest.fixture
+def snapshots(db_path, tmp_path):
+    manager = SnapshotManager(str(tmp_path / 'snapshots'))
+    for store in stores(db_path):
+        store.refresh()
+        assert manager.save(store)
+    return manager
+
+
+def execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_restore_then_refresh_reads_only_the_delta(db_path, snapshots):
+    execute(db_path, INSERT_BUSINESS_LOG, business_log('user1', '2026-10-01 12:00:01', trace_id='novo'))
+
+    business_logs, operations = stores(db_path)
+    assert snapshots.restore(operations) == 2000
+    assert snapshots.restore(business_logs) == 2000
+    assert business_logs.refresh() == 1
+    assert len(business_logs) == 2001
+
+
+def test_archived_oldest_rows_invalidate_the_snapshot(db_path, snapshots):
+    # Como o soma_dashboard.retention: as linhas mais antigas saem do banco
+    for table in ('business_logs', 'operations'):
+        execute(db_path, f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY timestamp LIMIT 10)")
+
+    for store in stores(db_path):
+        assert snapshots.restore(store) == 0
+
+
+def test_recreated_table_past_the_watermark_invalidates_the_snapshot(db_path, snapshots):
+    recreate_business_logs(db_path, [business_log('user1', '2026-10-02 08:00:00', trace_id=f't{i}')
+                                     for i in range(2001)])
+
+    business_logs, operations = stores(db_path)
+    assert snapshots.restore(business_logs) == 0
+    assert snapshots.restore(operations) == 2000
@@ -0,0 +1,96 @@
+import sqlite3
+
+from conftest import business_log, recreate_business_logs
+from soma_dashboard.schema import BUSINESS_LOG_SCHEMA
+from soma_dashboard.store import LogStore
+from soma_dashboard.synthetic import INSERT_BUSINESS_LOG
+
+
+def business_logs_store(db_path):
+    return LogStore(db_path, 'business_logs', BUSINESS_LOG_SCHEMA, key='id')
+
+
+def append_business_logs(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany(INSERT_BUSINESS_LOG, rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class Recorder:
+    """Listener que guarda os deltas recebidos; falha enquanto ``failing``."""
+
+    def __init__(self, failing=False):
+        self.failing = failing
+        self.deltas = []
+
+    def __call__(self, delta):
+        if self.failing:
+            raise RuntimeError("falha simulada")
+        self.deltas.append(delta)
+
+    @property
+    def starts(self):
+        return [int(delta.index[0]) for delta in self.deltas]
+
+
+def test_refresh_loads_only_the_delta(db_path):
+    store = business_logs_store(db_path)
+    assert store.refresh() == 2000
+    assert store.refresh() == 0
+
+    append_business_logs(db_path, [business_log('user1', '2026-10-01 12:00:01', trace_id='novo')])
+    assert store.refresh() == 1
+    assert len(store) == 2001
+    assert store.frame()['trace_id'].iloc[0] == 'novo'
+
+
+def test_listeners_receive_deltas_by_position(db_path):
+    store = business_logs_store(db_path)
+    store.refresh()
+    recorder = Recorder()
+    store.add_listener(recorder)
+
+    append_business_logs(db_path, [business_log('user1', '2026-10-01 12:00:01', trace_id='novo')])
+    store.refresh()
+
+    assert recorder.starts == [0, 2000]
+    assert [len(delta) for delta in recorder.deltas] == [2000, 1]
+
+
+def test_failing_listener_does_not_starve_the_others(db_path):
+    store = business_logs_store(db_path)
+    failing, healthy = Recorder(failing=True), Recorder()
+    store.add_listener(failing)
+    store.add_listener(healthy)
+
+    store.refresh()
+    assert healthy.starts == [0]
+    assert failing.deltas == []
+
+    # Recuperado, recebe o store inteiro a partir de 0 (sinal de recomeço) e depois só os deltas
+    failing.failing = False
+    append_business_logs(db_path, [business_log('user1', '2026-10-01 12:00:01', trace_id='novo')])
+    store.refresh()
+    assert failing.starts == [0, 2000]
+    assert len(failing.deltas[0]) == 2000
+    assert healthy.starts == [0, 2000]
+
+    append_business_logs(db_path, [business_log('user1', '2026-10-01 12:00:02', trace_id='outro')])
+    store.refresh()
+    assert failing.starts == [0, 2000, 2001]
+
+
+def test_recreated_table_restarts_store_and_listeners(db_path):
+    store = business_logs_store(db_path)
+    recorder = Recorder()
+    store.add_listener(recorder)
+    store.refresh()
+
+    recreate_business_logs(db_path, [business_log('user1', '2026-10-02 08:00:00', trace_id=f't{i}')
+                                     for i in range(3)])
+    assert store.refresh() == 3
+    assert len(store) == 3
+    assert recorder.starts == [0, 0]